@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+'''
+App for replaying .pcap files, i.e. the ones of the TCPDump app, against
+a test segment.
+'''
+import logging
+import os
+import threading
+
+from axon.apps.base import BaseApp
+
+
+log = logging.getLogger(__name__)
+
+
+class ReplayRerunError(Exception):
+    pass
+
+
+class Replay(BaseApp):
+
+    NAME = 'ReplayApp'
+
+    def __init__(self, rqueue=None):
+        """
+        :param rqueue: records queue the reports of the replays are put
+                       onto
+        """
+        self._rqueue = rqueue
+        self._replays = {}  # a <str: (PcapReplay, threading.Thread)> pair
+        self._reports = {}
+
+    def _get_identifier(self, pcap_file):
+        """
+        Files are looked up where the TCPDump app writes them unless the
+        path is absolute.
+        """
+        return os.path.join('/tmp', pcap_file)
+
+    def _run(self, ident, replay):
+        try:
+            self._reports[ident] = replay.run()
+        except Exception:
+            log.exception("Replay of %s failed", ident)
+
+    def start_replay(self, pcap_file, mapping=None, ports=None, speed=1.0,
+                     source=None):
+        """
+        Starts replaying a pcap file in the background.
+        :param mapping: addresses of the capture to the addresses of the
+                        test segment they are replayed to
+        :type mapping: dict
+        :param ports: destination ports of the capture to the ports they
+                      are replayed to
+        :type ports: dict
+        :param speed: speed up of the original timing, 2 replays twice
+                      as fast
+        :type speed: float
+        :param source: address of this endpoint in the replay record
+        :type source: str
+        """
+        # the replay engine is python 3 only, the controller imports this
+        # app on python 2 as well
+        from axon.traffic.replay import PcapReplay
+        ident = self._get_identifier(pcap_file)
+        if self.is_running(pcap_file):
+            msg = "A replay of %s is already running" % pcap_file
+            log.error(msg)
+            raise ReplayRerunError(msg)
+        if not os.path.isfile(ident):
+            raise IOError("No pcap file found at %s" % ident)
+        replay = PcapReplay(ident, mapping=mapping, ports=ports,
+                            speed=speed, source=source,
+                            record_queue=self._rqueue)
+        thread = threading.Thread(target=self._run, args=(ident, replay))
+        thread.daemon = True
+        self._reports.pop(ident, None)
+        self._replays[ident] = (replay, thread)
+        thread.start()
+        log.info("Started replay of %s at speed %s", ident, speed)
+        return True
+
+    def stop_replay(self, pcap_file):
+        """
+        Stops the replay of `pcap_file`.
+        """
+        ident = self._get_identifier(pcap_file)
+        replay = self._replays.pop(ident, None)
+        if not replay:
+            log.warning("No replay found for %s", pcap_file)
+            return
+        replay[0].stop()
+        replay[1].join()
+        log.info("Stopped replay of %s", ident)
+
+    def is_running(self, pcap_file):
+        replay = self._replays.get(self._get_identifier(pcap_file))
+        return bool(replay and replay[1].is_alive())
+
+    def get_report(self, pcap_file):
+        """
+        Returns the report of the last completed replay of `pcap_file`,
+        None while it runs.
+        """
+        return self._reports.get(self._get_identifier(pcap_file))
+
+    def stop(self):
+        """
+        Stops every replay.
+        """
+        for ident in list(self._replays):
+            self.stop_replay(ident)
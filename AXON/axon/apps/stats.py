@@ -48,6 +48,12 @@ class StatsApp(object):
             return self._repository.latency.get_latency_stats(
                 session, start_time, end_time)
 
+    def get_phase_latency(self, start_time=None, end_time=None):
+        start_time, end_time = self._set_time_range(start_time, end_time)
+
+        with session_scope() as session:
+            return self._repository.latency.get_phase_latency_stats(
+                session, start_time, end_time)
 
     def get_failure_count(self, start_time=None, end_time=None,
                           destination=None, port=None, source=None):
@@ -84,3 +90,16 @@ class StatsApp(object):
         with session_scope() as session:
             return self._repository.record.get_records(
                 session, start_time, end_time, **filters)
+
+    def get_metrics(self, start_time=None, end_time=None, metric_type=None,
+                    name=None, destination=None, port=None, source=None):
+        start_time, end_time, filters = self._set_scope(start_time, end_time,
+                                                        destination, port,
+                                                        source)
+        if metric_type:
+            filters['type'] = metric_type
+        if name:
+            filters['name'] = name
+        with session_scope() as session:
+            return self._repository.metric.get_records(
+                session, start_time, end_time, **filters)
@@ -11,6 +11,7 @@ import threading
 from axon.db.db_pool_manager import DBPoolManager
 from axon.traffic.connected_state import ConnectedStateProcessor, \
     DBConnectedState
+from axon.traffic.clients.scheduler import ScheduledStart
 from axon.traffic.agents import AxonRootNamespaceClientAgent,\
     AxonRootNamespaceServerAgent, AxonNameSpaceClientAgent,\
     AxonNameSpaceServerAgent
@@ -132,9 +133,22 @@ class TrafficApp(object):
                 "as the Axon is running in non namespace mode")
         self._client_agent.stop_clients(namespace=namespace)
 
-    def start_clients(self):
+    def start_clients(self, workers=None, start_time=None, jitter=None):
+        """
+        Start the clients of the endpoint
+        :param workers: number of processes per source of traffic
+        :type workers: int
+        :param start_time: unix timestamp at which the clients start
+                           sending, they start right away by default
+        :type start_time: float
+        :param jitter: the start of this agent is delayed by a random
+                       offset in [0, jitter) seconds
+        :type jitter: float
+        """
         self.log.info("====start clients initiated====")
-        self._client_agent.start_clients()
+        start = ScheduledStart(start_time, jitter) \
+            if start_time is not None else None
+        self._client_agent.start_clients(workers=workers, start=start)
 
     def rediscover_namespaces(self):
         self.log.info("====rediscover namespaces initiated====")
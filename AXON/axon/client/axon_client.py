@@ -25,8 +25,8 @@ class TrafficManger(Manager):
     def add_server(self, protocol, port, endpoint, namespace=None):
         self._client.traffic.add_server(protocol, port, endpoint, namespace)
 
-    def start_clients(self):
-        self._client.traffic.start_clients()
+    def start_clients(self, workers=None, start_time=None, jitter=None):
+        self._client.traffic.start_clients(workers, start_time, jitter)
 
     def get_traffic_rules(self, endpoint=None):
         return self._client.traffic.get_traffic_rules(endpoint)
@@ -72,6 +72,10 @@ class StatsManager(Manager):
         return self._client.stats.get_avg_latency(
             start_time=start_time, end_time=end_time)
 
+    def get_phase_latency(self, start_time=None, end_time=None):
+        return self._client.stats.get_phase_latency(
+            start_time=start_time, end_time=end_time)
+
     def get_failure_count(self, start_time=None, end_time=None,
                           destination=None, port=None, source=None):
         return self._client.stats.get_failure_count(
@@ -96,6 +100,13 @@ class StatsManager(Manager):
             start_time=start_time, end_time=end_time,
             destination=destination, port=port, source=source)
 
+    def get_metrics(self, start_time=None, end_time=None, metric_type=None,
+                    name=None, destination=None, port=None, source=None):
+        return self._client.stats.get_metrics(
+            start_time=start_time, end_time=end_time,
+            metric_type=metric_type, name=name,
+            destination=destination, port=port, source=source)
+
 
 class NamespaceManager(Manager):
 
@@ -151,6 +162,23 @@ class TCPDumpManager(Manager):
         return self._client.tcpdump.is_running(dst_file)
 
 
+class ReplayManager(Manager):
+
+    def start_replay(self, pcap_file, mapping=None, ports=None, speed=1.0,
+                     source=None):
+        self._client.replay.start_replay(pcap_file, mapping, ports, speed,
+                                         source)
+
+    def stop_replay(self, pcap_file):
+        self._client.replay.stop_replay(pcap_file)
+
+    def is_running(self, pcap_file):
+        return self._client.replay.is_running(pcap_file)
+
+    def get_report(self, pcap_file):
+        return self._client.replay.get_report(pcap_file)
+
+
 class IperfManager(Manager):
 
     def start_iperf_server(self, port=None, args=''):
@@ -235,6 +263,7 @@ class AxonClient(object):
         self.interface = InterfaceManager(self.rpc_client.root)
         self.monitor = ResourceMonitorManager(self.rpc_client.root)
         self.pcap = TCPDumpManager(self.rpc_client.root)
+        self.replay = ReplayManager(self.rpc_client.root)
         self.iperf = IperfManager(self.rpc_client.root)
         self.scapy = ScapyManager(self.rpc_client.root)
         self.configs = ConfigManager(self.rpc_client.root)
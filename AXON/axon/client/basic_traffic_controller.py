@@ -7,6 +7,7 @@
 import logging
 
 from axon.client.traffic_controller import TrafficController
+from axon.client.traffic_elements import Mode, Multicast, Protocol
 from axon.client.axon_client import AxonClient
 from axon.client.utils import ParallelWork
 
@@ -43,10 +44,11 @@ def start_servers(server, proxy_host):
     return True
 
 
-def start_clients(server, proxy_host):
+def start_clients(server, proxy_host, start_time=None, jitter=None):
     try:
         with AxonClient(server, proxy_host=proxy_host) as client:
-            client.traffic.start_clients()
+            client.traffic.start_clients(start_time=start_time,
+                                         jitter=jitter)
     except Exception:
         log.exception("Starting clients on endpoint %s failed" % server)
         return False
@@ -79,14 +81,29 @@ class TrafficRecord(object):
         self._servers = servers if servers else []
         self._clients = clients if clients else []
 
-    def add_server(self, protocol, port):
-        if (protocol, port) not in self._servers:
-            self._servers.append((protocol, port))
-
-    def add_client(self, protocol, port, destination, connected, action):
-        if (protocol, port, destination) not in self._clients:
-            self._clients.append((
-                protocol, port, destination, connected, action))
+    def add_server(self, protocol, port, options=None):
+        if protocol in Protocol.serverless:
+            return
+        options = options if options else {}
+        if options.get('mode') == Mode.MULTICAST:
+            # destinations of multicast rules receive in a group
+            server = Multicast.server(port, options)
+        else:
+            server = (protocol, port)
+        # a receiver joins a single group on a port
+        if server[:2] not in [server[:2] for server in self._servers]:
+            self._servers.append(server)
+
+    def add_client(self, protocol, port, destination, connected, action,
+                   options=None):
+        if (protocol, port, destination) not in \
+                [client[:3] for client in self._clients]:
+            client = (protocol, port, destination, connected, action)
+            if options:
+                # options travel as a tuple of pairs so that rpyc
+                # passes the client by value
+                client += (tuple(sorted(options.items())),)
+            self._clients.append(client)
 
     def as_dict(self):
         return dict(list(zip(['endpoint', 'servers', 'clients'],
@@ -109,10 +126,11 @@ class BasicTrafficController(TrafficController):
                 self._servers[str(src)] = TrafficRecord(src)
             if not self._servers.get(str(dst)):
                 self._servers[dst] = TrafficRecord(dst)
-            self._servers[dst].add_server(trule.protocol, trule.port.port)
+            self._servers[dst].add_server(trule.protocol, trule.port.port,
+                                          trule.options)
             self._servers[src].add_client(
                 trule.protocol, trule.port.port,
-                dst, trule.connected, trule.action)
+                dst, trule.connected, trule.action, trule.options)
 
     def __execute_work(self, work_list):
         resp = ParallelWork.Do(
@@ -174,13 +192,14 @@ class BasicTrafficController(TrafficController):
             self.log.error("Start servers does not succeed on all endpoints")
         self.log.info("Start servers completed")
 
-    def __start_clients(self, servers):
+    def __start_clients(self, servers, start_time=None, jitter=None):
         servers = servers if servers else list(self._servers.keys())
         if not servers:
             return
         work = []
         for server, gw_host in [(server, self._gw_host) for server in servers]:
-            work.append([start_clients, [server, gw_host], {}])
+            work.append([start_clients, [server, gw_host, start_time, jitter],
+                         {}])
         if not self.__execute_work(work):
             self.log.error("Start clients does not succeed on all endpoints")
         self.log.info("Start clients completed")
@@ -189,9 +208,19 @@ class BasicTrafficController(TrafficController):
         self.__stop_clients(servers)
         self.__stop_servers(servers)
 
-    def start_traffic(self, servers=None):
+    def start_traffic(self, servers=None, start_time=None, jitter=None):
+        """
+        Start the servers and then the clients of the endpoints
+        :param start_time: unix timestamp at which all of the clients start
+                           sending, e.g. a few seconds from now so that the
+                           start calls of every endpoint are done by then
+        :type start_time: float
+        :param jitter: every endpoint starts a random offset in
+                       [0, jitter) seconds after start_time
+        :type jitter: float
+        """
         self.__start_servers(servers)
-        self.__start_clients(servers)
+        self.__start_clients(servers, start_time, jitter)
 
     def restart_traffic(self, servers=None):
         self.stop_traffic(servers)
@@ -42,9 +42,11 @@ def start_clients(start_param):
     server = start_param[0]
     proxy_host = start_param[1]
     server_port = start_param[2]
+    start_time, jitter = start_param[3:5] if len(start_param) > 3 \
+        else (None, None)
     with AxonClient(server, proxy_host=proxy_host, axon_port=server_port, retry_count=30,
                     sleep_interval=1) as client:
-        client.traffic.start_clients()
+        client.traffic.start_clients(start_time=start_time, jitter=jitter)
 
 
 def stop_servers(stop_param):
@@ -160,9 +162,9 @@ class DataCenterTrafficController(TrafficController):
             self._servers[str(src_vif)].add_client(
                 trule.protocol, trule.port.port,
                 dst_vif, trule.connected,
-                trule.action)
+                trule.action, trule.options)
             self._servers[str(dst_vif)].add_server(
-                trule.protocol, trule.port.port)
+                trule.protocol, trule.port.port, trule.options)
 
     def register_traffic(self, traffic_config):
         self.__create_rules(traffic_config)
@@ -211,12 +213,13 @@ class DataCenterTrafficController(TrafficController):
         pool.close()
         pool.join()
 
-    def __start_clients(self, servers):
+    def __start_clients(self, servers, start_time=None, jitter=None):
         servers = servers if servers else list(self._workload_servers.keys())
         if not servers:
             return
         pool = ThreadPool(THREADPOOL_SIZE)
-        params = [(server, self._gw_host, self._axon_server_port) for server in servers]
+        params = [(server, self._gw_host, self._axon_server_port,
+                   start_time, jitter) for server in servers]
         pool.map(start_clients, params)
         pool.close()
         pool.join()
@@ -245,9 +248,19 @@ class DataCenterTrafficController(TrafficController):
         self.__stop_clients(servers)
         self.__stop_servers(servers)
 
-    def start_traffic(self, servers=None):
+    def start_traffic(self, servers=None, start_time=None, jitter=None):
+        """
+        Start the servers and then the clients of the workloads
+        :param start_time: unix timestamp at which all of the clients start
+                           sending, e.g. a few seconds from now so that the
+                           start calls of every workload are done by then
+        :type start_time: float
+        :param jitter: every workload starts a random offset in
+                       [0, jitter) seconds after start_time
+        :type jitter: float
+        """
         self.__start_servers(servers)
-        self.__start_clients(servers)
+        self.__start_clients(servers, start_time, jitter)
 
     def restart_traffic(self, servers=None):
         self.stop_traffic(servers)
@@ -12,6 +12,8 @@ On prem, cloud or hybrid setup, it must adhere to this interface.
 import abc
 import logging
 
+from axon.client.traffic_elements import Mode, Multicast, Protocol
+
 
 class TrafficController(object):
     __metadata__ = abc.ABCMeta
@@ -46,14 +48,29 @@ class TrafficRecord(object):
         self._servers = servers if servers else []
         self._clients = clients if clients else []
 
-    def add_server(self, protocol, port):
-        if (protocol, port) not in self._servers:
-            self._servers.append((protocol, port))
+    def add_server(self, protocol, port, options=None):
+        if protocol in Protocol.serverless:
+            return
+        options = options if options else {}
+        if options.get('mode') == Mode.MULTICAST:
+            # destinations of multicast rules receive in a group
+            server = Multicast.server(port, options)
+        else:
+            server = (protocol, port)
+        # a receiver joins a single group on a port
+        if server[:2] not in [server[:2] for server in self._servers]:
+            self._servers.append(server)
 
-    def add_client(self, protocol, port, destination, connected, action):
-        if (protocol, port, destination) not in self._clients:
-            self._clients.append((
-                protocol, port, destination, connected, action))
+    def add_client(self, protocol, port, destination, connected, action,
+                   options=None):
+        if (protocol, port, destination) not in \
+                [client[:3] for client in self._clients]:
+            client = (protocol, port, destination, connected, action)
+            if options:
+                # options travel as a tuple of pairs so that rpyc
+                # passes the client by value
+                client += (tuple(sorted(options.items())),)
+            self._clients.append(client)
 
     def as_dict(self):
         return dict(list(zip(['endpoint', 'servers', 'clients'],
@@ -135,13 +135,18 @@ class Port(object):
 class Protocol(object):
     """
     This class enlists and controls all the protocols supported and handled
-    by the Traffic Controller system.
+    by the Traffic Controller system. ICMP rules send echo requests, which
+    the destination answers without a server, their port is ignored.
     """
     TCP = "TCP"
     UDP = "UDP"
     HTTP = "HTTP"
+    TLS = "TLS"
+    ICMP = "ICMP"
 
-    allowed = [TCP, UDP, HTTP]
+    allowed = [TCP, UDP, HTTP, TLS, ICMP]
+    # protocols for which no server is started on the destination
+    serverless = [ICMP]
 
 
 class Action(object):
@@ -171,15 +176,419 @@ class Connected(object):
     allowed = [CONNECTED, DISCONNECTED]
 
 
+class Mode(object):
+    """
+    This class enlists the ways a client can send traffic for a rule.
+        - request: every request opens a new connection.
+        - persistent: requests are exchanged over a long lived
+          connection per (src, dst, port), TCP only.
+        - stream: data is sent back to back to measure throughput, see
+          Stream, TCP and UDP only.
+        - pipeline: up to 'window' length prefixed requests are
+          outstanding on a long lived connection per (src, dst, port),
+          see Pipeline, TCP only.
+        - cps: new flows are opened and closed as fast as possible to
+          stress the flow tables of stateful devices, see
+          ConnectionRate, TCP and UDP only.
+        - hold: many idle connections are held open with a heartbeat
+          on each of them, see Hold, TCP only.
+        - sweep: ranges of ports of the destination are connected to at
+          once to find which of them are open, see Sweep, TCP only.
+        - multicast: datagrams are sent to a multicast group which the
+          destinations join, see Multicast, UDP only.
+    """
+    REQUEST = 'request'
+    PERSISTENT = 'persistent'
+    STREAM = 'stream'
+    PIPELINE = 'pipeline'
+    CPS = 'cps'
+    HOLD = 'hold'
+    SWEEP = 'sweep'
+    MULTICAST = 'multicast'
+
+    allowed = [REQUEST, PERSISTENT, STREAM, PIPELINE, CPS, HOLD, SWEEP,
+               MULTICAST]
+
+
+class PayloadSize(object):
+    """
+    This class controls the 'payload_size' option of a rule, the size in
+    bytes of the payload of every request or a distribution of sizes as
+    (size, weight) pairs from which the size of each request is drawn.
+    Sizes are bound by the largest payload of a UDP datagram.
+    """
+    MIN = 1
+    MAX = 65507
+
+    @classmethod
+    def normalize(cls, sizes):
+        """
+        Normalize a payload size option to a tuple of (size, weight) pairs
+        :param sizes: size or (size, weight) pairs
+        :type sizes: int or list
+        :rtype: tuple
+        :raises ValueError: if a size or weight is out of range
+        """
+        if isinstance(sizes, six.integer_types):
+            sizes = ((sizes, 1),)
+        try:
+            sizes = tuple((int(size), float(weight))
+                          for size, weight in sizes)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid payload size %r" % (sizes,))
+        if not sizes:
+            raise ValueError("Empty payload size distribution")
+        for size, weight in sizes:
+            if not cls.MIN <= size <= cls.MAX or weight <= 0:
+                raise ValueError("Invalid payload size %s with weight %s" %
+                                 (size, weight))
+        return sizes
+
+
+class Criticality(object):
+    """
+    This class controls the 'criticality' option of a rule, the weight of
+    its destinations in the probe schedule of a client. Destinations of a
+    rule with criticality 2 are probed twice as often as those of a rule
+    with the default of 1.
+    """
+
+    @classmethod
+    def normalize(cls, criticality):
+        """
+        Normalize a criticality option to a float
+        :rtype: float
+        :raises ValueError: if the criticality isn't a positive number
+        """
+        try:
+            value = float(criticality)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid criticality %r" % (criticality,))
+        if value <= 0:
+            raise ValueError("Invalid criticality %r" % (criticality,))
+        return value
+
+
+def _positive_options(options, casts):
+    """
+    Cast the options of a rule which are positive numbers
+    :param options: options of the rule
+    :type options: dict
+    :param casts: (name, type) pairs of the options, missing ones are
+                  skipped
+    :type casts: tuple
+    :return: copy of the options with the cast options
+    :rtype: dict
+    :raises ValueError: if an option isn't a positive number
+    """
+    options = dict(options)
+    for name, cast in casts:
+        if name not in options:
+            continue
+        try:
+            options[name] = cast(options[name])
+        except (TypeError, ValueError):
+            raise ValueError("Invalid %s %r" % (name, options[name]))
+        if options[name] <= 0:
+            raise ValueError("Invalid %s %r" % (name, options[name]))
+    return options
+
+
+class Stream(object):
+    """
+    This class controls the options of a rule in 'stream' mode.
+        - duration: seconds the stream is sent for.
+        - stream_bytes: bytes after which the stream ends, if it is set
+          without a duration the stream isn't bound by time.
+        - flows: number of parallel flows of the rule.
+        - bandwidth: bits per second UDP streams are paced at, they are
+          sent as fast as possible by default.
+        - packet_rate: datagrams per second UDP streams are paced at.
+    """
+    protocols = [Protocol.TCP, Protocol.UDP]
+
+    @classmethod
+    def normalize(cls, protocol, options):
+        """
+        Validate the stream options of a rule
+        :param protocol: protocol of the rule
+        :type protocol: str
+        :param options: options of the rule
+        :type options: dict
+        :return: options with numeric stream options
+        :rtype: dict
+        :raises ValueError: if an option is invalid
+        """
+        if protocol not in cls.protocols:
+            raise ValueError("Stream mode isn't supported for %s" % protocol)
+        return _positive_options(options, (
+            ('duration', float), ('stream_bytes', int), ('flows', int),
+            ('bandwidth', float), ('packet_rate', float)))
+
+
+class ConnectionRate(object):
+    """
+    This class controls the options of a rule in 'cps' mode.
+        - duration: seconds flows are opened for.
+        - rate: cap of the new flows per second.
+        - concurrency: flows being opened at the same time.
+        - source_ports: range of source ports the flows rotate through,
+          as 'first-last' or a (first, last) pair.
+    """
+    protocols = [Protocol.TCP, Protocol.UDP]
+
+    @classmethod
+    def normalize_ports(cls, ports):
+        """
+        Normalize a source port range to a (first, last) tuple
+        :param ports: 'first-last' or (first, last)
+        :type ports: str or list
+        :rtype: tuple
+        :raises ValueError: if the range is invalid
+        """
+        if isinstance(ports, six.string_types):
+            ports = ports.split('-')
+        try:
+            first, last = (int(port) for port in ports)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid source ports %r" % (ports,))
+        if not 1 <= first <= last <= 65535:
+            raise ValueError("Invalid source ports %r" % (ports,))
+        return first, last
+
+    @classmethod
+    def normalize(cls, protocol, options):
+        """
+        Validate the cps options of a rule
+        :param protocol: protocol of the rule
+        :type protocol: str
+        :param options: options of the rule
+        :type options: dict
+        :return: options with numeric cps options
+        :rtype: dict
+        :raises ValueError: if an option is invalid
+        """
+        if protocol not in cls.protocols:
+            raise ValueError("CPS mode isn't supported for %s" % protocol)
+        options = _positive_options(options, (
+            ('duration', float), ('rate', float), ('concurrency', int)))
+        if 'source_ports' in options:
+            options['source_ports'] = cls.normalize_ports(
+                options['source_ports'])
+        return options
+
+
+class Hold(object):
+    """
+    This class controls the options of a rule in 'hold' mode.
+        - connections: connections held open at the same time.
+        - heartbeat: seconds between the heartbeats of a connection.
+        - duration: seconds the connections are held for, they are held
+          until the client stops by default.
+    """
+
+    @classmethod
+    def normalize(cls, protocol, options):
+        """
+        Validate the hold options of a rule
+        :param protocol: protocol of the rule
+        :type protocol: str
+        :param options: options of the rule
+        :type options: dict
+        :return: options with numeric hold options
+        :rtype: dict
+        :raises ValueError: if an option is invalid
+        """
+        if protocol != Protocol.TCP:
+            raise ValueError("Hold mode isn't supported for %s" % protocol)
+        return _positive_options(options, (
+            ('connections', int), ('heartbeat', float),
+            ('duration', float)))
+
+
+class Sweep(object):
+    """
+    This class controls the options of a rule in 'sweep' mode.
+        - ports: port ranges swept, as '1-1024,8080' or a list of ports
+          and (first, last) pairs. Only the port of the rule by default.
+        - expect_open: ports expected to be open, in the same format. If
+          it is set the ports which don't match are reported.
+        - concurrency: connects in flight at the same time.
+        - timeout: seconds after which a port which didn't answer is
+          filtered.
+        - interval: seconds between sweeps, the ports are swept once by
+          default.
+    """
+
+    @classmethod
+    def normalize_ports(cls, ports):
+        """
+        Normalize port ranges to a tuple of (first, last) pairs
+        :param ports: '1-1024,8080' or list of ports and (first, last)
+        :type ports: str or list
+        :rtype: tuple
+        :raises ValueError: if a range is invalid
+        """
+        if isinstance(ports, six.string_types):
+            ports = [part.strip() for part in ports.split(',')]
+        elif isinstance(ports, six.integer_types):
+            ports = [ports]
+        ranges = []
+        try:
+            for part in ports:
+                if isinstance(part, six.string_types):
+                    part = part.split('-')
+                elif isinstance(part, six.integer_types):
+                    part = (part, part)
+                if len(part) == 1:
+                    part = (part[0], part[0])
+                first, last = (int(port) for port in part)
+                ranges.append((first, last))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid ports %r" % (ports,))
+        if not ranges:
+            raise ValueError("Invalid ports %r" % (ports,))
+        for first, last in ranges:
+            if not 1 <= first <= last <= 65535:
+                raise ValueError("Invalid ports %r" % (ports,))
+        return tuple(ranges)
+
+    @classmethod
+    def normalize(cls, protocol, options):
+        """
+        Validate the sweep options of a rule
+        :param protocol: protocol of the rule
+        :type protocol: str
+        :param options: options of the rule
+        :type options: dict
+        :return: options with numeric sweep options
+        :rtype: dict
+        :raises ValueError: if an option is invalid
+        """
+        if protocol != Protocol.TCP:
+            raise ValueError("Sweep mode isn't supported for %s" % protocol)
+        options = _positive_options(options, (
+            ('concurrency', int), ('timeout', float), ('interval', float)))
+        for name in ('ports', 'expect_open'):
+            if name in options:
+                options[name] = cls.normalize_ports(options[name])
+        return options
+
+
+class Multicast(object):
+    """
+    This class controls the options of a rule in 'multicast' mode. The
+    destination of the rule is a receiver which joins the group on the
+    port of the rule, the source sends a single datagram to the group
+    every interval for all of its rules to the same group and port.
+        - group: multicast group, MULTICAST_GROUP or MULTICAST_GROUP_V6
+          of the config by default.
+        - interval: seconds between datagrams.
+        - ttl: hops the datagrams are forwarded for.
+    """
+    # protocol of the receivers started on the destinations
+    SERVER = 'MULTICAST'
+
+    @classmethod
+    def normalize(cls, protocol, options):
+        """
+        Validate the multicast options of a rule
+        :param protocol: protocol of the rule
+        :type protocol: str
+        :param options: options of the rule
+        :type options: dict
+        :return: options with numeric multicast options
+        :rtype: dict
+        :raises ValueError: if an option is invalid
+        """
+        if protocol != Protocol.UDP:
+            raise ValueError("Multicast mode isn't supported for %s" %
+                             protocol)
+        options = _positive_options(options, (('interval', float),))
+        if 'group' in options:
+            try:
+                group = ipaddress.ip_address(six.text_type(options['group']))
+            except ValueError:
+                raise ValueError("Invalid group %r" % (options['group'],))
+            if not group.is_multicast:
+                raise ValueError("Invalid group %r" % (options['group'],))
+            options['group'] = str(group)
+        if 'ttl' in options:
+            try:
+                options['ttl'] = int(options['ttl'])
+            except (TypeError, ValueError):
+                raise ValueError("Invalid ttl %r" % options['ttl'])
+            if not 1 <= options['ttl'] <= 255:
+                raise ValueError("Invalid ttl %r" % options['ttl'])
+        return options
+
+    @classmethod
+    def server(cls, port, options):
+        """
+        Get the receiver of a rule in multicast mode
+        :param options: options of the rule
+        :type options: dict
+        :return: (protocol, port[, options]) of the receiver
+        :rtype: tuple
+        """
+        if options.get('group'):
+            return cls.SERVER, port, (('group', options['group']),)
+        return cls.SERVER, port
+
+
+class Pipeline(object):
+    """
+    This class controls the options of a rule in 'pipeline' mode.
+        - window: requests outstanding on the connection at the same time.
+        - response_size: bytes of the payload of every response, by
+          default responses are as large as their requests.
+    """
+
+    @classmethod
+    def normalize(cls, protocol, options):
+        """
+        Validate the pipeline options of a rule
+        :param protocol: protocol of the rule
+        :type protocol: str
+        :param options: options of the rule
+        :type options: dict
+        :return: options with numeric pipeline options
+        :rtype: dict
+        :raises ValueError: if an option is invalid
+        """
+        if protocol != Protocol.TCP:
+            raise ValueError("Pipeline mode isn't supported for %s" %
+                             protocol)
+        options = _positive_options(options, (('window', int),))
+        if 'response_size' in options:
+            try:
+                options['response_size'] = int(options['response_size'])
+            except (TypeError, ValueError):
+                raise ValueError("Invalid response_size %r" %
+                                 (options['response_size'],))
+            if not 0 <= options['response_size'] <= PayloadSize.MAX:
+                raise ValueError("Invalid response_size %r" %
+                                 (options['response_size'],))
+        return options
+
+
 class TrafficRule(object):
 
     def __init__(self, src, dst, port, protocol=Protocol.TCP,
-                 connected=Connected.CONNECTED, action=Action.ALLOW):
+                 connected=Connected.CONNECTED, action=Action.ALLOW,
+                 options=None):
         """
         This class captures the notion of Traffic Rule or Traffic Command for
         the Traffic Controller system. A Traffic rule/command can specify :
             - Traffic from 'source' to 'destination' on 'port' for 'protocol'
               is 'allowed/denied'
+              (optionally with per rule 'options' such as the 'mode'
+              in which client sends its requests, 'tcp_info' to
+              record the kernel TCP_INFO of the connections,
+              'timestamping' to measure UDP latency with kernel timestamps,
+              'payload_size' of the TCP and UDP requests, the options
+              of a stream or 'tls_resumption' to resume the TLS session
+              of the previous request, which is the default)
 
               -OR-
 
@@ -199,6 +608,33 @@ class TrafficRule(object):
             assert(action in Action.allowed), "Invalid Action"
             assert (connected in Connected.allowed), "Invalid Connected"
             assert(protocol in Protocol.allowed), "Invalid Protocol"
+            options = options if options else {}
+            if not isinstance(options, dict):
+                raise ValueError("Invalid options %r" % (options,))
+            mode = options.get('mode', Mode.REQUEST)
+            if mode not in Mode.allowed:
+                raise ValueError("Invalid mode %r" % (mode,))
+            if mode == Mode.PERSISTENT and protocol != Protocol.TCP:
+                raise ValueError("Persistent mode isn't supported for %s" %
+                                 protocol)
+            if 'payload_size' in options:
+                options = dict(options, payload_size=PayloadSize.normalize(
+                    options['payload_size']))
+            if 'criticality' in options:
+                options = dict(options, criticality=Criticality.normalize(
+                    options['criticality']))
+            if options.get('mode') == Mode.STREAM:
+                options = Stream.normalize(protocol, options)
+            elif options.get('mode') == Mode.PIPELINE:
+                options = Pipeline.normalize(protocol, options)
+            elif options.get('mode') == Mode.CPS:
+                options = ConnectionRate.normalize(protocol, options)
+            elif options.get('mode') == Mode.HOLD:
+                options = Hold.normalize(protocol, options)
+            elif options.get('mode') == Mode.SWEEP:
+                options = Sweep.normalize(protocol, options)
+            elif options.get('mode') == Mode.MULTICAST:
+                options = Multicast.normalize(protocol, options)
 
             self.src_eps = src
             self.dst_eps = dst
@@ -206,6 +642,7 @@ class TrafficRule(object):
             self.port = port
             self.action = action
             self.connected = connected
+            self.options = options
 
         except Exception as err:
             raise InvalidRuleError(err)
@@ -31,7 +31,126 @@ utils.setup_logging(log_dir=LOG_DIR, log_file=LOG_FILE)
 # Traffic Server Configs
 REQUEST_QUEUE_SIZE = 100
 PACKET_SIZE = 1024
+# Size of the buffers into which servers receive the requests they echo,
+# large enough for any UDP datagram
+ECHO_BUFFER_SIZE = 65536
+# Datagrams moved per system call by the linux sendmmsg/recvmmsg fast path
+# of UDP servers and probers, every datagram of a batch has a buffer of
+# ECHO_BUFFER_SIZE. 1 disables batching.
+UDP_BATCH_SIZE = int(os.environ.get('UDP_BATCH_SIZE', 16))
 ALLOW_REUSE_ADDRESS = True
+# Seconds an idle keep alive HTTP connection is held open by the server
+HTTP_KEEP_ALIVE_TIMEOUT = 60
+
+
+# Traffic Client Configs
+# 'asyncio' runs all probes of an endpoint on a single event loop,
+# 'thread' runs every probe in its own thread.
+TRAFFIC_ENGINE = os.environ.get('TRAFFIC_ENGINE', 'asyncio')
+TRAFFIC_MAX_CONCURRENCY = int(
+    os.environ.get('TRAFFIC_MAX_CONCURRENCY', 20000))
+# Number of processes the clients of an endpoint are sharded across,
+# destinations are assigned to processes by a stable hash.
+TRAFFIC_CLIENT_WORKERS = int(os.environ.get('TRAFFIC_CLIENT_WORKERS', 1))
+TRAFFIC_CLIENT_TIMEOUT = 5
+# Timeout of negative probes, i.e. requests of disconnected or drop rules
+# for which a failure is the expected result. They aren't retried.
+NEGATIVE_PROBE_TIMEOUT = 1
+# Read the kernel TCP_INFO of every TCP probe connection before it is
+# closed, can also be enabled per rule with the 'tcp_info' option.
+TCP_INFO_ENABLED = os.environ.get('TCP_INFO_ENABLED', False)
+TCP_INFO_ENABLED = True if TCP_INFO_ENABLED in ['True', True] else False
+# Measure UDP latency with kernel software timestamps (linux
+# SO_TIMESTAMPING) on clients and UDP servers, can also be enabled per
+# rule with the 'timestamping' option. Falls back to user space timing
+# where it isn't supported.
+UDP_TIMESTAMPING_ENABLED = os.environ.get('UDP_TIMESTAMPING_ENABLED', False)
+UDP_TIMESTAMPING_ENABLED = True if UDP_TIMESTAMPING_ENABLED in \
+    ['True', True] else False
+# Requests per second sent by every endpoint, by default an endpoint
+# probes each of its destinations at most once every 5 seconds.
+TRAFFIC_REQUEST_RATE = float(os.environ.get('TRAFFIC_REQUEST_RATE', 20))
+TRAFFIC_ARRIVAL_PROFILE = os.environ.get('TRAFFIC_ARRIVAL_PROFILE', 'constant')
+TRAFFIC_BURST_SIZE = 10
+TRAFFIC_REPORT_INTERVAL = 30
+# Destinations are probed in order of how overdue they are. A pair is due
+# its share of the rate, divided by the 'criticality' of its rule and by
+# 1 + TRAFFIC_FAILURE_WEIGHT * its failure score, which decays by
+# TRAFFIC_FAILURE_DECAY per probe. Pairs which succeeded every probe back
+# off by one share every TRAFFIC_STABLE_PROBES probes up to
+# TRAFFIC_MAX_BACKOFF shares.
+TRAFFIC_FAILURE_WEIGHT = 4
+TRAFFIC_FAILURE_DECAY = 0.5
+TRAFFIC_STABLE_PROBES = 10
+TRAFFIC_MAX_BACKOFF = 4
+# Retries of a failed probe, the delay before a retry backs off
+# exponentially from TRAFFIC_RETRY_BACKOFF seconds up to
+# TRAFFIC_RETRY_MAX_BACKOFF and is spread by +/- TRAFFIC_RETRY_JITTER of
+# itself. Retries wait in a central queue, not in the probe.
+TRAFFIC_RETRY_COUNT = int(os.environ.get('TRAFFIC_RETRY_COUNT', 1))
+TRAFFIC_RETRY_BACKOFF = float(os.environ.get('TRAFFIC_RETRY_BACKOFF', 1))
+TRAFFIC_RETRY_MAX_BACKOFF = 30
+TRAFFIC_RETRY_JITTER = 0.2
+# Idle keep alive connections kept per HTTP destination, and seconds
+# after which an idle connection is closed.
+HTTP_POOL_SIZE = 10
+HTTP_POOL_IDLE_TIMEOUT = 30
+# Requests outstanding at the same time on the connection of a rule in
+# 'pipeline' mode, unless the rule sets a 'window' of its own.
+PIPELINE_WINDOW = 16
+# Directory of the self signed certificate of the TLS servers, it is
+# generated with openssl on first use. TLS clients resume the session of
+# their previous handshake with a destination unless the rule sets
+# 'tls_resumption' to False.
+TLS_CERT_DIR = os.environ.get('TLS_CERT_DIR', '/var/lib/axon/tls')
+# Rules in 'stream' mode send data back to back for STREAM_DURATION
+# seconds unless they set a 'duration' or a byte count of their own, the
+# throughput of a stream is reported every STREAM_INTERVAL seconds. TCP
+# streams are written in chunks of STREAM_TCP_WRITE_SIZE bytes and UDP
+# streams are sent as datagrams of STREAM_UDP_DATAGRAM_SIZE bytes.
+STREAM_DURATION = 10
+STREAM_INTERVAL = 1
+STREAM_TCP_WRITE_SIZE = 65536
+STREAM_UDP_DATAGRAM_SIZE = 1400
+# Rules in 'cps' mode open new flows for CPS_DURATION seconds at up to
+# CPS_RATE flows per second from CPS_CONCURRENCY threads, each flow from
+# the next port of CPS_SOURCE_PORTS, unless the rule sets its own. The
+# achieved rate is reported every CPS_INTERVAL seconds. The default range
+# stays clear of the ephemeral ports of linux.
+CPS_DURATION = 10
+CPS_RATE = 10000
+CPS_CONCURRENCY = 32
+CPS_SOURCE_PORTS = (10000, 29999)
+CPS_INTERVAL = 1
+# Rules in 'hold' mode hold HOLD_CONNECTIONS connections open and send a
+# heartbeat on each of them every HOLD_HEARTBEAT seconds, unless the rule
+# sets its own. At most HOLD_CONNECT_CONCURRENCY connections are opened
+# at the same time and the held connections are reported every
+# HOLD_INTERVAL seconds.
+HOLD_CONNECTIONS = 1000
+HOLD_HEARTBEAT = 30
+HOLD_CONNECT_CONCURRENCY = 256
+HOLD_INTERVAL = 10
+# Rules in 'sweep' mode have up to SWEEP_CONCURRENCY connects to the
+# ports of a destination in flight at the same time, a port which doesn't
+# answer within SWEEP_TIMEOUT seconds is filtered, unless the rule sets
+# its own.
+SWEEP_CONCURRENCY = 1000
+SWEEP_TIMEOUT = 1.0
+# Rules in 'multicast' mode send a datagram to MULTICAST_GROUP, or
+# MULTICAST_GROUP_V6 for IPv6 sources, every MULTICAST_INTERVAL seconds
+# with a TTL of MULTICAST_TTL, unless the rule sets its own. What every
+# receiver got is recorded every MULTICAST_REPORT_INTERVAL seconds.
+MULTICAST_GROUP = '239.255.77.1'
+MULTICAST_GROUP_V6 = 'ff15::77:1'
+MULTICAST_INTERVAL = 1.0
+MULTICAST_TTL = 32
+MULTICAST_REPORT_INTERVAL = 10
+# Flows of a pcap replay idle for REPLAY_IDLE_TIMEOUT seconds are closed,
+# a packet sent more than REPLAY_LATE_THRESHOLD seconds after its time in
+# the capture is late.
+REPLAY_IDLE_TIMEOUT = 60
+REPLAY_LATE_THRESHOLD = 0.001
 
 
 # Env Configs
@@ -1,8 +1,30 @@
 import logging
 import os
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 from axon.common import consts
 
+try:
+    monotonic_ns = time.perf_counter_ns
+except AttributeError:
+    # nanosecond clocks are new in python 3.7, python 2 has no monotonic
+    # clock at all
+    _monotonic = getattr(time, 'perf_counter', time.time)
+
+    def monotonic_ns():
+        return int(_monotonic() * 1e9)
+
+try:
+    time_ns = time.time_ns
+except AttributeError:
+    def time_ns():
+        return int(time.time() * 1e9)
+
 
 def create_log_dir(log_dir):
     """
@@ -17,6 +39,24 @@ def create_log_dir(log_dir):
             "Failed to create log directory %s due to %s" % (log_dir, e))
 
 
+def raise_open_files_limit():
+    """
+    Lift the soft limit of open files up to the hard limit, for processes
+    which hold a socket per connection or probe in flight
+    :return: False if the limit couldn't be raised
+    :rtype: bool
+    """
+    if resource is None:
+        return True
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError):
+        return False
+    return True
+
+
 def setup_logging(log_dir=None, log_file=None):
     """
     Sets up Logging handlers and other environment.
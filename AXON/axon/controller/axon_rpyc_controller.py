@@ -18,6 +18,7 @@ from axon.apps.interface import InterfaceApp
 from axon.apps.iperf import Iperf
 from axon.apps.monitor import ResourceMonitor
 from axon.apps.namespace import NamespaceApp
+from axon.apps.replay import Replay
 from axon.apps.scapy import Scapy
 from axon.apps.stats import StatsApp
 from axon.apps.tcpdump import TCPDump
@@ -77,6 +78,11 @@ class exposed_Scapy(Scapy):
     pass
 
 
+@exposify
+class exposed_Replay(Replay):
+    pass
+
+
 class AxonServiceBase(rpyc.Service):
 
     RPYC_PROTOCOL_CONFIG = rpyc.core.protocol.DEFAULT_CONFIG
@@ -108,6 +114,7 @@ class AxonService(AxonServiceBase):
         self.exposed_tcpdump = exposed_TCPDump()
         self.exposed_iperf = exposed_Iperf()
         self.exposed_scapy = exposed_Scapy()
+        self.exposed_replay = exposed_Replay(self._record_queue)
         self.exposed_configs = get_configs()
 
 
@@ -4,6 +4,7 @@ import time
 import uuid
 
 from axon.common import config as conf
+from axon.traffic.resources import TCP_INFO_FIELDS, TLS_FIELDS
 
 from elasticsearch import Elasticsearch
 
@@ -47,6 +48,17 @@ class ElasticSearchClient(object):
         body['port'] = traffic_record.port
         body['protocol'] = traffic_record.traffic_type
         body['error'] = str(traffic_record.error)
+        body['stage'] = traffic_record.stage
+        body['denial'] = traffic_record.denial
+        body['latency'] = traffic_record.latency
+        body['connect_time'] = traffic_record.connect_time
+        body['first_byte_time'] = traffic_record.first_byte_time
+        body['attempts'] = traffic_record.attempts
+        body['payload_size'] = traffic_record.payload_size
+        for field in TCP_INFO_FIELDS + TLS_FIELDS:
+            value = getattr(traffic_record, field, None)
+            if value is not None:
+                body[field] = value
         body['connected'] = \
             'true' if traffic_record.connected else 'false'
         body['created'] = traffic_record.created
@@ -54,10 +66,33 @@ class ElasticSearchClient(object):
         body['result'] = 1 if traffic_record.success else 0
         self.send(body)
 
-    def create_latency_stats(self, latency_sum, samples, created):
+    def create_metric_record(self, record):
+        body = {"datacenter": conf.TESTBED_NAME,
+                "test_id": conf.TEST_ID, "type": "metric",
+                'timestamp': time.time()}
+        body['src'] = record.src
+        body['dst'] = record.dst
+        body['port'] = record.port
+        body['metric_type'] = record.metric_type
+        body['metrics'] = record.metrics
+        ports = getattr(record, 'ports', None)
+        if ports:
+            body['ports'] = ports
+        body['created'] = record.created
+        body['source'] = conf.WAVEFRONT_SOURCE_TAG
+        self.send(body)
+
+    def create_latency_stats(self, latency_sum, samples, created,
+                             phase_stats=None):
         body = {"datacenter": conf.TESTBED_NAME,
                 "test_id": conf.TEST_ID, "type": "latency",
                 'timestamp': time.time()}
         body["result"]  = 0 if not samples else (latency_sum / samples)
+        phase_stats = phase_stats or {}
+        for phase in ('connect', 'first_byte'):
+            phase_samples = phase_stats.get(phase + '_samples')
+            body[phase] = 0 if not phase_samples else \
+                phase_stats[phase + '_sum'] / phase_samples
+        body['retried'] = phase_stats.get('retried', 0)
         body['source'] = conf.WAVEFRONT_SOURCE_TAG
         self.send(body)
\ No newline at end of file
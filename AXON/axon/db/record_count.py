@@ -20,8 +20,15 @@ class RecordCountHandler(Thread):
             lambda: {'success': 0, 'failure': 0})
         self._latency_sum = 0
         self._samples = 0
+        self._reset_phase_stats()
         self._last_updated_time = time.time()
 
+    def _reset_phase_stats(self):
+        self._phase_stats = {
+            'connect_sum': 0.0, 'connect_samples': 0,
+            'first_byte_sum': 0.0, 'first_byte_samples': 0,
+            'retried': 0}
+
     def _create_record_count(self, *args, **kwargs):
         raise NotImplementedError()
 
@@ -42,8 +49,15 @@ class RecordCountHandler(Thread):
             self._proto_record_count[t_record.traffic_type]['success'] += 1
             self._latency_sum += t_record.latency
             self._samples += 1
+            for phase in ('connect', 'first_byte'):
+                phase_time = getattr(t_record, phase + '_time', None)
+                if phase_time is not None:
+                    self._phase_stats[phase + '_sum'] += phase_time
+                    self._phase_stats[phase + '_samples'] += 1
         else:
             self._proto_record_count[t_record.traffic_type]['failure'] += 1
+        if getattr(t_record, 'attempts', 1) > 1:
+            self._phase_stats['retried'] += 1
         if time.time() - self._last_updated_time >= \
                 conf.RECORD_COUNT_UPDATER_SLEEP_INTERVAL:
             self._create_record_count()
@@ -73,9 +87,11 @@ class SqlRecordCountHandler(RecordCountHandler):
         created = time.time()
         with session_scope() as _session:
             self._repositery.create_latency_stats(
-                _session, self._latency_sum, self._samples, created)
+                _session, self._latency_sum, self._samples, created,
+                **self._phase_stats)
         self._latency_sum = 0
         self._samples = 0
+        self._reset_phase_stats()
 
 
 class WavefrontRecordCountHandler(RecordCountHandler):
@@ -93,9 +109,11 @@ class WavefrontRecordCountHandler(RecordCountHandler):
         created = time.time()
         if self._samples > 0:
             self._wf_client.create_latency_stats(
-                self._latency_sum, self._samples, created)
+                self._latency_sum, self._samples, created,
+                self._phase_stats)
             self._latency_sum = 0
             self._samples = 0
+            self._reset_phase_stats()
 
 
 class ElasticSearchRecordCountHandler(RecordCountHandler):
@@ -114,6 +132,8 @@ class ElasticSearchRecordCountHandler(RecordCountHandler):
         created = time.time()
         if self._samples > 0:
             self._es_client.create_latency_stats(
-                self._latency_sum, self._samples, created)
+                self._latency_sum, self._samples, created,
+                self._phase_stats)
             self._latency_sum = 0
             self._samples = 0
+            self._reset_phase_stats()
@@ -14,6 +14,7 @@ from axon.db.wavefront.wavefront_client import WavefrontClient
 from axon.db.record_count import SqlRecordCountHandler, \
     WavefrontRecordCountHandler, ElasticSearchRecordCountHandler
 from axon.db.record import ResourceRecord
+from axon.traffic.resources import MetricRecord
 
 
 class RecordHandler(object):
@@ -27,6 +28,8 @@ class RecordHandler(object):
     def write(self, record):
         if isinstance(record, ResourceRecord):
             self.record_resource(record)
+        elif isinstance(record, MetricRecord):
+            self.record_metric(record)
         else:
             self.record_traffic(record)
 
@@ -40,6 +43,9 @@ class RecordHandler(object):
             self.log.warn(msg)
             self._warned = True
 
+    def record_metric(self, record):
+        pass
+
 
 class StreamRecorder(RecordHandler):
     def record_traffic(self, record):
@@ -49,6 +55,12 @@ class StreamRecorder(RecordHandler):
                           record.dst, record.latency,
                           record.success, record.error))
 
+    def record_metric(self, record):
+        print(
+            "Metric:%s Source:%s Destination:%s Port:%s Metrics:%s" % (
+                record.metric_type, record.src, record.dst, record.port,
+                record.metrics))
+
 
 class LogFileRecorder(RecordHandler):
     def __init__(self, log_file):
@@ -72,6 +84,12 @@ class LogFileRecorder(RecordHandler):
                           record.dst, record.latency,
                           record.success, record.error))
 
+    def record_metric(self, record):
+        self.log.info(
+            "Metric:%s Source:%s Destination:%s Port:%s Metrics:%s" % (
+                record.metric_type, record.src, record.dst, record.port,
+                record.metrics))
+
 
 class SqlDbRecorder(RecordHandler):
     log = logging.getLogger(__name__)
@@ -91,6 +109,15 @@ class SqlDbRecorder(RecordHandler):
             self.log.exception(
                 "Exception %s happened during recording traffic" % e)
 
+    def record_metric(self, record):
+        try:
+            with session_scope() as _session:
+                self._repositery.create_metric_records(
+                    _session, **record.as_dict())
+        except Exception as e:
+            self.log.exception(
+                "Exception %s happened during recording metrics" % e)
+
 
 class WaveFrontRecorder(RecordHandler):
     log = logging.getLogger(__name__)
@@ -108,6 +135,9 @@ class WaveFrontRecorder(RecordHandler):
     def record_resource(self, record):
         self._wf_client.create_resource_record(record)
 
+    def record_metric(self, record):
+        self._wf_client.create_metric_record(record)
+
 
 class ElasticSearchRecorder(RecordHandler):
     log = logging.getLogger(__name__)
@@ -125,3 +155,5 @@ class ElasticSearchRecorder(RecordHandler):
     def record_resource(self, record):
         pass
 
+    def record_metric(self, record):
+        self._es_client.create_metric_record(record)
@@ -8,7 +8,7 @@ from axon.db.sql.base import BaseModel
 
 from sqlalchemy import Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, Boolean, Float, Integer
+from sqlalchemy import Column, String, Boolean, Float, Integer, Text
 
 
 Base = declarative_base(cls=BaseModel)
@@ -30,6 +30,17 @@ class TrafficRecord(Base):
     type = Column(String(10))
     created = Column(Float())
     connected = Column(Boolean())
+    denial = Column(String(12))
+    connect_time = Column(Float())
+    first_byte_time = Column(Float())
+    attempts = Column(Integer())
+    payload_size = Column(Integer())
+    tcp_rtt = Column(Float())
+    tcp_rttvar = Column(Float())
+    tcp_retransmits = Column(Integer())
+    tcp_cwnd = Column(Integer())
+    tls_handshake_time = Column(Float())
+    tls_resumed = Column(Boolean())
 
     FIELDS = {
         'src': str,
@@ -38,6 +49,17 @@ class TrafficRecord(Base):
         'latency': float,
         'type': str,
         'created': int,
+        'denial': str,
+        'connect_time': float,
+        'first_byte_time': float,
+        'attempts': int,
+        'payload_size': int,
+        'tcp_rtt': float,
+        'tcp_rttvar': float,
+        'tcp_retransmits': int,
+        'tcp_cwnd': int,
+        'tls_handshake_time': float,
+        'tls_resumed': bool,
     }
 
     FIELDS.update(Base.FIELDS)
@@ -50,6 +72,11 @@ class LatencyStats(Base):
     created = Column(Float())
     latency_sum = Column(Integer())
     samples = Column(Integer())
+    connect_sum = Column(Float())
+    connect_samples = Column(Integer())
+    first_byte_sum = Column(Float())
+    first_byte_samples = Column(Integer())
+    retried = Column(Integer())
 
 
 class RequestCount(Base):
@@ -82,6 +109,14 @@ class Fault(Base):
     type = Column(String(10))
     created = Column(Float())
     connected = Column(Boolean())
+    stage = Column(String(10))
+    denial = Column(String(12))
+    attempts = Column(Integer())
+    payload_size = Column(Integer())
+    tcp_rtt = Column(Float())
+    tcp_rttvar = Column(Float())
+    tcp_retransmits = Column(Integer())
+    tcp_cwnd = Column(Integer())
 
     FIELDS = {
         'src': str,
@@ -90,8 +125,70 @@ class Fault(Base):
         'error': str,
         'type': str,
         'created': int,
-        'connected': bool
+        'connected': bool,
+        'stage': str,
+        'denial': str,
+        'attempts': int,
+        'payload_size': int,
+        'tcp_rtt': float,
+        'tcp_rttvar': float,
+        'tcp_retransmits': int,
+        'tcp_cwnd': int
+    }
+
+    FIELDS.update(Base.FIELDS)
+
+
+class TrafficMetric(Base):
+    __tablename__ = 'trafficmetric'
+    __table_args__ = (
+        Index('metric_created_idx', 'created'),
+        Index('metric_name_idx', 'type', 'name'))
 
+    id = Column(String(36), primary_key=True)
+    src = Column(String(36))
+    dst = Column(String(36))
+    port = Column(Integer())
+    type = Column(String(10))
+    name = Column(String(36))
+    value = Column(Float())
+    created = Column(Float())
+
+    FIELDS = {
+        'src': str,
+        'dst': str,
+        'port': int,
+        'type': str,
+        'name': str,
+        'value': float,
+        'created': float,
+    }
+
+    FIELDS.update(Base.FIELDS)
+
+
+class PortSweep(Base):
+    __tablename__ = 'portsweep'
+    __table_args__ = (
+        Index('sweep_created_idx', 'created'),)
+
+    id = Column(String(36), primary_key=True)
+    src = Column(String(36))
+    dst = Column(String(36))
+    port = Column(Integer())
+    ranges = Column(Text())
+    open = Column(Text())
+    refused = Column(Text())
+    created = Column(Float())
+
+    FIELDS = {
+        'src': str,
+        'dst': str,
+        'port': int,
+        'ranges': str,
+        'open': str,
+        'refused': str,
+        'created': float,
     }
 
     FIELDS.update(Base.FIELDS)
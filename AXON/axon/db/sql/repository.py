@@ -67,11 +67,19 @@ class Repositories(object):
         self.request_count = RequestCountRepository()
         self.latency = LatencyStatsRepository()
         self.fault = FaultRepository()
-
-    def create_latency_stats(self, session, latency_sum, samples, created):
+        self.metric = TrafficMetricRepository()
+        self.port_sweep = PortSweepRepository()
+
+    def create_latency_stats(self, session, latency_sum, samples, created,
+                             **phase_stats):
+        """
+        :param phase_stats: sums and samples of the connect and first byte
+                            phases and the number of retried requests
+        """
         id = str(uuid.uuid4())
         record = amodels.LatencyStats(id=id, latency_sum=latency_sum,
-                                      samples=samples, created=created)
+                                      samples=samples, created=created,
+                                      **phase_stats)
         session.add(record)
 
     def create_record_count(self, session, proto, success, failure, created):
@@ -85,13 +93,31 @@ class Repositories(object):
             traffic_dict['id'] = str(uuid.uuid4())
         if traffic_dict.get('success'):
             del traffic_dict['error']
+            traffic_dict.pop('stage', None)
             record = amodels.TrafficRecord(**traffic_dict)
         else:
             del traffic_dict['latency']
             del traffic_dict['success']
+            traffic_dict.pop('connect_time', None)
+            traffic_dict.pop('first_byte_time', None)
+            traffic_dict.pop('tls_handshake_time', None)
+            traffic_dict.pop('tls_resumed', None)
             record = amodels.Fault(**traffic_dict)
         session.add(record)
 
+    def create_metric_records(self, session, **metric_dict):
+        metrics = metric_dict.pop('metrics')
+        ports = metric_dict.pop('ports', None)
+        if ports:
+            session.add(amodels.PortSweep(
+                id=str(uuid.uuid4()), src=metric_dict['src'],
+                dst=metric_dict['dst'], port=metric_dict['port'],
+                created=metric_dict['created'], **ports))
+        for name, value in metrics.items():
+            record = amodels.TrafficMetric(
+                id=str(uuid.uuid4()), name=name, value=value, **metric_dict)
+            session.add(record)
+
     def create_connected_state(self, session, **cs_dict):
         if not cs_dict.get('id'):
             cs_dict['id'] = str(uuid.uuid4())
@@ -137,6 +163,14 @@ class FaultRepository(TrafficRecordsRepositery):
     model_class = amodels.Fault
 
 
+class TrafficMetricRepository(TrafficRecordsRepositery):
+    model_class = amodels.TrafficMetric
+
+
+class PortSweepRepository(BaseRepository):
+    model_class = amodels.PortSweep
+
+
 class LatencyStatsRepository(BaseRepository):
     model_class = amodels.LatencyStats
 
@@ -150,6 +184,33 @@ class LatencyStatsRepository(BaseRepository):
         avg_latency = 0 if not result[1] else result[0] / result[1]
         return avg_latency
 
+    def get_phase_latency_stats(self, session, start_time, end_time):
+        """
+        Get the average latency of each phase of the requests
+        :return: average total, connect and first byte latency and the
+                 number of retried requests
+        :rtype: dict
+        """
+        model = self.model_class
+        query = session.query(
+            func.sum(model.latency_sum), func.sum(model.samples),
+            func.sum(model.connect_sum), func.sum(model.connect_samples),
+            func.sum(model.first_byte_sum),
+            func.sum(model.first_byte_samples),
+            func.sum(model.retried)).filter(
+                model.created.between(start_time, end_time))
+        result = query.all()[0]
+
+        def average(total, samples):
+            return 0 if not samples else total / samples
+
+        return {
+            'total': average(result[0], result[1]),
+            'connect': average(result[2], result[3]),
+            'first_byte': average(result[4], result[5]),
+            'retried': result[6] or 0,
+        }
+
 
 class RequestCountRepository(BaseRepository):
     model_class = amodels.RequestCount
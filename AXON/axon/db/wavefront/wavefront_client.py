@@ -5,6 +5,7 @@ from wavefront_sdk import WavefrontDirectClient, WavefrontProxyClient
 from wavefront_sdk.common import metric_to_line_data
 
 from axon.common import config as conf
+from axon.traffic.resources import TCP_INFO_FIELDS, TLS_FIELDS
 
 METRIC_PRIFIX = 'axon.traffic.'
 
@@ -30,6 +31,14 @@ class TrafficRecord(object):
             tags['port'] = str(self._traffic_record.port)
             tags['protocol'] = self._traffic_record.traffic_type
             tags['error'] = str(self._traffic_record.error)
+            if self._traffic_record.stage:
+                tags['stage'] = self._traffic_record.stage
+            if self._traffic_record.denial:
+                tags['denial'] = self._traffic_record.denial
+            if self._traffic_record.attempts > 1:
+                tags['attempts'] = str(self._traffic_record.attempts)
+            if self._traffic_record.payload_size:
+                tags['payload_size'] = str(self._traffic_record.payload_size)
             tags['connected'] = \
                 'true' if self._traffic_record.connected else 'false'
             tags['created'] = datetime.datetime.fromtimestamp(
@@ -38,6 +47,13 @@ class TrafficRecord(object):
                 name=metric, value=val,
                 timestamp=self._traffic_record.created,
                 source=tags['src'], tags=tags)
+            for field in TCP_INFO_FIELDS + TLS_FIELDS:
+                value = getattr(self._traffic_record, field, None)
+                if value is not None:
+                    self._client.send_metric(
+                        name=METRIC_PRIFIX + field, value=value,
+                        timestamp=self._traffic_record.created,
+                        source=tags['src'], tags=tags)
 
     def report_to_wavefront(self):
         return random.random() <= conf.WAVEFRONT_REPORT_PERC
@@ -94,11 +110,13 @@ class LatencyStats(object):
 
     METRIC = METRIC_PRIFIX + 'avg_latency'
 
-    def __init__(self, client, latency_sum, samples, created_time):
+    def __init__(self, client, latency_sum, samples, created_time,
+                 phase_stats=None):
         self._client = client
         self._latency_sum = latency_sum
         self._samples = samples
         self._created_time = created_time
+        self._phase_stats = phase_stats or {}
 
     def save(self):
         avg_latency = 0 if not self._samples else \
@@ -109,6 +127,20 @@ class LatencyStats(object):
             name=self.METRIC, value=avg_latency,
             timestamp=self._created_time,
             source=conf.WAVEFRONT_SOURCE_TAG, tags=tags)
+        for phase in ('connect', 'first_byte'):
+            samples = self._phase_stats.get(phase + '_samples')
+            if samples:
+                self._client.send_metric(
+                    name=self.METRIC + '.' + phase,
+                    value=self._phase_stats[phase + '_sum'] / samples,
+                    timestamp=self._created_time,
+                    source=conf.WAVEFRONT_SOURCE_TAG, tags=tags)
+        if 'retried' in self._phase_stats:
+            self._client.send_metric(
+                name=METRIC_PRIFIX + 'retried',
+                value=self._phase_stats['retried'],
+                timestamp=self._created_time,
+                source=conf.WAVEFRONT_SOURCE_TAG, tags=tags)
 
 
 class WavefrontClient(object):
@@ -141,7 +173,22 @@ class WavefrontClient(object):
                     timestamp=record.timestamp,
                     source=conf.WAVEFRONT_SOURCE_TAG, tags=tags)
 
-    def create_latency_stats(self, latency_sum, samples, created):
+    def create_metric_record(self, record):
+        prefix = METRIC_PRIFIX + record.metric_type.lower() + '.'
+        tags = {"datacenter": conf.TESTBED_NAME,
+                "test_id": conf.TEST_ID,
+                "src": record.src}
+        if record.dst:
+            tags['dst'] = record.dst
+            tags['port'] = str(record.port)
+        for name, val in record.metrics.items():
+            self._client.send_metric(
+                name=prefix + name, value=val,
+                timestamp=record.created,
+                source=record.src, tags=tags)
+
+    def create_latency_stats(self, latency_sum, samples, created,
+                             phase_stats=None):
         latency_stats = LatencyStats(
-            self._client, latency_sum, samples, created)
+            self._client, latency_sum, samples, created, phase_stats)
         latency_stats.save()
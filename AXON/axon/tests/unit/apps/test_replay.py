@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+'''
+Unit test for Replay app.
+'''
+import mock
+import os
+import struct
+import tempfile
+import unittest
+
+from axon.apps.replay import Replay, ReplayRerunError
+
+
+class TestReplayApp(unittest.TestCase):
+
+    def setUp(self):
+        super(TestReplayApp, self).setUp()
+        self._app = Replay()
+        handle, self._path = tempfile.mkstemp(suffix='.pcap')
+        # an empty capture of ethernet frames
+        os.write(handle, struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0,
+                                     65535, 1))
+        os.close(handle)
+        self.addCleanup(os.remove, self._path)
+        self.addCleanup(self._app.stop)
+
+    def test_replay(self):
+        self._app.start_replay(self._path, speed=2)
+        self._app._replays[self._path][1].join(5)
+        self.assertFalse(self._app.is_running(self._path))
+        report = self._app.get_report(self._path)
+        self.assertEqual((0, 2.0), (report['packets'], report['speed']))
+
+    @mock.patch.object(Replay, 'is_running', return_value=True)
+    def test_replay_rerun(self, mock_running):
+        self.assertRaises(ReplayRerunError, self._app.start_replay,
+                          self._path)
+
+    def test_replay_missing_file(self):
+        self.assertRaises(IOError, self._app.start_replay,
+                          'no-such-file.pcap')
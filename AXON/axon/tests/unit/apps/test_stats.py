@@ -8,7 +8,8 @@ import mock
 import time
 
 from axon.apps.stats import StatsApp
-from axon.db.sql.repository import TrafficRecordsRepositery
+from axon.db.sql.repository import TrafficRecordsRepositery, \
+    LatencyStatsRepository
 from axon.tests import base as test_base
 
 
@@ -55,6 +56,19 @@ class TestStatsApp(test_base.BaseTestCase):
         mock_rc.assert_called()
         self.assertEqual(10, result)
 
+    @mock.patch('axon.db.sql.analytics.session_scope')
+    @mock.patch.object(LatencyStatsRepository, 'get_phase_latency_stats')
+    def test_get_phase_latency(self, mock_stats, mock_session):
+        stats = {'total': 3.0, 'connect': 1.0, 'first_byte': 2.0,
+                 'retried': 0}
+        mock_stats.return_value = stats
+        mock_session.side_effect = None
+        start_time = time.time()
+        result = self._stats_app.get_phase_latency(
+            start_time=start_time, end_time=start_time + 10)
+        mock_stats.assert_called()
+        self.assertEqual(stats, result)
+
     @mock.patch('axon.db.sql.analytics.session_scope')
     @mock.patch.object(TrafficRecordsRepositery, 'get_records')
     def test_get_failures(self, mock_records, mock_session):
@@ -113,6 +113,14 @@ class TestTrafficApp(test_base.BaseTestCase):
         self._traffic_app.start_clients()
         mock_start.assert_called()
 
+    @mock.patch('axon.traffic.agents.AxonRootNamespaceClientAgent.'
+                'start_clients')
+    def test_scheduled_start_clients(self, mock_start):
+        self._traffic_app.start_clients(start_time=100, jitter=2)
+        start = mock_start.call_args[1]['start']
+        self.assertEqual(100, start.start_time)
+        self.assertTrue(100 <= start.target < 102)
+
     @mock.patch.object(ConnectedStateProcessor,
                        'create_or_update_connected_state')
     def test_register_traffic(self, mock_db_conn):
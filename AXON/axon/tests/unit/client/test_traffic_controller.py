@@ -19,6 +19,19 @@ class TestTrafficController(test_base.BaseTestCase):
         self.assertIn(('TCP', 12345),
                       self.traffic_record._servers)
 
+    def test_add_server_skips_serverless_protocols(self):
+        self.traffic_record.add_server('ICMP', 12345)
+        self.assertEqual([], self.traffic_record._servers)
+
+    def test_add_server_for_multicast_receivers(self):
+        self.traffic_record.add_server(
+            'UDP', 12345, {'mode': 'multicast', 'group': '239.1.2.3'})
+        self.traffic_record.add_server('UDP', 12345, {'mode': 'multicast'})
+        self.traffic_record.add_server('UDP', 80, {'mode': 'multicast'})
+        self.assertEqual(
+            [('MULTICAST', 12345, (('group', '239.1.2.3'),)),
+             ('MULTICAST', 80)], self.traffic_record._servers)
+
     def test_add_client(self):
         self.traffic_record.add_client('TCP', 12345,
                                        '2.2.3.4',
@@ -26,6 +39,14 @@ class TestTrafficController(test_base.BaseTestCase):
         self.assertIn(('TCP', 12345, '2.2.3.4', True, 'ALLOW'),
                       self.traffic_record._clients)
 
+    def test_add_client_with_options(self):
+        self.traffic_record.add_client('TCP', 12345, '2.2.3.4', True, 1,
+                                       {'mode': 'persistent'})
+        self.traffic_record.add_client('TCP', 12345, '2.2.3.4', True, 1)
+        self.assertEqual(
+            [('TCP', 12345, '2.2.3.4', True, 1, (('mode', 'persistent'),))],
+            self.traffic_record._clients)
+
     def test_as_dict(self):
         resp = self.traffic_record.as_dict()
         self.assertIn('servers', list(resp.keys()))
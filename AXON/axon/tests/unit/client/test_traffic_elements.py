@@ -103,3 +103,166 @@ class TestTrafficElements(test_base.BaseTestCase):
             pass
         except Exception as e:
             raise RuntimeError('Wrong exception is raised - %s' % e)
+
+    def test_invalid_mode_element(self):
+        self.assertRaises(InvalidRuleError, TrafficRule,
+                          Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                          Port(12345), Protocol.TCP, Connected.CONNECTED,
+                          Action.ALLOW, {'mode': 'FAKE_MODE'})
+
+    def test_persistent_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.TCP, Connected.CONNECTED,
+                           Action.ALLOW, {'mode': 'persistent'})
+        self.assertEqual('persistent', rule.options['mode'])
+        for protocol in (Protocol.UDP, Protocol.HTTP, Protocol.TLS):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, {'mode': 'persistent'})
+
+    def test_payload_size_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.UDP, Connected.CONNECTED,
+                           Action.ALLOW, {'payload_size': 1400})
+        self.assertEqual(((1400, 1.0),), rule.options['payload_size'])
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.UDP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'payload_size': [[64, 3], [9000, 1]]})
+        self.assertEqual(((64, 3.0), (9000, 1.0)),
+                         rule.options['payload_size'])
+
+    def test_invalid_payload_size_element(self):
+        for sizes in (0, 70000, [(64, 0)], [], 'FAKE_SIZE'):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), Protocol.UDP, Connected.CONNECTED,
+                              Action.ALLOW, {'payload_size': sizes})
+
+    def test_criticality_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.TCP, Connected.CONNECTED,
+                           Action.ALLOW, {'criticality': '2'})
+        self.assertEqual(2.0, rule.options['criticality'])
+        for criticality in (0, -1, 'FAKE_CRITICALITY'):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), Protocol.TCP, Connected.CONNECTED,
+                              Action.ALLOW, {'criticality': criticality})
+
+    def test_stream_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.TCP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'mode': 'stream', 'duration': '30', 'flows': 4})
+        self.assertEqual(30.0, rule.options['duration'])
+        self.assertEqual(4, rule.options['flows'])
+
+    def test_invalid_stream_element(self):
+        for protocol, options in ((Protocol.HTTP, {}),
+                                  (Protocol.TCP, {'flows': 0}),
+                                  (Protocol.UDP, {'bandwidth': 'FAKE'})):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, dict(options, mode='stream'))
+
+    def test_pipeline_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.TCP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'mode': 'pipeline', 'window': '8',
+                            'response_size': 0})
+        self.assertEqual(8, rule.options['window'])
+        self.assertEqual(0, rule.options['response_size'])
+        for protocol, options in ((Protocol.UDP, {}),
+                                  (Protocol.TCP, {'window': 0}),
+                                  (Protocol.TCP, {'response_size': 70000})):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, dict(options, mode='pipeline'))
+
+    def test_tls_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(443), Protocol.TLS, Connected.CONNECTED,
+                           Action.ALLOW, {'tls_resumption': False})
+        self.assertEqual(Protocol.TLS, rule.protocol)
+        self.assertFalse(rule.options['tls_resumption'])
+        self.assertRaises(InvalidRuleError, TrafficRule,
+                          Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                          Port(443), Protocol.TLS, Connected.CONNECTED,
+                          Action.ALLOW, {'mode': 'stream'})
+
+    def test_cps_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.UDP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'mode': 'cps', 'rate': '5000',
+                            'source_ports': '20000-29999'})
+        self.assertEqual(5000.0, rule.options['rate'])
+        self.assertEqual((20000, 29999), rule.options['source_ports'])
+        for protocol, options in ((Protocol.HTTP, {}),
+                                  (Protocol.TCP, {'concurrency': 0}),
+                                  (Protocol.TCP, {'source_ports': '2-1'}),
+                                  (Protocol.TCP, {'source_ports': [1]})):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, dict(options, mode='cps'))
+
+    def test_hold_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.TCP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'mode': 'hold', 'connections': '10000',
+                            'heartbeat': 60})
+        self.assertEqual(10000, rule.options['connections'])
+        self.assertEqual(60.0, rule.options['heartbeat'])
+        for protocol, options in ((Protocol.UDP, {}),
+                                  (Protocol.TCP, {'connections': 0}),
+                                  (Protocol.TCP, {'heartbeat': 'FAKE'})):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, dict(options, mode='hold'))
+
+    def test_sweep_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.TCP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'mode': 'sweep', 'ports': '1-1024, 8080',
+                            'expect_open': [22, [80, 81]],
+                            'timeout': '0.5'})
+        self.assertEqual(((1, 1024), (8080, 8080)), rule.options['ports'])
+        self.assertEqual(((22, 22), (80, 81)), rule.options['expect_open'])
+        self.assertEqual(0.5, rule.options['timeout'])
+        for protocol, options in ((Protocol.UDP, {}),
+                                  (Protocol.TCP, {'ports': '0-10'}),
+                                  (Protocol.TCP, {'ports': '20-10'}),
+                                  (Protocol.TCP, {'ports': 'FAKE'}),
+                                  (Protocol.TCP, {'concurrency': 0})):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, dict(options, mode='sweep'))
+
+    def test_multicast_element(self):
+        rule = TrafficRule(Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                           Port(12345), Protocol.UDP, Connected.CONNECTED,
+                           Action.ALLOW,
+                           {'mode': 'multicast', 'group': 'FF15::1',
+                            'interval': '0.5', 'ttl': '4'})
+        self.assertEqual('ff15::1', rule.options['group'])
+        self.assertEqual(0.5, rule.options['interval'])
+        self.assertEqual(4, rule.options['ttl'])
+        for protocol, options in ((Protocol.TCP, {}),
+                                  (Protocol.UDP, {'group': '10.0.0.1'}),
+                                  (Protocol.UDP, {'group': 'FAKE'}),
+                                  (Protocol.UDP, {'interval': 0}),
+                                  (Protocol.UDP, {'ttl': 256})):
+            self.assertRaises(InvalidRuleError, TrafficRule,
+                              Endpoint('1.2.3.4'), Endpoint('2.3.4.5'),
+                              Port(12345), protocol, Connected.CONNECTED,
+                              Action.ALLOW, dict(options, mode='multicast'))
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import fixtures
+import socket
+import threading
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.clients.async_clients import AsyncTrafficClient
+from axon.traffic.resources import MetricRecord, ScheduleRecord, \
+    ConnectionRecord, UDPProbeRecord
+from axon.traffic.servers.servers import ThreadedTCPServer, \
+    ThreadedUDPServer, ThreadedHTTPServer, ThreadedTLSServer, \
+    TCPRequestHandler, UDPRequestHandler, HTTPRequestHandler, \
+    TLSRequestHandler
+
+
+def _start_server(server_class, handler):
+    server = server_class(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.run)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+class _OneShotRequestHandler(TCPRequestHandler):
+    """
+    Echoes a single request and closes the connection
+    """
+
+    def handle(self):
+        self.request.sendall(self.request.recv(1024))
+
+
+class _FlappingRequestHandler(TCPRequestHandler):
+    """
+    Closes the first connection without a reply and echoes afterwards
+    """
+    connections = 0
+
+    def handle(self):
+        _FlappingRequestHandler.connections += 1
+        if _FlappingRequestHandler.connections > 1:
+            super(_FlappingRequestHandler, self).handle()
+
+
+def _closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestAsyncTrafficClient(test_base.BaseTestCase):
+    """
+    Test for AsyncTrafficClient against servers on loopback
+    """
+
+    def setUp(self):
+        super(TestAsyncTrafficClient, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _send_traffic(self, destinations, **kwargs):
+        record_queue = queue.Queue()
+        client = AsyncTrafficClient('127.0.0.1', destinations, record_queue,
+                                    request_rate=100, **kwargs)
+        self.loop.run_until_complete(client._run(count=len(destinations)))
+        records = []
+        while not record_queue.empty():
+            records.append(record_queue.get())
+        self.schedule = [record for record in records
+                         if isinstance(record, ScheduleRecord)]
+        self.connections = [record for record in records
+                            if isinstance(record, ConnectionRecord)]
+        self.probes = [record for record in records
+                       if isinstance(record, UDPProbeRecord)]
+        return [record for record in records
+                if not isinstance(record, MetricRecord)]
+
+    def _assert_success(self, server_class, handler, protocol):
+        server = _start_server(server_class, handler)
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        records = self._send_traffic(
+            [(protocol, port, '127.0.0.1', True, 1)] * 3)
+        self.assertEqual(3, len(records))
+        for record in records:
+            self.assertEqual(protocol, record.traffic_type)
+            self.assertTrue(record.success, record.error)
+
+    def test_tcp_traffic(self):
+        self._assert_success(ThreadedTCPServer, TCPRequestHandler, 'TCP')
+
+    def test_tcp_traffic_phases(self):
+        server = _start_server(ThreadedTCPServer, TCPRequestHandler)
+        self.addCleanup(server.stop)
+        records = self._send_traffic(
+            [('TCP', server.server_address[1], '127.0.0.1', True, 1)])
+        record = records[0]
+        self.assertEqual(1, record.attempts)
+        self.assertGreater(record.connect_time, 0)
+        self.assertGreater(record.first_byte_time, 0)
+        self.assertGreaterEqual(
+            record.latency, record.connect_time + record.first_byte_time)
+
+    def test_tcp_large_payload(self):
+        server = _start_server(ThreadedTCPServer, TCPRequestHandler)
+        self.addCleanup(server.stop)
+        options = (('payload_size', ((60000, 1),)),)
+        records = self._send_traffic(
+            [('TCP', server.server_address[1], '127.0.0.1', True, 1,
+              options)] * 2)
+        for record in records:
+            self.assertTrue(record.success, record.error)
+            self.assertEqual(60000, record.payload_size)
+
+    def test_tls_session_resumed(self):
+        cert_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.MockPatch(
+            'axon.common.config.TLS_CERT_DIR', cert_dir))
+        server = _start_server(ThreadedTLSServer, TLSRequestHandler)
+        self.addCleanup(server.stop)
+        options = (('payload_size', ((60000, 1),)),)
+        destination = ('TLS', server.server_address[1], '127.0.0.1', True, 1,
+                       options)
+        record_queue = queue.Queue()
+        client = AsyncTrafficClient('127.0.0.1', [destination], record_queue)
+        for _ in range(2):
+            self.loop.run_until_complete(client._run(count=1))
+        records = []
+        while not record_queue.empty():
+            record = record_queue.get()
+            if not isinstance(record, MetricRecord):
+                records.append(record)
+        self.assertEqual(2, len(records))
+        for record in records:
+            self.assertTrue(record.success, record.error)
+            self.assertEqual(60000, record.payload_size)
+            self.assertGreater(record.tls_handshake_time, 0)
+        self.assertEqual([False, True],
+                         [record.tls_resumed for record in records])
+
+    def test_udp_payload_sizes(self):
+        server = _start_server(ThreadedUDPServer, UDPRequestHandler)
+        self.addCleanup(server.stop)
+        options = (('payload_size', ((8, 1), (9000, 1))),)
+        records = self._send_traffic(
+            [('UDP', server.server_address[1], '127.0.0.1', True, 1,
+              options)] * 10)
+        for record in records:
+            self.assertTrue(record.success, record.error)
+            # probes are padded to at least their header
+            self.assertIn(record.payload_size, (16, 9000))
+
+    def test_udp_traffic(self):
+        self._assert_success(ThreadedUDPServer, UDPRequestHandler, 'UDP')
+
+    def test_udp_probes_reported(self):
+        self._assert_success(ThreadedUDPServer, UDPRequestHandler, 'UDP')
+        metrics = self.probes[0].metrics
+        self.assertEqual(3, metrics['received'])
+        self.assertEqual(0, metrics['loss'])
+
+    def test_http_traffic(self):
+        self._assert_success(ThreadedHTTPServer, HTTPRequestHandler, 'HTTP')
+
+    def test_tcp_traffic_refused(self):
+        port = _closed_port()
+        records = self._send_traffic([('TCP', port, '127.0.0.1', True, 1)])
+        self.assertEqual(1, len(records))
+        self.assertFalse(records[0].success)
+        self.assertIsNotNone(records[0].error)
+        self.assertEqual('connect', records[0].stage)
+
+    def test_tcp_persistent_traffic(self):
+        server = _start_server(ThreadedTCPServer, TCPRequestHandler)
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        options = (('mode', 'persistent'),)
+        records = self._send_traffic(
+            [('TCP', port, '127.0.0.1', True, 1, options)] * 5)
+        self.assertEqual(5, len(records))
+        for record in records:
+            self.assertTrue(record.success, record.error)
+        self.assertEqual(
+            {'connections': 1, 'connected': 1, 'reconnects': 0},
+            self.connections[0].metrics)
+
+    def test_tcp_pipelined_traffic(self):
+        server = _start_server(ThreadedTCPServer, TCPRequestHandler)
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        options = (('mode', 'pipeline'), ('response_size', 1000),
+                   ('window', 4))
+        records = self._send_traffic(
+            [('TCP', port, '127.0.0.1', True, 1, options)] * 20)
+        self.assertEqual(20, len(records))
+        for record in records:
+            self.assertTrue(record.success, record.error)
+            self.assertGreater(record.first_byte_time, 0)
+        self.assertEqual(1, len([record for record in records
+                                 if record.connect_time is not None]))
+        self.assertEqual(
+            {'pipelined_connections': 1, 'pipelined_connected': 1,
+             'pipelined_reconnects': 0},
+            self.connections[0].metrics)
+
+    def test_tcp_info_recorded(self):
+        server = _start_server(ThreadedTCPServer, TCPRequestHandler)
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        records = self._send_traffic(
+            [('TCP', port, '127.0.0.1', True, 1, (('tcp_info', True),)),
+             ('TCP', port, '127.0.0.1', True, 1)])
+        self.assertIsNotNone(records[0].tcp_rtt)
+        self.assertEqual(0, records[0].tcp_retransmits)
+        self.assertGreater(records[0].tcp_cwnd, 0)
+        self.assertIsNone(records[1].tcp_rtt)
+
+    def test_tcp_persistent_traffic_reconnects(self):
+        server = _start_server(ThreadedTCPServer, _OneShotRequestHandler)
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        options = (('mode', 'persistent'),)
+        records = self._send_traffic(
+            [('TCP', port, '127.0.0.1', True, 1, options)] * 4)
+        results = [(record.success, record.stage) for record in records]
+        self.assertEqual([(True, None), (False, 'exchange')] * 2, results)
+        self.assertEqual(1, self.connections[0].metrics['reconnects'])
+
+    def test_http_keep_alive_traffic(self):
+        server = _start_server(ThreadedHTTPServer, HTTPRequestHandler)
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        records = self._send_traffic(
+            [('HTTP', port, '127.0.0.1', True, 1)] * 5)
+        for record in records:
+            self.assertTrue(record.success, record.error)
+        # requests over reused connections have no handshake
+        connects = [record.connect_time for record in records
+                    if record.connect_time is not None]
+        metrics = self.connections[0].metrics
+        self.assertEqual(metrics['http_opened'], len(connects))
+        self.assertEqual(5, metrics['http_opened'] + metrics['http_reused'])
+        self.assertGreater(metrics['http_reused'], 0)
+
+    def test_tcp_traffic_refused_for_drop_rule(self):
+        port = _closed_port()
+        records = self._send_traffic([('TCP', port, '127.0.0.1', True, 0)])
+        self.assertTrue(records[0].success)
+        self.assertEqual('reset', records[0].denial)
+
+    def test_udp_traffic_unreachable_for_drop_rule(self):
+        port = _closed_port()
+        records = self._send_traffic([('UDP', port, '127.0.0.1', True, 0)])
+        self.assertTrue(records[0].success)
+        self.assertEqual('unreachable', records[0].denial)
+
+    def test_udp_traffic_dropped_for_disconnected_rule(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        self.addCleanup(sock.close)
+        records = self._send_traffic(
+            [('UDP', sock.getsockname()[1], '127.0.0.1', False, 1)])
+        self.assertTrue(records[0].success)
+        self.assertEqual('drop', records[0].denial)
+        # negative probes use the short timeout and aren't retried
+        self.assertLess(records[0].latency, 2000)
+
+    def test_tcp_retry_recorded_as_attempt(self):
+        self.useFixture(fixtures.MockPatch(
+            'axon.common.config.TRAFFIC_RETRY_BACKOFF', 0.05))
+        _FlappingRequestHandler.connections = 0
+        server = _start_server(ThreadedTCPServer, _FlappingRequestHandler)
+        self.addCleanup(server.stop)
+        records = self._send_traffic(
+            [('TCP', server.server_address[1], '127.0.0.1', True, 1)])
+        self.assertEqual(1, len(records))
+        self.assertTrue(records[0].success, records[0].error)
+        self.assertEqual(2, records[0].attempts)
+        self.assertEqual(1, self.schedule[0].metrics['retried'])
+        self.assertEqual(0, self.schedule[0].metrics['retry_pending'])
+
+    def test_invalid_protocol(self):
+        self.assertRaises(RuntimeError, self._send_traffic,
+                          [('FAKE', 12345, '127.0.0.1', True, 1)])
+
+    def test_schedule_reported(self):
+        port = _closed_port()
+        self._send_traffic([('TCP', port, '127.0.0.1', True, 0)] * 5,
+                           arrival_profile='poisson')
+        self.assertEqual(1, len(self.schedule))
+        metrics = self.schedule[0].metrics
+        self.assertEqual(5, metrics['sent'])
+        self.assertEqual(100, metrics['target_rate'])
+        self.assertGreater(metrics['achieved_rate'], 0)
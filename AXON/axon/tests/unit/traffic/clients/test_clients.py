@@ -4,11 +4,23 @@
 # The full license information can be found in LICENSE.txt
 # in the root directory of this project.
 
+import errno
+import fixtures
 import mock
 import multiprocessing as mp
+import socket
+import threading
+import time
 
 from axon.tests import base as test_base
-from axon.traffic.clients.clients import TrafficClient
+from axon.traffic.clients.clients import TrafficClient, TCPClient, \
+    UDPClient, HTTPClient, HTTPConnectionPool
+from axon.traffic.clients.scheduler import ScheduledStart
+from axon.traffic.resources import ScheduleRecord
+from axon.traffic.servers.servers import ThreadedTCPServer, \
+    ThreadedTLSServer, ThreadedUDPServer, ThreadedHTTPServer, \
+    TCPRequestHandler, TLSRequestHandler, UDPRequestHandler, \
+    HTTPRequestHandler
 
 
 class TestTCPClient(test_base.BaseTestCase):
@@ -25,7 +37,7 @@ class TestTCPClient(test_base.BaseTestCase):
             record_queue = mp.Queue(2)
             _traffic_client = TrafficClient(
                 source, destination, record_queue)
-            _traffic_client._send_traffic()
+            _traffic_client._send_traffic(count=1)
 
     @mock.patch('socket.socket')
     def test_udp_traffic_client(self, mock_socket):
@@ -36,4 +48,193 @@ class TestTCPClient(test_base.BaseTestCase):
             record_queue = mp.Queue(2)
             _traffic_client = TrafficClient(
                 source, destination, record_queue)
-            _traffic_client._send_traffic()
+            _traffic_client._send_traffic(count=1)
+
+    def test_negative_probe_timeout(self):
+        client = TCPClient('1.2.3.4', '1.2.3.5', 12345, None, action=0)
+        self.assertTrue(client.negative)
+        self.assertEqual(1, client._timeout)
+        client = TCPClient('1.2.3.4', '1.2.3.5', 12345, None)
+        self.assertFalse(client.negative)
+        self.assertEqual(5, client._timeout)
+
+    def test_classify_denial(self):
+        refused = OSError(errno.ECONNREFUSED, 'Connection refused')
+        unreachable = OSError(errno.EHOSTUNREACH, 'No route to host')
+        tcp_client = TCPClient('1.2.3.4', '1.2.3.5', 12345, None)
+        udp_client = UDPClient('1.2.3.4', '1.2.3.5', 12345, None)
+        self.assertEqual('reset', tcp_client._classify_denial(refused))
+        self.assertEqual('unreachable', udp_client._classify_denial(refused))
+        self.assertEqual('unreachable',
+                         tcp_client._classify_denial(unreachable))
+        self.assertEqual('drop',
+                         tcp_client._classify_denial(socket.timeout()))
+        self.assertIsNone(tcp_client._classify_denial(Exception('failed')))
+
+    def test_udp_kernel_timestamps(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        client = UDPClient('1.2.3.4', '127.0.0.1', server.server_address[1],
+                           None, options={'timestamping': True})
+        client._start()
+        client._attempt(b'probe')
+        self.assertGreater(client._kernel_latency, 0)
+        self.assertEqual(client._kernel_latency, client._get_latency())
+
+    def test_tcp_retry_from_queue(self):
+        self.useFixture(fixtures.MockPatch(
+            'axon.common.config.TRAFFIC_RETRY_BACKOFF', 0.05))
+        connections = []
+
+        class FlappingRequestHandler(TCPRequestHandler):
+            def handle(self):
+                connections.append(self.client_address)
+                if len(connections) > 1:
+                    super(FlappingRequestHandler, self).handle()
+
+        server = ThreadedTCPServer(('127.0.0.1', 0), FlappingRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        record_queue = mp.Queue()
+        traffic_client = TrafficClient(
+            '1.2.3.4', [('TCP', server.server_address[1], '127.0.0.1',
+                         True, 1)], record_queue)
+        self.addCleanup(traffic_client._retries.stop)
+        traffic_client._send_traffic(count=1)
+        records = [record_queue.get(timeout=5) for _ in range(2)]
+        record = [record for record in records
+                  if not isinstance(record, ScheduleRecord)][0]
+        self.assertTrue(record.success, record.error)
+        self.assertEqual(2, record.attempts)
+
+    def test_traffic_client_schedule(self):
+        server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        record_queue = mp.Queue()
+        # 50 requests every 5 seconds
+        traffic_client = TrafficClient(
+            '1.2.3.4', [('TCP', server.server_address[1], '127.0.0.1',
+                         True, 1)] * 50, record_queue, request_rate=50)
+        start = time.time()
+        traffic_client._send_traffic(count=10)
+        # requests are spread over the 5 seconds instead of sent at once
+        self.assertGreater(time.time() - start, 0.8)
+        records = [record_queue.get(timeout=5) for _ in range(11)]
+        schedule = [record for record in records
+                    if isinstance(record, ScheduleRecord)][0].metrics
+        self.assertEqual((10, 10.0), (schedule['sent'],
+                                      schedule['target_rate']))
+        self.assertGreater(schedule['achieved_rate'], 5)
+        self.assertLess(schedule['lag_max'], 500)
+
+    def test_tcp_large_payload(self):
+        server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        record_queue = mp.Queue()
+        client = TCPClient('1.2.3.4', '127.0.0.1', server.server_address[1],
+                           record_queue, options={'payload_size': 60000})
+        client.ping()
+        record = record_queue.get(timeout=5)
+        self.assertTrue(record.success, record.error)
+        self.assertEqual(60000, record.payload_size)
+
+    def test_tls_session_resumed(self):
+        cert_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.MockPatch(
+            'axon.common.config.TLS_CERT_DIR', cert_dir))
+        server = ThreadedTLSServer(('127.0.0.1', 0), TLSRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        record_queue = mp.Queue()
+        port = server.server_address[1]
+        traffic_client = TrafficClient(
+            '1.2.3.4', [('TLS', port, '127.0.0.1', True, 1)], record_queue)
+        self.addCleanup(traffic_client._retries.stop)
+        records = []
+        for options in (None, None, {'tls_resumption': False}):
+            traffic_client._create_client(
+                'TLS', port, '127.0.0.1', True, 1, options).ping()
+            records.append(record_queue.get(timeout=5))
+        for record in records:
+            self.assertEqual('TLS', record.traffic_type)
+            self.assertTrue(record.success, record.error)
+            self.assertGreater(record.tls_handshake_time, 0)
+        self.assertEqual([False, True, False],
+                         [record.tls_resumed for record in records])
+
+    def test_scheduled_start_recorded(self):
+        record_queue = mp.Queue()
+        start = ScheduledStart(time.time() + 0.1)
+        traffic_client = TrafficClient(
+            '1.2.3.4', [('TCP', 12345, '1.2.3.5', True, 1)], record_queue,
+            start=start)
+        traffic_client._wait_for_start()
+        self.assertGreaterEqual(time.time(), start.target)
+        record = record_queue.get(timeout=5)
+        self.assertEqual('START', record.metric_type)
+        self.assertGreaterEqual(record.metrics['error'], 0)
+        self.assertLess(record.metrics['error'], 50)
+
+
+class TestHTTPConnectionPool(test_base.BaseTestCase):
+    """
+    Test for HTTPConnectionPool
+    """
+
+    def test_connection_reused(self):
+        pool = HTTPConnectionPool()
+        connection, reused = pool.acquire('1.2.3.5', 80)
+        self.assertFalse(reused)
+        pool.release('1.2.3.5', 80, connection)
+        self.assertEqual((connection, True), pool.acquire('1.2.3.5', 80))
+        self.assertEqual(
+            {'http_idle': 0, 'http_opened': 1, 'http_reused': 1},
+            pool.stats())
+
+    def test_pool_size_bounded(self):
+        pool = HTTPConnectionPool(max_size=1)
+        connections = [mock.Mock(), mock.Mock()]
+        for connection in connections:
+            pool.release('1.2.3.5', 80, connection)
+        connections[1].close.assert_called_once_with()
+        self.assertEqual(1, pool.stats()['http_idle'])
+
+    @mock.patch('time.time')
+    def test_idle_connection_evicted(self, mock_time):
+        pool = HTTPConnectionPool(idle_timeout=30)
+        connection = mock.Mock()
+        mock_time.return_value = 100
+        pool.release('1.2.3.5', 80, connection)
+        mock_time.return_value = 131
+        _, reused = pool.acquire('1.2.3.5', 80)
+        self.assertFalse(reused)
+        connection.close.assert_called_once_with()
+
+    def test_negative_probe_not_pooled(self):
+        server = ThreadedHTTPServer(('127.0.0.1', 0), HTTPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        pool = HTTPConnectionPool()
+        self.addCleanup(pool.close)
+        client = HTTPClient('1.2.3.4', '127.0.0.1', server.server_address[1],
+                            mp.Queue(), action=0)
+        client.pool = pool
+        client.ping()
+        self.assertEqual(
+            {'http_idle': 0, 'http_opened': 0, 'http_reused': 0},
+            pool.stats())
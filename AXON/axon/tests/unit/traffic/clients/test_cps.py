@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import multiprocessing as mp
+import socket
+import threading
+
+from axon.tests import base as test_base
+from axon.traffic.clients.clients import TrafficClient
+from axon.traffic.clients.cps import CPSMeter, Pacer, PortRange, \
+    TCPConnectionRate, UDPConnectionRate, create_cps, is_cps
+from axon.traffic.servers.servers import ThreadedTCPServer, \
+    ThreadedUDPServer, TCPRequestHandler, UDPRequestHandler
+
+
+def _client(protocol, port, **options):
+    options['mode'] = 'cps'
+    return (protocol, port, '127.0.0.1', True, 1,
+            tuple(sorted(options.items())))
+
+
+class TestCPSElements(test_base.BaseTestCase):
+
+    def test_port_range_rotates(self):
+        ports = PortRange(100, 102)
+        self.assertEqual([100, 101, 102, 100],
+                         [ports.next() for _ in range(4)])
+
+    def test_pacer(self):
+        pacer = Pacer(10, 0)
+        self.assertEqual(0, pacer.reserve(0))
+        self.assertAlmostEqual(.1, pacer.reserve(0))
+        # late flows start right away
+        self.assertEqual(5, pacer.reserve(5))
+        self.assertAlmostEqual(5.1, pacer.reserve(5))
+
+    def test_meter(self):
+        meter = CPSMeter()
+        for latency in range(1, 101):
+            meter.add(float(latency))
+        meter.fail()
+        metrics = meter.sample(2)
+        self.assertEqual(100, metrics['connections'])
+        self.assertEqual(50, metrics['cps'])
+        self.assertEqual(.5, metrics['failures_per_second'])
+        self.assertEqual(51, metrics['handshake_p50'])
+        self.assertEqual(100, metrics['handshake_p99'])
+        self.assertEqual(100, metrics['handshake_max'])
+        self.assertEqual(0, meter.sample(1)['connections'])
+        self.assertEqual(100, meter.connections)
+        self.assertEqual(1, meter.failures)
+
+
+class TestConnectionRate(test_base.BaseTestCase):
+
+    def _start(self, server):
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        return server.server_address[1]
+
+    def _run(self, client):
+        record_queue = mp.Queue()
+        runner = create_cps('127.0.0.1', client, record_queue)[0]
+        runner.run()
+        records = []
+        while True:
+            record = record_queue.get(timeout=5)
+            self.assertEqual('CPS', record.metric_type)
+            records.append(record.metrics)
+            if 'duration' in record.metrics:
+                return runner, records
+
+    def test_tcp_flows_reuse_source_ports(self):
+        port = self._start(
+            ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler))
+        # every port of the range is used by several flows
+        runner, records = self._run(_client(
+            'TCP', port, duration=0.5, rate=100.0, concurrency=4,
+            source_ports=(45000, 45019)))
+        self.assertIsInstance(runner, TCPConnectionRate)
+        summary = records[-1]
+        self.assertGreater(summary['connections'], 40)
+        self.assertEqual(0, summary['failures'])
+        self.assertLessEqual(summary['cps'], 110)
+        self.assertEqual(summary['connections'],
+                         sum(metrics['connections']
+                             for metrics in records[:-1]))
+
+    def test_udp_flows(self):
+        port = self._start(
+            ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler))
+        runner, records = self._run(_client(
+            'UDP', port, duration=0.2, rate=100.0,
+            source_ports=(45020, 45029)))
+        self.assertIsInstance(runner, UDPConnectionRate)
+        self.assertGreater(records[-1]['connections'], 0)
+        self.assertEqual(0, records[-1]['failures'])
+        self.assertGreater(records[0]['handshake_max'], 0)
+
+    def test_refused_flows_fail(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        _, records = self._run(_client(
+            'TCP', port, duration=0.2, rate=50.0,
+            source_ports=(45030, 45039)))
+        self.assertEqual(0, records[-1]['connections'])
+        self.assertGreater(records[-1]['failures'], 0)
+        self.assertGreater(records[0]['failures_per_second'], 0)
+
+    def test_cps_rules_run_as_streams(self):
+        client = _client('TCP', 12345)
+        self.assertTrue(is_cps(client))
+        traffic_client = TrafficClient(
+            '127.0.0.1', [client, ('TCP', 12345, '127.0.0.1', True, 1)],
+            mp.Queue())
+        self.assertEqual([client], traffic_client._streams)
+        self.assertEqual(1, traffic_client._destination_count)
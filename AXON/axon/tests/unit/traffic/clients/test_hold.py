@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import fixtures
+import threading
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.clients.clients import TrafficClient
+from axon.traffic.clients.hold import ConnectionHolder, create_holders, \
+    is_hold
+from axon.traffic.servers.servers import ThreadedTCPServer, \
+    TCPRequestHandler
+
+
+def _client(port, **options):
+    options['mode'] = 'hold'
+    return ('TCP', port, '127.0.0.1', True, 1,
+            tuple(sorted(options.items())))
+
+
+class _ClosingRequestHandler(TCPRequestHandler):
+    """
+    Closes held connections right away
+    """
+
+    def handle(self):
+        self.request.recv(1024)
+
+
+class TestConnectionHolder(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(TestConnectionHolder, self).setUp()
+        self.useFixture(fixtures.MockPatch(
+            'axon.common.config.HOLD_INTERVAL', 0.2))
+
+    def _start(self, handler):
+        server = ThreadedTCPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        return server.server_address[1]
+
+    def _run(self, client):
+        record_queue = queue.Queue()
+        holder = create_holders('127.0.0.1', client, record_queue)[0]
+        self.assertIsInstance(holder, ConnectionHolder)
+        holder.run()
+        records = []
+        while not record_queue.empty():
+            record = record_queue.get()
+            self.assertEqual('HOLD', record.metric_type)
+            records.append(record.metrics)
+        return records
+
+    def _total(self, records, name):
+        return sum(metrics[name] for metrics in records)
+
+    def test_connections_held(self):
+        port = self._start(TCPRequestHandler)
+        records = self._run(_client(
+            port, connections=20, heartbeat=0.1, duration=0.6))
+        self.assertEqual(20, max(metrics['live'] for metrics in records))
+        self.assertEqual(0, records[-1]['live'])
+        self.assertEqual(20, self._total(records, 'opened'))
+        self.assertGreater(self._total(records, 'heartbeats'), 20)
+        for name in ('resets', 'closed', 'timeouts', 'connect_failures'):
+            self.assertEqual(0, self._total(records, name))
+
+    def test_closed_connections_opened_again(self):
+        port = self._start(_ClosingRequestHandler)
+        records = self._run(_client(
+            port, connections=2, heartbeat=0.05, duration=0.5))
+        closed = self._total(records, 'closed') + \
+            self._total(records, 'resets')
+        self.assertGreater(closed, 0)
+        self.assertGreater(self._total(records, 'opened'), 2)
+
+    def test_hold_rules_run_alone(self):
+        client = _client(12345)
+        self.assertTrue(is_hold(client))
+        traffic_client = TrafficClient(
+            '127.0.0.1', [client, ('TCP', 12345, '127.0.0.1', True, 1)],
+            queue.Queue())
+        self.assertEqual([client], traffic_client._streams)
+        self.assertEqual(1, traffic_client._destination_count)
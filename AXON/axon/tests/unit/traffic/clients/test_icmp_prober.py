@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import fixtures
+import socket
+import struct
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.clients.clients import ICMPClient
+from axon.traffic.clients.icmp_prober import ICMPProber
+from axon.traffic.icmp import ECHO_HEADER, checksum, open_socket, \
+    pack_echo, parse_echo_reply
+
+
+def _icmp_permitted():
+    try:
+        open_socket(socket.AF_INET)[0].close()
+    except socket.error:
+        return False
+    return True
+
+
+class TestEcho(test_base.BaseTestCase):
+    """
+    Test for the ICMP echo helpers
+    """
+
+    def test_checksum(self):
+        packet = bytearray(ECHO_HEADER.size + 4)
+        packet[ECHO_HEADER.size:] = b'ping'
+        pack_echo(packet, socket.AF_INET, 0x1234, 0x10005, len(packet))
+        self.assertEqual(0, checksum(bytes(packet)))
+        self.assertEqual((8, 0, 0x1234, 5), tuple(
+            ECHO_HEADER.unpack(bytes(packet[:ECHO_HEADER.size]))[i]
+            for i in (0, 1, 3, 4)))
+
+    def test_parse_reply_of_raw_socket(self):
+        reply = ECHO_HEADER.pack(0, 0, 0, 7, 9) + b'ping'
+        ip_header = struct.pack('!B', 0x45) + b'\0' * 19
+        self.assertEqual((7, 9, 28), parse_echo_reply(
+            memoryview(ip_header + reply), socket.AF_INET, True))
+        self.assertEqual((7, 9, 8), parse_echo_reply(
+            memoryview(reply), socket.AF_INET, False))
+        request = ECHO_HEADER.pack(8, 0, 0, 7, 9)
+        self.assertIsNone(parse_echo_reply(
+            memoryview(request), socket.AF_INET, False))
+        self.assertIsNone(parse_echo_reply(
+            memoryview(reply), socket.AF_INET6, False))
+
+
+class TestICMPProber(test_base.BaseTestCase):
+    """
+    Test for ICMPProber on loopback
+    """
+
+    def setUp(self):
+        super(TestICMPProber, self).setUp()
+        if not _icmp_permitted():
+            self.skipTest("ICMP sockets aren't permitted")
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.prober = ICMPProber(timeout=0.5)
+
+    def _probe(self, *destinations, **kwargs):
+        async def probe():
+            try:
+                return await asyncio.gather(
+                    *[self.prober.probe(destination, **kwargs)
+                      for destination in destinations],
+                    return_exceptions=True)
+            finally:
+                self.prober.close()
+        return self.loop.run_until_complete(probe())
+
+    def test_echoes_answered(self):
+        rtts = self._probe(*['127.0.0.1'] * 50, size=64)
+        for rtt in rtts:
+            self.assertGreater(rtt, 0)
+        stats = self.prober.report()
+        self.assertEqual(50, stats['sent'])
+        self.assertEqual(50, stats['received'])
+
+    def test_echo_expired(self):
+        # the echo request is lost
+        self.useFixture(fixtures.MockPatch(
+            'axon.traffic.clients.icmp_prober._ICMPEndpoint.sendto'))
+        results = self._probe('127.0.0.1')
+        self.assertIsInstance(results[0], socket.timeout)
+        self.assertEqual(1, self.prober.report()['lost'])
+
+
+class TestICMPClient(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(TestICMPClient, self).setUp()
+        if not _icmp_permitted():
+            self.skipTest("ICMP sockets aren't permitted")
+
+    def test_echo(self):
+        record_queue = queue.Queue()
+        client = ICMPClient('127.0.0.1', '127.0.0.1', 12345, record_queue)
+        client.ping()
+        record = record_queue.get_nowait()
+        self.assertEqual('ICMP', record.traffic_type)
+        self.assertTrue(record.success)
+        self.assertIsNone(record.error)
+        self.assertGreater(record.latency, 0)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import threading
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.clients.clients import TrafficClient
+from axon.traffic.clients.multicast import MulticastSender, \
+    ReceiverCounters, create_senders, is_multicast
+from axon.traffic.servers.servers import ThreadedMulticastServer, \
+    MulticastRequestHandler
+
+
+def _client(destination, port=12345, **options):
+    options['mode'] = 'multicast'
+    return ('UDP', port, destination, True, 1,
+            tuple(sorted(options.items())))
+
+
+class TestReceiverCounters(test_base.BaseTestCase):
+
+    def test_sample_is_relative_to_previous_sample(self):
+        counters = ReceiverCounters()
+        # datagrams, expected, reordered, duplicates, jitter and latency
+        counters.add((4, 5, 0, 0, 0.1, 2.0, 3.0))
+        counters.add((10, 12, 1, 1, 0.2, 4.0, 5.0))
+        metrics = counters.sample(12)
+        self.assertEqual((1, 12, 9, 3, 1, 1),
+                         (metrics['reporting'], metrics['sent'],
+                          metrics['received'], metrics['lost'],
+                          metrics['reordered'], metrics['duplicates']))
+        self.assertAlmostEqual((4 * 2.0 + 6 * 4.0) / 10,
+                               metrics['latency_avg'])
+        self.assertEqual(5.0, metrics['latency_max'])
+        counters.add((20, 22, 1, 1, 0.2, 1.0, 1.0))
+        metrics = counters.sample(10)
+        self.assertEqual((10, 0, 0.0), (metrics['received'],
+                                        metrics['lost'], metrics['loss']))
+
+    def test_silent_receiver_loses_everything(self):
+        metrics = ReceiverCounters().sample(10)
+        self.assertEqual((0, 0, 10, 1.0),
+                         (metrics['reporting'], metrics['received'],
+                          metrics['lost'], metrics['loss']))
+
+
+class TestMulticastSender(test_base.BaseTestCase):
+
+    def test_create_senders_per_group_and_port(self):
+        clients = [_client('1.2.3.4'), _client('1.2.3.5'),
+                   _client('1.2.3.6', group='239.1.1.1'),
+                   _client('1.2.3.7', port=80)]
+        self.assertTrue(all(is_multicast(client) for client in clients))
+        senders = create_senders('1.2.3.1', clients, queue.Queue())
+        self.assertEqual(
+            [('239.255.77.1', 12345, ['1.2.3.4', '1.2.3.5']),
+             ('239.1.1.1', 12345, ['1.2.3.6']),
+             ('239.255.77.1', 80, ['1.2.3.7'])],
+            [(sender._group, sender._port, list(sender._receivers))
+             for sender in senders])
+        self.assertRaises(RuntimeError, create_senders, '1.2.3.1',
+                          [('TCP',) + _client('1.2.3.4')[1:]], queue.Queue())
+
+    def test_traffic_client_shares_senders(self):
+        client = TrafficClient('1.2.3.1', [
+            _client('1.2.3.4'), _client('1.2.3.5'),
+            ('UDP', 53, '1.2.3.6', True, 1)], queue.Queue())
+        self.assertEqual(2, len(client._streams))
+        self.assertEqual(1, client._destination_count)
+
+    def test_receiver_reports_to_sender(self):
+        server = ThreadedMulticastServer(
+            ('127.0.0.1', 0), MulticastRequestHandler, group='239.255.77.3')
+        server.streams._interval = 0
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.shutdown)
+        records = queue.Queue()
+        sender = MulticastSender(
+            '127.0.0.1', '239.255.77.3', server.server_address[1],
+            ['127.0.0.1', '127.0.0.2'], records)
+        sock = sender._create_socket()
+        self.addCleanup(sock.close)
+        for _ in range(3):
+            sender.send(sock)
+            sender.read_reports(sock, 0.2)
+        sender._record(sender.sent)
+        metrics = dict((record.dst, record.metrics) for record in
+                       [records.get_nowait() for _ in range(2)])
+        self.assertEqual((1, 3, 0), (metrics['127.0.0.1']['reporting'],
+                                     metrics['127.0.0.1']['received'],
+                                     metrics['127.0.0.1']['lost']))
+        self.assertEqual((0, 3), (metrics['127.0.0.2']['reporting'],
+                                  metrics['127.0.0.2']['lost']))
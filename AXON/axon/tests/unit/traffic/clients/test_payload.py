@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import socket
+
+from axon.tests import base as test_base
+from axon.traffic.clients.payload import Payload, get_payload, \
+    receive_exactly, DEFAULT_PAYLOAD
+
+
+class TestPayload(test_base.BaseTestCase):
+    """
+    Test for Payload utilities
+    """
+
+    def test_default_payload(self):
+        payload = Payload()
+        self.assertEqual(len(DEFAULT_PAYLOAD), payload.size())
+        self.assertEqual(DEFAULT_PAYLOAD, payload.get(payload.size()))
+
+    def test_payload_views_share_buffer(self):
+        payload = Payload(1400)
+        first, second = payload.get(1400), payload.get(100)
+        self.assertIsInstance(first, memoryview)
+        self.assertEqual(1400, len(first))
+        self.assertEqual(first[:100], second)
+        self.assertEqual(1400, len(payload.receive_buffer))
+
+    def test_size_distribution(self):
+        payload = Payload(((64, 1), (1500, 1)))
+        sizes = set(payload.size() for _ in range(200))
+        self.assertEqual({64, 1500}, sizes)
+        self.assertEqual(1500, payload.max_size)
+
+    def test_payloads_cached(self):
+        self.assertIs(get_payload(1400), get_payload(((1400, 1),)))
+        self.assertIsNot(get_payload(1400), get_payload())
+
+    def test_receive_exactly(self):
+        left, right = socket.socketpair()
+        self.addCleanup(left.close)
+        self.addCleanup(right.close)
+        buffer = memoryview(bytearray(6))
+        left.sendall(b'abc')
+        left.sendall(b'def')
+        receive_exactly(right, buffer, 6)
+        self.assertEqual(b'abcdef', buffer.tobytes())
+        left.close()
+        self.assertRaises(socket.error, receive_exactly, right, buffer, 1)
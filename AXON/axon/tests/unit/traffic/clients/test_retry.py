@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import random
+import threading
+
+from axon.tests import base as test_base
+from axon.traffic.clients.retry import RetryPolicy, RetryQueue
+
+
+class TestRetryPolicy(test_base.BaseTestCase):
+    """
+    Test for RetryPolicy
+    """
+
+    def test_exponential_backoff(self):
+        policy = RetryPolicy(count=4, backoff=1, max_backoff=5, jitter=0)
+        self.assertEqual([1, 2, 4, 5, None],
+                         [policy.delay(attempts)
+                          for attempts in range(1, 6)])
+
+    def test_jitter(self):
+        policy = RetryPolicy(count=1, backoff=1, jitter=0.2,
+                             rand=random.Random(1))
+        delays = [policy.delay(1) for _ in range(100)]
+        self.assertTrue(all(0.8 <= delay <= 1.2 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_no_retries(self):
+        self.assertIsNone(RetryPolicy(count=0).delay(1))
+
+
+class TestRetryQueue(test_base.BaseTestCase):
+    """
+    Test for RetryQueue
+    """
+
+    def test_retries_run_in_order_of_due_time(self):
+        queue = RetryQueue()
+        self.addCleanup(queue.stop)
+        order = []
+        done = threading.Event()
+
+        def retry(name):
+            def callback():
+                order.append(name)
+                if len(order) == 2:
+                    done.set()
+            return callback
+
+        queue.schedule(0.2, retry('late'))
+        queue.schedule(0.05, retry('early'))
+        self.assertTrue(done.wait(2))
+        self.assertEqual(['early', 'late'], order)
+        self.assertEqual(0, queue.pending)
+        self.assertEqual(2, queue.retried)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import mock
+import random
+
+from axon.tests import base as test_base
+from axon.traffic.clients.scheduler import ArrivalProfile, RateScheduler, \
+    ScheduledStart, ScheduleStats, TokenBucket, CoverageScheduler, \
+    CoverageQueue
+from axon.traffic.resources import TCPRecord
+
+
+class TestRateScheduler(test_base.BaseTestCase):
+    """
+    Test for RateScheduler utilities
+    """
+
+    def _send_times(self, count, *args, **kwargs):
+        scheduler = RateScheduler(*args, **kwargs)
+        return [scheduler.next_send_time() for _ in range(count)]
+
+    def test_constant_profile(self):
+        times = self._send_times(5, 10)
+        for expected, actual in zip([0, .1, .2, .3, .4], times):
+            self.assertAlmostEqual(expected, actual)
+
+    def test_burst_profile(self):
+        times = self._send_times(6, 10, ArrivalProfile.BURST, burst_size=3)
+        for expected, actual in zip([0, 0, 0, .3, .3, .3], times):
+            self.assertAlmostEqual(expected, actual)
+
+    def test_poisson_profile_holds_rate(self):
+        times = self._send_times(10000, 100, ArrivalProfile.POISSON,
+                                 burst_size=10, rand=random.Random(1))
+        self.assertAlmostEqual(100, len(times) / times[-1], delta=5)
+        self.assertEqual(times, sorted(times))
+
+    def test_invalid_schedule(self):
+        self.assertRaises(ValueError, RateScheduler, 0)
+        self.assertRaises(ValueError, RateScheduler, 10, 'fake_profile')
+
+
+class TestTokenBucket(test_base.BaseTestCase):
+
+    def test_bucket_caps_burst(self):
+        bucket = TokenBucket(10, 2, 0)
+        times = [bucket.admit(0) for _ in range(4)]
+        for expected, actual in zip([0, 0, .1, .2], times):
+            self.assertAlmostEqual(expected, actual)
+
+
+class TestScheduleStats(test_base.BaseTestCase):
+
+    def test_report(self):
+        stats = ScheduleStats(0)
+        for lag in (.001, .002, .003, -.001):
+            stats.add(lag)
+        report = stats.report(2, 10)
+        self.assertEqual(4, report['sent'])
+        self.assertEqual(2, report['achieved_rate'])
+        self.assertAlmostEqual(1.5, report['lag_avg'])
+        self.assertAlmostEqual(3, report['lag_max'])
+        self.assertEqual(0, stats.report(3, 10)['sent'])
+
+
+class TestScheduledStart(test_base.BaseTestCase):
+
+    def _wait(self, start, now):
+        clock = [now]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds + .0005
+
+        def time():
+            clock[0] += .0001
+            return clock[0]
+        return start.wait(time, sleep), sleeps
+
+    def test_jitter_offset(self):
+        start = ScheduledStart(100, 2, rand=random.Random(1))
+        self.assertTrue(100 <= start.target < 102)
+        self.assertEqual(100, ScheduledStart(100).target)
+
+    def test_wait_spins_before_start(self):
+        start = ScheduledStart(100)
+        started, sleeps = self._wait(start, 99)
+        self.assertTrue(100 <= started < 100.001)
+        self.assertEqual(1, len(sleeps))
+        self.assertAlmostEqual(1 - ScheduledStart.SPIN, sleeps[0], places=3)
+
+    def test_late_start(self):
+        start = ScheduledStart(100)
+        started, sleeps = self._wait(start, 101)
+        self.assertEqual([], sleeps)
+        offsets = start.offsets(started)
+        self.assertAlmostEqual(1000, offsets['offset'], places=0)
+        self.assertAlmostEqual(offsets['offset'], offsets['error'])
+        self.assertEqual(100, offsets['start_time'])
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCoverageScheduler(test_base.BaseTestCase):
+    """
+    Test for CoverageScheduler
+    """
+
+    def _scheduler(self, count, rate, **options):
+        destinations = [('TCP', 80, '10.0.0.%d' % index, True, 1)
+                        for index in range(count)]
+        clock = FakeClock()
+        return destinations, clock, CoverageScheduler(
+            destinations, rate, clock=clock, **options)
+
+    def _probe(self, scheduler, clock, count, rate, failing=()):
+        probed = []
+        for _ in range(count):
+            client = next(scheduler)
+            probed.append(client[2])
+            scheduler.observe('TCP', client[2], 80, client[2] not in failing)
+            clock.now += 1.0 / rate
+        return probed
+
+    def test_round_robin(self):
+        destinations, clock, scheduler = self._scheduler(4, 2)
+        self.assertEqual([client[2] for client in destinations] * 2,
+                         self._probe(scheduler, clock, 8, 2))
+
+    def test_failing_pair_is_probed_more_often(self):
+        _, clock, scheduler = self._scheduler(100, 10)
+        probed = self._probe(scheduler, clock, 2000, 10,
+                             failing=('10.0.0.5',))
+        self.assertGreater(probed.count('10.0.0.5'), 3 * 20)
+        report = scheduler.report()
+        self.assertEqual(1, report['failing'])
+        # stable pairs back off, but none is starved
+        for pair in scheduler.staleness():
+            self.assertLessEqual(pair['worst_staleness'], 4 * 10 + 1)
+
+    def test_critical_rule_is_probed_more_often(self):
+        destinations = [('TCP', 80, '10.0.0.1', True, 1,
+                         (('criticality', 3.0),)),
+                        ('TCP', 80, '10.0.0.2', True, 1)]
+        clock = FakeClock()
+        scheduler = CoverageScheduler(destinations, 1, clock=clock,
+                                      stable_probes=1000)
+        probed = []
+        for _ in range(40):
+            probed.append(next(scheduler)[2])
+            clock.now += 1
+        self.assertGreater(probed.count('10.0.0.1'),
+                           2 * probed.count('10.0.0.2'))
+
+    def test_coverage_queue_observes_records(self):
+        _, clock, scheduler = self._scheduler(2, 1)
+        queue = mock.Mock()
+        coverage_queue = CoverageQueue(queue, scheduler)
+        record = TCPRecord('1.1.1.1', '10.0.0.1', 80, 1.0, success=False)
+        coverage_queue.put(record)
+        queue.put.assert_called_once_with(record)
+        self.assertEqual(
+            [0, 1], [pair['failures'] for pair in scheduler.staleness()])
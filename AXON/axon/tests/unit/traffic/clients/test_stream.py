@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import multiprocessing as mp
+import threading
+
+from axon.tests import base as test_base
+from axon.traffic.clients.clients import TrafficClient
+from axon.traffic.clients.stream import StreamMeter, TCPStream, UDPStream, \
+    create_streams, is_stream
+from axon.traffic.servers.servers import ThreadedTCPServer, \
+    ThreadedUDPServer, TCPRequestHandler, UDPRequestHandler
+
+
+def _client(protocol, port, **options):
+    options['mode'] = 'stream'
+    return (protocol, port, '127.0.0.1', True, 1,
+            tuple(sorted(options.items())))
+
+
+class TestStreamMeter(test_base.BaseTestCase):
+
+    def test_intervals(self):
+        meter = StreamMeter(1, 0)
+        self.assertIsNone(meter.add(1000, .5))
+        interval = meter.add(1000, 1)
+        self.assertEqual(2000, interval['bytes'])
+        self.assertEqual(16000, interval['throughput'])
+        self.assertEqual(2000, meter.total)
+        self.assertEqual(2, meter.count)
+        self.assertEqual(0, meter.sample(2)['bytes'])
+
+
+class TestStreams(test_base.BaseTestCase):
+
+    def _start(self, server):
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        return server.server_address[1]
+
+    def _run(self, client):
+        record_queue = mp.Queue()
+        streams = create_streams('127.0.0.1', client, record_queue)
+        for stream in streams:
+            stream.run()
+        records = [record_queue.get(timeout=5) for _ in streams]
+        for record in records:
+            self.assertEqual('STREAM', record.metric_type)
+        return streams, [record.metrics for record in records]
+
+    def test_tcp_stream_byte_count(self):
+        port = self._start(
+            ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler))
+        streams, results = self._run(
+            _client('TCP', port, stream_bytes=1000000, flows=2))
+        self.assertEqual(2, len(streams))
+        self.assertIsInstance(streams[0], TCPStream)
+        for metrics in results:
+            self.assertEqual(0, metrics['failed'])
+            self.assertEqual(1000000, metrics['bytes_sent'])
+            self.assertEqual(1000000, metrics['bytes_received'])
+            self.assertGreater(metrics['goodput'], 0)
+
+    def test_udp_stream_loss(self):
+        port = self._start(
+            ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler))
+        streams, results = self._run(
+            _client('UDP', port, stream_bytes=14000, bandwidth=1e6))
+        self.assertIsInstance(streams[0], UDPStream)
+        metrics = results[0]
+        self.assertEqual(0, metrics['failed'])
+        self.assertEqual(10, metrics['datagrams_sent'])
+        self.assertEqual(
+            metrics['datagrams_sent'] - metrics['datagrams_received'],
+            round(metrics['loss'] * metrics['datagrams_sent']))
+
+    def test_udp_stream_packet_rate(self):
+        port = self._start(
+            ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler))
+        _, results = self._run(
+            _client('UDP', port, stream_bytes=7000, packet_rate=100))
+        metrics = results[0]
+        self.assertEqual(5, metrics['datagrams_sent'])
+        self.assertGreaterEqual(metrics['duration'], .04)
+        self.assertEqual(0, metrics['duplicates'])
+        self.assertGreaterEqual(metrics['jitter'], 0)
+
+    def test_failed_stream(self):
+        sock_server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        port = sock_server.server_address[1]
+        sock_server.server_close()
+        _, results = self._run(_client('TCP', port, duration=1))
+        self.assertEqual(1, results[0]['failed'])
+
+    def test_traffic_client_separates_streams(self):
+        stream = _client('TCP', 12345)
+        request = ('TCP', 12345, '127.0.0.1', True, 1)
+        self.assertTrue(is_stream(stream))
+        self.assertFalse(is_stream(request))
+        traffic_client = TrafficClient(
+            '127.0.0.1', [stream, request], mp.Queue())
+        self.assertEqual([stream], traffic_client._streams)
+        self.assertEqual(1, traffic_client._destination_count)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import fixtures
+import socket
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.clients.clients import TrafficClient
+from axon.traffic.clients.sweep import PortSweep, create_sweeps, \
+    decode_bitmap, encode_bitmap, expand_ports, format_ports, is_sweep, \
+    OPEN, REFUSED, FILTERED
+
+
+def _client(**options):
+    options['mode'] = 'sweep'
+    return ('TCP', 80, '127.0.0.1', True, 1, tuple(sorted(options.items())))
+
+
+class TestPorts(test_base.BaseTestCase):
+
+    def test_format_ports(self):
+        self.assertEqual('22,80-82,443',
+                         format_ports([443, 81, 22, 80, 82, 81]))
+
+    def test_bitmap(self):
+        ports = expand_ports(((20, 25), (80, 80), (440, 445)))
+        states = bytearray(len(ports))
+        for index in (1, 6, 12):
+            states[index] = OPEN
+        states[0] = REFUSED
+        bitmap = encode_bitmap(states, OPEN)
+        self.assertEqual([21, 80, 445], decode_bitmap(bitmap, ports))
+        self.assertEqual([20], decode_bitmap(
+            encode_bitmap(states, REFUSED), ports))
+
+
+class TestPortSweep(test_base.BaseTestCase):
+
+    def _listen(self):
+        sock = socket.socket()
+        self.addCleanup(sock.close)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(16)
+        return sock.getsockname()[1]
+
+    def _closed_port(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        return port
+
+    def test_sweep(self):
+        opened = [self._listen(), self._listen()]
+        closed = self._closed_port()
+        ports = tuple((port, port) for port in opened + [closed])
+        record_queue = queue.Queue()
+        sweep = create_sweeps('127.0.0.1', _client(
+            ports=ports, expect_open=ports[:1] + ((closed, closed),)),
+            record_queue)[0]
+        self.assertIsInstance(sweep, PortSweep)
+        sweep.run()
+        record = record_queue.get_nowait()
+        self.assertEqual('SWEEP', record.metric_type)
+        self.assertEqual(3, record.metrics['swept'])
+        self.assertEqual(2, record.metrics['open'])
+        self.assertEqual(1, record.metrics['refused'])
+        self.assertEqual(1, record.metrics['unexpected_open'])
+        self.assertEqual(1, record.metrics['unexpected_closed'])
+        self.assertEqual(opened, decode_bitmap(
+            record.ports['open'], expand_ports(ports)))
+        self.assertEqual(format_ports(opened + [closed]),
+                         record.ports['ranges'])
+        self.assertTrue(record_queue.empty())
+
+    def test_unanswered_port_is_filtered(self):
+        async def _stalled_connect(sock, address):
+            await asyncio.sleep(10)
+
+        sweep = PortSweep('127.0.0.1', '127.0.0.1', 80, queue.Queue(),
+                          options={'timeout': 0.01})
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        self.useFixture(fixtures.MockPatchObject(
+            loop, 'sock_connect', _stalled_connect))
+        asyncio.set_event_loop(loop)
+        self.assertEqual(FILTERED, loop.run_until_complete(sweep.sweep())[0])
+        metrics, _ = sweep._get_results(bytearray([FILTERED, OPEN]), 1.0)
+        self.assertEqual(1, metrics['filtered'])
+        self.assertNotIn('unexpected_open', metrics)
+
+    def test_traffic_client_separates_sweeps(self):
+        sweep = _client(ports=((1, 1024),))
+        request = ('TCP', 80, '127.0.0.1', True, 1)
+        self.assertTrue(is_sweep(sweep))
+        self.assertFalse(is_sweep(request))
+        traffic_client = TrafficClient(
+            '127.0.0.1', [sweep, request], queue.Queue())
+        self.assertEqual([sweep], traffic_client._streams)
+        self.assertEqual(1, traffic_client._destination_count)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import fixtures
+import socket
+import threading
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.clients.async_clients import AsyncTrafficClient
+from axon.traffic.clients.udp_prober import TimerWheel, UDPProber, \
+    BatchUDPProber, TimestampingUDPProber
+from axon.traffic.resources import PROBE_DWELL
+from axon.traffic.servers.servers import ThreadedUDPServer, UDPRequestHandler
+
+
+class TestTimerWheel(test_base.BaseTestCase):
+    """
+    Test for TimerWheel
+    """
+
+    def test_timers_expire_on_their_tick(self):
+        wheel = TimerWheel(0.1, 10, 0)
+        wheel.add('a', 0.25)
+        wheel.add('b', 0.5)
+        self.assertEqual([], wheel.advance(0.2))
+        self.assertEqual(['a'], wheel.advance(0.35))
+        self.assertEqual(['b'], wheel.advance(0.55))
+
+    def test_timer_beyond_rotation(self):
+        wheel = TimerWheel(0.1, 4, 0)
+        wheel.add('a', 1.0)
+        self.assertEqual([], wheel.advance(0.5))
+        self.assertEqual([], wheel.advance(0.9))
+        self.assertEqual(['a'], wheel.advance(1.05))
+
+    def test_advance_past_all_slots(self):
+        wheel = TimerWheel(0.1, 4, 0)
+        wheel.add('a', 0.1)
+        wheel.add('b', 0.3)
+        self.assertEqual(['a', 'b'], sorted(wheel.advance(10)))
+
+
+class TestUDPProber(test_base.BaseTestCase):
+    """
+    Test for UDPProber against an echo server on loopback
+    """
+
+    def setUp(self):
+        super(TestUDPProber, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.prober = UDPProber(timeout=0.3)
+
+    def _probe(self, *destinations, **kwargs):
+        async def probe():
+            try:
+                return await asyncio.gather(
+                    *[self.prober.probe('127.0.0.1', port, **kwargs)
+                      for port in destinations], return_exceptions=True)
+            finally:
+                self.prober.close()
+        return self.loop.run_until_complete(probe())
+
+    def test_probes_answered(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        rtts = self._probe(port, port, port)
+        for rtt in rtts:
+            self.assertGreater(rtt, 0)
+        stats = self.prober.report()
+        self.assertEqual(3, stats['sent'])
+        self.assertEqual(3, stats['received'])
+        self.assertEqual(0, stats['lost'])
+        self.assertEqual(len(self.prober._transports), 0)
+
+    def test_padded_probes_answered(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        rtts = self._probe(port, port, size=9000)
+        for rtt in rtts:
+            self.assertGreater(rtt, 0)
+        self.assertEqual(2, self.prober.report()['received'])
+
+    def test_probe_expired(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        self.addCleanup(sock.close)
+        results = self._probe(sock.getsockname()[1])
+        self.assertIsInstance(results[0], socket.timeout)
+        stats = self.prober.report()
+        self.assertEqual(1, stats['lost'])
+        self.assertEqual(1.0, stats['loss'])
+
+    def test_reordered_and_late_replies(self):
+        futures = {}
+        for sequence in (1, 2):
+            futures[sequence] = self.loop.create_future()
+            self.prober._pending[sequence] = (
+                futures[sequence], ('127.0.0.1', 12345), 0,
+                UDPProber.HEADER.size)
+        for sequence in (2, 1, 1):
+            self.prober.reply_received(
+                UDPProber.HEADER.pack(UDPProber.MAGIC, sequence, 0))
+        self.prober.reply_received(b'Dinkirk')
+        stats = self.prober.report()
+        self.assertEqual(2, stats['received'])
+        self.assertEqual(1, stats['reordered'])
+        self.assertEqual(1, stats['late'])
+        self.assertTrue(futures[1].done())
+
+
+class TestBatchUDPProber(TestUDPProber):
+    """
+    Test for BatchUDPProber against a UDP echo server
+    """
+
+    def setUp(self):
+        super(TestBatchUDPProber, self).setUp()
+        self.prober = BatchUDPProber(timeout=0.3, batch_size=4)
+
+    def test_probes_batched(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        rtts = self._probe(*[port] * 10)
+        for rtt in rtts:
+            self.assertGreater(rtt, 0)
+        self.assertEqual(10, self.prober.report()['received'])
+
+
+class TestTimestampingUDPProber(TestUDPProber):
+    """
+    Test for TimestampingUDPProber against a timestamping echo server
+    """
+
+    def setUp(self):
+        super(TestTimestampingUDPProber, self).setUp()
+        self.prober = TimestampingUDPProber(timeout=0.3)
+        self.useFixture(fixtures.MockPatchObject(
+            ThreadedUDPServer, 'timestamping_enabled', True))
+
+    def test_probes_answered(self):
+        super(TestTimestampingUDPProber, self).test_probes_answered()
+        self.assertTrue(self.prober.timestamping)
+
+    def test_server_dwell_left_out(self):
+        future = self.loop.create_future()
+        self.prober._pending[1] = (
+            future, ('127.0.0.1', 12345), 0, UDPProber.HEADER.size)
+        self.prober.sent_at(1, 1000000)
+        header = UDPProber.HEADER.pack(UDPProber.MAGIC, 1, 0)
+        self.prober.reply_received(header + PROBE_DWELL.pack(400000),
+                                   received_at=2000000)
+        self.assertEqual(0.6, future.result())
+
+    def test_timestamping_rule(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        port = server.server_address[1]
+        client = AsyncTrafficClient(
+            '127.0.0.1', [('UDP', port, '127.0.0.1', True, 1)],
+            queue.Queue())
+        plain = client._create_client('UDP', port, '127.0.0.1', True, 1)
+        self.assertIsInstance(plain.prober, BatchUDPProber)
+        udp_client = client._create_client(
+            'UDP', port, '127.0.0.1', True, 1, {'timestamping': True})
+        self.prober = udp_client.prober
+        self.assertIsInstance(self.prober, TimestampingUDPProber)
+
+        async def attempt():
+            try:
+                await udp_client.ping()
+            finally:
+                self.prober.close()
+        self.loop.run_until_complete(attempt())
+        self.assertTrue(self.prober.timestamping)
+        self.assertEqual(udp_client._kernel_latency,
+                         udp_client._get_latency())
+        self.assertEqual(1, self.prober.report()['received'])
@@ -8,11 +8,20 @@ import mock
 import os
 import socket
 import subprocess
+import threading
 
 from axon.tests import base as test_base
 from axon.traffic.servers.servers import ThreadedTCPServer, ThreadedTCPServerV6, \
     ThreadedUDPServer, ThreadedUDPServerV6, TCPRequestHandler, UDPRequestHandler, \
-    IperfServer, create_server_class
+    ThreadedTLSServerV6, TLSRequestHandler, IperfServer, create_server_class, \
+    held_connections, StreamCounters, MulticastCounters, \
+    ThreadedMulticastServer, ThreadedMulticastServerV6
+from axon.traffic.mmsg import MMSG_SUPPORTED
+from axon.traffic.resources import STREAM_MAGIC, STREAM_HEADER, \
+    STREAM_DATA_MAGIC, STREAM_END_MAGIC, STREAM_REPORT_MAGIC, \
+    STREAM_TIMESTAMP, STREAM_SUMMARY, STREAM_STATS, PIPELINE_MAGIC, \
+    PIPELINE_HEADER, HOLD_MAGIC, HOLD_HEARTBEAT, MULTICAST_MAGIC, \
+    MULTICAST_REPORT_MAGIC, MULTICAST_LATENCY
 
 
 class TestThreadedTCPServer(test_base.BaseTestCase):
@@ -71,6 +80,194 @@ class TestThreadedTCPServer(test_base.BaseTestCase):
         _tcp_server = ThreadedUDPServer((source, port), TCPRequestHandler)
         _tcp_server.is_alive()
 
+    def _echo(self, server, datagrams):
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(1)
+        self.addCleanup(sock.close)
+        for datagram in datagrams:
+            sock.sendto(datagram, server.server_address)
+        return sorted(sock.recv(2048) for _ in datagrams)
+
+    def test_udp_server_batch_echo(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        self.assertEqual(MMSG_SUPPORTED, server.batching)
+        datagrams = [str(index).encode() * (index + 1)
+                     for index in range(40)]
+        self.assertEqual(sorted(datagrams), self._echo(server, datagrams))
+
+    def test_udp_server_echo_without_batches(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        server.batch_size = 1
+        self.assertFalse(server.batching)
+        self.assertEqual([b'Dinkirk'], self._echo(server, [b'Dinkirk']))
+
+    def _start(self, server):
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.stop)
+
+    def test_tcp_server_stops_with_open_connection(self):
+        server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        thread = threading.Thread(target=server.run)
+        thread.daemon = True
+        thread.start()
+        sock = socket.create_connection(server.server_address, timeout=1)
+        self.addCleanup(sock.close)
+        sock.sendall(b'Dinkirk')
+        self.assertEqual(b'Dinkirk', sock.recv(64))
+        stop = threading.Thread(target=server.stop)
+        stop.daemon = True
+        stop.start()
+        stop.join(2)
+        self.assertFalse(stop.is_alive())
+
+    def test_tcp_server_drains_stream(self):
+        server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        self._start(server)
+        sock = socket.create_connection(server.server_address, timeout=1)
+        self.addCleanup(sock.close)
+        sock.sendall(STREAM_MAGIC + b'x' * 100000)
+        sock.shutdown(socket.SHUT_WR)
+        summary = b''
+        while len(summary) < STREAM_SUMMARY.size:
+            summary += sock.recv(STREAM_SUMMARY.size)
+        self.assertEqual((100000, 0), STREAM_SUMMARY.unpack(summary))
+
+    def test_tcp_server_answers_pipelined_requests(self):
+        server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        self._start(server)
+        sock = socket.create_connection(server.server_address, timeout=1)
+        self.addCleanup(sock.close)
+        requests = b''.join(
+            PIPELINE_HEADER.pack(sequence, 100, sequence) + b'x' * 100
+            for sequence in range(1, 4))
+        # requests are split mid header and mid payload
+        sock.sendall(PIPELINE_MAGIC + requests[:5])
+        sock.sendall(requests[5:150])
+        sock.sendall(requests[150:])
+        expected = b''.join(
+            PIPELINE_HEADER.pack(sequence, 0, sequence) + b'\0' * sequence
+            for sequence in range(1, 4))
+        responses = b''
+        while len(responses) < len(expected):
+            responses += sock.recv(4096)
+        self.assertEqual(expected, responses)
+
+    def test_tcp_server_holds_connections_in_event_loop(self):
+        server = ThreadedTCPServer(('127.0.0.1', 0), TCPRequestHandler)
+        self._start(server)
+        held = len(held_connections)
+        sock = socket.create_connection(server.server_address, timeout=1)
+        self.addCleanup(sock.close)
+        sock.sendall(HOLD_MAGIC + HOLD_HEARTBEAT)
+        self.assertEqual(HOLD_HEARTBEAT, sock.recv(1))
+        # the thread of the connection is done once it is handed over
+        self.assertEqual(held + 1, len(held_connections))
+        sock.sendall(HOLD_HEARTBEAT * 2)
+        received = b''
+        while len(received) < 2:
+            received += sock.recv(2)
+        self.assertEqual(HOLD_HEARTBEAT * 2, received)
+
+    def _udp_stream(self, server):
+        self._start(server)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(1)
+        self.addCleanup(sock.close)
+        for sequence in range(5):
+            header = STREAM_HEADER.pack(STREAM_DATA_MAGIC, 7, sequence)
+            sock.sendto(header + b'x' * 88, server.server_address)
+        sock.sendto(b'Dinkirk', server.server_address)
+        self.assertEqual(b'Dinkirk', sock.recv(2048))
+        sock.sendto(STREAM_HEADER.pack(STREAM_END_MAGIC, 7, 5),
+                    server.server_address)
+        reply = sock.recv(2048)
+        self.assertEqual((STREAM_END_MAGIC, 7, 5),
+                         STREAM_HEADER.unpack_from(reply))
+        return STREAM_SUMMARY.unpack_from(reply, STREAM_HEADER.size)
+
+    def test_udp_server_counts_stream(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        self.assertEqual((500, 5), self._udp_stream(server))
+
+    def test_udp_server_counts_stream_without_batches(self):
+        server = ThreadedUDPServer(('127.0.0.1', 0), UDPRequestHandler)
+        server.batch_size = 1
+        self.assertEqual((500, 5), self._udp_stream(server))
+
+    def test_stream_counters_loss_reordering_and_jitter(self):
+        streams = StreamCounters(interval=3600)
+        buffer = bytearray(2048)
+        # transit times of 1, 3, 2, 2 and 5 ms
+        for sequence, sent, received in ((0, 0, 1), (2, 20, 23), (1, 10, 12),
+                                         (1, 10, 12), (5, 50, 55)):
+            data = STREAM_HEADER.pack(STREAM_DATA_MAGIC, 7, sequence) + \
+                STREAM_TIMESTAMP.pack(sent * 1000000)
+            self.assertEqual(0, streams.handle(
+                'peer', memoryview(data), buffer, received * 1000000))
+        size = streams.handle('peer', memoryview(STREAM_HEADER.pack(
+            STREAM_END_MAGIC, 7, 6)), buffer)
+        self.assertEqual(
+            STREAM_HEADER.size + STREAM_SUMMARY.size + STREAM_STATS.size, size)
+        self.assertEqual((5 * len(data), 5), STREAM_SUMMARY.unpack_from(
+            buffer, STREAM_HEADER.size))
+        expected, reordered, duplicates, jitter = STREAM_STATS.unpack_from(
+            buffer, STREAM_HEADER.size + STREAM_SUMMARY.size)
+        self.assertEqual((6, 1, 1), (expected, reordered, duplicates))
+        # J += (|D| - J) / 16 for the differences 2, 1, 0 and 3 ms
+        jitter_ms = 0.0
+        for difference in (2, 1, 0, 3):
+            jitter_ms += (difference - jitter_ms) / 16.0
+        self.assertAlmostEqual(jitter_ms, jitter)
+
+    def test_stream_counters_report_every_interval(self):
+        streams = StreamCounters(interval=0)
+        buffer = bytearray(2048)
+        data = STREAM_HEADER.pack(STREAM_DATA_MAGIC, 7, 0) + \
+            STREAM_TIMESTAMP.pack(0)
+        size = streams.handle('peer', memoryview(data), buffer)
+        self.assertEqual(
+            STREAM_HEADER.size + STREAM_SUMMARY.size + STREAM_STATS.size, size)
+        self.assertEqual((STREAM_REPORT_MAGIC, 7, 0),
+                         STREAM_HEADER.unpack_from(buffer))
+
+    def test_multicast_counters_report_latency(self):
+        senders = MulticastCounters(interval=0)
+        buffer = bytearray(2048)
+        data = STREAM_HEADER.pack(STREAM_DATA_MAGIC, 7, 0) + \
+            STREAM_TIMESTAMP.pack(0)
+        self.assertIsNone(senders.handle('peer', memoryview(data), buffer))
+        size = 0
+        # one way latencies of 2 and 4 ms
+        for sequence, sent, received in ((0, 10, 12), (2, 30, 34)):
+            data = STREAM_HEADER.pack(MULTICAST_MAGIC, 7, sequence) + \
+                STREAM_TIMESTAMP.pack(sent * 1000000)
+            size = senders.handle(
+                'peer', memoryview(data), buffer, received * 1000000)
+        self.assertEqual(sum((STREAM_HEADER.size, STREAM_SUMMARY.size,
+                              STREAM_STATS.size, MULTICAST_LATENCY.size)),
+                         size)
+        self.assertEqual((MULTICAST_REPORT_MAGIC, 7, 2),
+                         STREAM_HEADER.unpack_from(buffer))
+        offset = STREAM_HEADER.size + STREAM_SUMMARY.size
+        self.assertEqual((3, 0, 0), STREAM_STATS.unpack_from(
+            buffer, offset)[:3])
+        # the latency of a report is the one since the previous report
+        self.assertEqual((4.0, 4.0), MULTICAST_LATENCY.unpack_from(
+            buffer, offset + STREAM_STATS.size))
+
+    def test_multicast_server_joins_group(self):
+        server = ThreadedMulticastServer(
+            ('127.0.0.1', 0), UDPRequestHandler, group='239.255.77.2')
+        self.addCleanup(server.server_close)
+        self.assertEqual('239.255.77.2', server.server_address[0])
+        self.assertIsInstance(server.streams, MulticastCounters)
+
     @mock.patch('subprocess.Popen')
     def test_run_iperf_tcp_server(self, mock_commamnd):
         source = '1.2.3.4'
@@ -131,6 +328,23 @@ class TestThreadedTCPServer(test_base.BaseTestCase):
         self.assertEqual(server_class.address_family,
                          socket.AF_INET6)
 
+    def test_create_multicast_server_class(self):
+        server_class, args, kwargs = create_server_class(
+            'MULTICAST', 12345, '1.2.3.4', options={'group': '239.1.2.3'})
+        self.assertEqual(ThreadedMulticastServer, server_class)
+        self.assertEqual({'group': '239.1.2.3'}, kwargs)
+        server_class, args, kwargs = create_server_class(
+            'MULTICAST', 12345, '::4')
+        self.assertEqual(ThreadedMulticastServerV6, server_class)
+        self.assertEqual({'group': None}, kwargs)
+
+    def test_create_tls_V6_server_class(self):
+        server_class, args, kwargs = create_server_class('TLS', 12345, '::4')
+        self.assertEqual(server_class, ThreadedTLSServerV6)
+        self.assertEqual(TLSRequestHandler, args[1])
+        self.assertEqual(server_class.address_family,
+                         socket.AF_INET6)
+
     def test_create_iperf_tcp_server_class(self):
         server_type = 'iperf'
         protocol = 'TCP'
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import mock
+
+from axon.tests import base as test_base
+from axon.traffic.manager import RootNsClientManager, shard_clients, \
+    create_client_worker, get_traffic_client_class
+from axon.traffic.workers import WorkerGroup, WorkerProcess
+
+CLIENTS = [('TCP', 12345, '1.2.3.%d' % index, True, 'accept')
+           for index in range(1, 33)]
+
+
+class TestShardClients(test_base.BaseTestCase):
+
+    def test_shards_partition_clients(self):
+        shards = shard_clients(CLIENTS, 4)
+        self.assertLessEqual(len(shards), 4)
+        self.assertEqual(sorted(CLIENTS),
+                         sorted(client for shard in shards
+                                for client in shard))
+
+    def test_destination_stays_in_shard(self):
+        clients = CLIENTS + [('UDP', 12345, '1.2.3.1', True, 'accept')]
+        for shard in shard_clients(clients, 4):
+            if ('TCP', 12345, '1.2.3.1', True, 'accept') in shard:
+                self.assertIn(('UDP', 12345, '1.2.3.1', True, 'accept'),
+                              shard)
+        self.assertEqual(shard_clients(clients, 4),
+                         shard_clients(list(clients), 4))
+
+    def test_single_shard(self):
+        self.assertEqual([CLIENTS], shard_clients(CLIENTS, 1))
+        self.assertEqual([], shard_clients([], 4))
+
+
+class TestClientWorker(test_base.BaseTestCase):
+
+    def test_single_process(self):
+        worker = create_client_worker('1.1.1.1', CLIENTS, None, workers=1)
+        self.assertIsInstance(worker, WorkerProcess)
+
+    def test_process_group(self):
+        worker = create_client_worker('1.1.1.1', CLIENTS, None, workers=4)
+        self.assertIsInstance(worker, WorkerGroup)
+        self.assertEqual(len(shard_clients(CLIENTS, 4)), len(worker.workers))
+
+    @mock.patch('axon.traffic.manager.WorkerProcess')
+    def test_shards_share_request_rate(self, mock_process):
+        clients = [('TCP', 12345, '1.2.%d.%d' % (index // 250, index % 250),
+                    True, 'accept') for index in range(1000)]
+        for client_clients in (clients, CLIENTS):
+            endpoint = get_traffic_client_class()(
+                '1.1.1.1', client_clients, None)
+            mock_process.reset_mock()
+            create_client_worker('1.1.1.1', client_clients, None, workers=4)
+            rates = [client_cls(*args, **kwargs)._request_rate
+                     for (client_cls, args, kwargs), _ in
+                     mock_process.call_args_list]
+            self.assertEqual(4, len(rates))
+            self.assertAlmostEqual(endpoint._request_rate, sum(rates))
+
+    def test_group_life_cycle(self):
+        workers = [mock.Mock(), mock.Mock()]
+        workers[0].is_running.return_value = True
+        workers[1].is_running.return_value = False
+        group = WorkerGroup(workers)
+        group.start()
+        for worker in workers:
+            worker.start.assert_called_once_with()
+        self.assertTrue(group.is_running())
+        group.stop()
+        workers[0].stop.assert_called_once_with()
+        workers[1].stop.assert_not_called()
+
+    @mock.patch('axon.traffic.manager.WorkerGroup.start')
+    def test_start_client_registers_group(self, mock_start):
+        manager = RootNsClientManager(None)
+        manager.start_client('1.1.1.1', CLIENTS, workers=4)
+        mock_start.assert_called_once_with()
+        client = manager._client_registry.get_client(
+            manager.ROOT_NAMESPACE_NAME)
+        self.assertIsInstance(client, WorkerGroup)
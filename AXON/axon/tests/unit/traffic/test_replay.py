@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import os
+import socket
+import struct
+import tempfile
+import threading
+
+from six.moves import queue
+
+from axon.tests import base as test_base
+from axon.traffic.replay import PcapError, PcapReplay, read_packets, \
+    TCP_ACK, TCP_FIN, TCP_SYN
+
+
+def _frame(src, dst, sport, dport, payload, protocol=17, flags=0):
+    if protocol == 6:
+        transport = struct.pack('!HHIIBBHHH', sport, dport, 0, 0, 5 << 4,
+                                flags, 65535, 0, 0)
+    else:
+        transport = struct.pack('!HHHH', sport, dport, 8 + len(payload), 0)
+    transport += payload
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(transport), 0, 0,
+                     64, protocol, 0, socket.inet_aton(src),
+                     socket.inet_aton(dst))
+    return b'\x00' * 12 + struct.pack('!H', 0x0800) + ip + transport
+
+
+def _write_pcap(path, frames, snaplen=65535):
+    with open(path, 'wb') as pcap:
+        pcap.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0,
+                               snaplen, 1))
+        for timestamp, frame in frames:
+            captured = frame[:snaplen]
+            pcap.write(struct.pack(
+                '<IIII', int(timestamp), int(timestamp % 1 * 1e6),
+                len(captured), len(frame)))
+            pcap.write(captured)
+
+
+class TestPcapReplay(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(TestPcapReplay, self).setUp()
+        handle, self.path = tempfile.mkstemp(suffix='.pcap')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_read_packets(self):
+        _write_pcap(self.path, [
+            (100.5, _frame('10.0.0.1', '10.0.0.2', 5000, 53, b'query')),
+            (100.75, _frame('10.0.0.1', '10.0.0.2', 5001, 80, b'x' * 100,
+                            protocol=6, flags=TCP_ACK)),
+            (101.0, b'\x00' * 12 + b'\x08\x06' + b'\x00' * 28)],
+            snaplen=14 + 20 + 20 + 10)
+        packets = list(read_packets(self.path))
+        self.assertEqual(2, len(packets))
+        self.assertEqual((100.5, 'UDP', '10.0.0.1', 5000, '10.0.0.2', 53,
+                          b'query'), packets[0][:6] + (packets[0].payload,))
+        # the payload truncated by the snaplen is padded back
+        self.assertEqual(b'x' * 10 + b'\x00' * 90, packets[1].payload)
+        self.assertEqual(TCP_ACK, packets[1].flags)
+
+    def test_read_packets_of_other_files(self):
+        with open(self.path, 'wb') as pcap:
+            pcap.write(b'not a pcap file at all')
+        self.assertRaises(PcapError, list, read_packets(self.path))
+
+    def test_replay_maps_endpoints_and_scales_timing(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(receiver.close)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(1)
+        port = receiver.getsockname()[1]
+        frames = [(10 + index * 0.1,
+                   _frame('10.0.0.1', '10.0.0.2', 5000, 53, b'%d' % index))
+                  for index in range(5)]
+        # the answer of the destination isn't replayed
+        frames.insert(1, (10.05, _frame('10.0.0.2', '10.0.0.1', 53, 5000,
+                                        b'answer')))
+        _write_pcap(self.path, frames)
+        records = queue.Queue()
+        replay = PcapReplay(self.path, mapping={'10.0.0.2': '127.0.0.1'},
+                            ports={53: port}, speed=4, source='10.0.0.1',
+                            record_queue=records)
+        report = replay.run()
+        self.assertEqual([b'%d' % index for index in range(5)],
+                         [receiver.recv(64) for _ in range(5)])
+        self.assertEqual((5, 1, 1, 0), (report['packets'], report['flows'],
+                                        report['responses'],
+                                        report['errors']))
+        self.assertAlmostEqual(0.4, report['capture_duration'])
+        self.assertAlmostEqual(0.1, report['target_duration'])
+        self.assertGreaterEqual(report['duration'], 0.1)
+        self.assertLess(report['duration'], 0.5)
+        self.assertGreater(report['rate_accuracy'], 0.2)
+        record = records.get_nowait()
+        self.assertEqual(('REPLAY', '10.0.0.1'),
+                         (record.metric_type, record.src))
+
+    def test_replay_tcp_flows(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(2)
+        received = []
+
+        def accept():
+            for _ in range(2):
+                connection, _ = listener.accept()
+                with connection:
+                    while True:
+                        data = connection.recv(1024)
+                        if not data:
+                            break
+                        received.append(data)
+                        connection.sendall(data)
+
+        thread = threading.Thread(target=accept)
+        thread.daemon = True
+        thread.start()
+        _write_pcap(self.path, [
+            # the capture starts with the SYN ACK of a flow
+            (1.0, _frame('10.0.0.9', '10.0.0.1', 80, 4000, b'',
+                         protocol=6, flags=TCP_SYN | TCP_ACK)),
+            (1.01, _frame('10.0.0.1', '10.0.0.9', 4000, 80, b'early',
+                          protocol=6, flags=TCP_ACK)),
+            (1.0, _frame('10.0.0.1', '10.0.0.2', 4001, 80, b'',
+                         protocol=6, flags=TCP_SYN)),
+            (1.02, _frame('10.0.0.1', '10.0.0.2', 4001, 80, b'hello',
+                          protocol=6, flags=TCP_ACK)),
+            (1.03, _frame('10.0.0.1', '10.0.0.2', 4001, 80, b'',
+                          protocol=6, flags=TCP_FIN | TCP_ACK))])
+        report = PcapReplay(
+            self.path, mapping={'10.0.0.2': '127.0.0.1',
+                                '10.0.0.9': '127.0.0.1'},
+            ports={80: listener.getsockname()[1]}).run()
+        thread.join(1)
+        self.assertEqual([b'early', b'hello'], received)
+        self.assertEqual((2, 2, 1, 0), (report['packets'], report['flows'],
+                                        report['responses'],
+                                        report['errors']))
+
+    def test_stop_replay(self):
+        _write_pcap(self.path, [
+            (0.0, _frame('10.0.0.1', '127.0.0.1', 5000, 9, b'a')),
+            (60.0, _frame('10.0.0.1', '127.0.0.1', 5000, 9, b'b'))])
+        replay = PcapReplay(self.path)
+        thread = threading.Thread(target=replay.run)
+        thread.start()
+        replay.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
@@ -12,6 +12,7 @@ from axon.traffic.connected_state import ConnectedStateProcessor, \
     DBConnectedState
 from axon.traffic.manager import RootNsServerManager, NamespaceServerManager,\
     NamespaceClientManager, RootNsClientManager
+from axon.traffic.resources import unpack_server
 from axon.utils.network_utils import NamespaceManager, InterfaceManager
 import axon.common.config as axon_config
 
@@ -55,8 +56,9 @@ class AxonRootNamespaceServerAgent(object):
 
         servers = self.connected_state.get_servers(src)
         servers = servers if servers else []
-        for proto, port in servers:
-            mngr.start_server(proto, port, src)
+        for server in servers:
+            proto, port, options = unpack_server(server)
+            mngr.start_server(proto, port, src, options=options)
         self.mngrs_map[(namespace, src)] = mngr
 
     def stop_servers(self, namespace='root'):
@@ -152,8 +154,9 @@ class AxonNameSpaceServerAgent(AxonRootNamespaceServerAgent):
                 if not proto_port:
                     continue
                 ns_mngr = self.mngrs_map.get((ns, src), NamespaceServerManager(ns))
-                for proto, port in proto_port:
-                    ns_mngr.start_server(proto, port, src)
+                for server in proto_port:
+                    proto, port, options = unpack_server(server)
+                    ns_mngr.start_server(proto, port, src, options=options)
                 self.mngrs_map[(ns, src)] = ns_mngr
 
     def stop_servers(self, namespace=None):
@@ -243,7 +246,8 @@ class AxonRootNamespaceClientAgent(object):
                 self._primary_ep = endpoints[0]['endpoint']
         return self._primary_ep
 
-    def start_clients(self, namespace='localhost'):
+    def start_clients(self, namespace='localhost', workers=None,
+                      start=None):
         if not self.primary_endpoint:
             self.log.warning("Clients will not be started since "
                              "no connected state exists yet")
@@ -253,7 +257,7 @@ class AxonRootNamespaceClientAgent(object):
         if clients:
             src = self.primary_endpoint
             mngr = self.mngrs_map.get((namespace, src), RootNsClientManager(self._record_queue))
-            mngr.start_client(src, clients)
+            mngr.start_client(src, clients, workers, start)
             self.mngrs_map[(namespace, src)] = mngr
 
     def stop_clients(self, namespace='localhost'):
@@ -292,7 +296,7 @@ class AxonNameSpaceClientAgent(AxonRootNamespaceClientAgent):
             self._ns_list = mngr.get_all_namespaces()
             self._ns_iterface_map = mngr.get_namespace_interface_map()
 
-    def start_clients(self, namespace=None):
+    def start_clients(self, namespace=None, workers=None, start=None):
         ns_list = [namespace] if namespace else self._ns_list
         for ns in ns_list:
             interfaces = self._ns_iterface_map.get(ns)
@@ -313,7 +317,7 @@ class AxonNameSpaceClientAgent(AxonRootNamespaceClientAgent):
                     continue
                 ns_mngr = self.mngrs_map.get((ns, src),
                                              NamespaceClientManager(ns, self._record_queue))
-                ns_mngr.start_client(src, clients)
+                ns_mngr.start_client(src, clients, workers, start)
                 self.mngrs_map[(ns, src)] = ns_mngr
 
     def stop_clients(self, namespace=None):
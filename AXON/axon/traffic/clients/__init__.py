@@ -4,4 +4,8 @@
 # The full license information can be found in LICENSE.txt
 # in the root directory of this project.
 
-from axon.traffic.clients.clients import *
\ No newline at end of file
+import six
+
+from axon.traffic.clients.clients import *
+if six.PY3:
+    from axon.traffic.clients.async_clients import *
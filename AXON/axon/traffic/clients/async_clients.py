@@ -0,0 +1,659 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import logging
+import socket
+import ssl
+
+from axon.client.traffic_elements import Mode
+from axon.common import config as conf
+from axon.common.utils import raise_open_files_limit
+from axon.traffic.clients.clients import TCPClient, TLSClient, UDPClient, \
+    ICMPClient, HTTPClient, TrafficClient
+from axon.traffic.clients.icmp_prober import ICMPProber
+from axon.traffic.clients.pool import ConnectionPool, TCPConnection, \
+    PipelinedConnection, AsyncHTTPConnectionPool, wait_for
+from axon.traffic.clients.retry import RetryPolicy
+from axon.traffic.clients.scheduler import RateScheduler, ScheduleStats
+from axon.traffic.clients.udp_prober import BatchUDPProber, \
+    TimestampingUDPProber
+from axon.traffic.resources import ScheduleRecord, ConnectionRecord, \
+    UDPProbeRecord, ICMPProbeRecord, unpack_client
+from axon.traffic.tls import client_context
+
+
+class AsyncRetryQueue(object):
+    """
+    Central queue of the delayed retries of the asyncio clients. A probe
+    waiting for its retry gives its concurrency slot back, so the retries
+    of a failing path don't hold off first attempts.
+    """
+
+    def __init__(self, policy=None):
+        self.policy = policy or RetryPolicy()
+        # concurrency limit of the probes of the traffic client
+        self.semaphore = None
+        self.pending = 0
+        self._retried = 0
+
+    async def wait(self, delay):
+        """
+        Wait delay seconds for the next attempt of a probe
+        """
+        self.pending += 1
+        self._retried += 1
+        if self.semaphore is not None:
+            self.semaphore.release()
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.pending -= 1
+            if self.semaphore is not None:
+                await self.semaphore.acquire()
+
+    def report(self):
+        """
+        Get the retries since the last report and the retries waiting
+        :rtype: dict
+        """
+        stats = {'retried': self._retried, 'retry_pending': self.pending}
+        self._retried = 0
+        return stats
+
+
+class AsyncTCPClient(TCPClient):
+    """
+    TCP client which runs its requests as a coroutine on the event loop
+    of AsyncTrafficClient instead of a thread per request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncTCPClient, self).__init__(*args, **kwargs)
+        # long lived connection of the rule in persistent mode
+        self.connection = None
+
+    async def _read_reply(self, reader, size):
+        """
+        Read the complete echo of a payload of size bytes
+        """
+        data = await wait_for(reader.read(size), self._timeout)
+        self._mark('first_byte')
+        if not data:
+            raise ConnectionResetError("Connection closed by peer")
+        if len(data) < size:
+            await wait_for(
+                reader.readexactly(size - len(data)), self._timeout)
+
+    async def _exchange(self, reader, writer, payload):
+        """
+        Send the payload and wait for the reply of the server
+        :param reader: stream reader of the connection
+        :type reader: asyncio.StreamReader
+        :param writer: stream writer of the connection
+        :type writer: asyncio.StreamWriter
+        :param payload: data to be send
+        :type payload: memoryview
+        """
+        self._mark('send')
+        writer.write(payload)
+        await wait_for(writer.drain(), self._timeout)
+        await self._read_reply(reader, len(payload))
+
+    async def _attempt(self, payload):
+        if isinstance(self.connection, PipelinedConnection):
+            return await self._send_receive_pipelined(payload)
+        if self.connection is not None:
+            return await self._send_receive_persistent(payload)
+        self._stage = 'connect'
+        reader, writer = await wait_for(
+            asyncio.open_connection(self._destination, self._port),
+            self._timeout)
+        self._mark('connect')
+        self._stage = 'exchange'
+        try:
+            await self._exchange(reader, writer, payload)
+        finally:
+            self._read_tcp_info(writer.get_extra_info('socket'))
+            writer.close()
+
+    def _retriable(self, error):
+        # the long lived connection of the rule is re-established by its
+        # next request instead
+        return self.connection is None and \
+            super(AsyncTCPClient, self)._retriable(error)
+
+    async def _send_receive_persistent(self, payload):
+        """
+        Exchange the payload over the long lived connection of the rule,
+        the connection is re-established by the next request after a
+        failure.
+        """
+        connection = self.connection
+        async with connection.lock:
+            self._start()
+            if not connection.connected:
+                self._stage = 'connect'
+                await connection.connect()
+                self._mark('connect')
+            self._stage = 'exchange'
+            try:
+                await self._exchange(
+                    connection.reader, connection.writer, payload)
+                self._read_tcp_info(connection.writer.get_extra_info('socket'))
+            except Exception:
+                connection.close()
+                raise
+
+    async def _send_receive_pipelined(self, payload):
+        """
+        Send the payload as one of the outstanding requests of the
+        pipelined connection of the rule, the connection is re-established
+        by the next request after a failure.
+        """
+        connection = self.connection
+        async with connection.window:
+            self._start()
+            if not connection.connected:
+                async with connection.lock:
+                    if not connection.connected:
+                        self._stage = 'connect'
+                        await connection.connect()
+                        self._mark('connect')
+            self._stage = 'exchange'
+            response_size = self._options.get('response_size', len(payload))
+            self._mark('send')
+            try:
+                self._marks['first_byte'] = await wait_for(
+                    connection.request(payload, response_size),
+                    self._timeout)
+            except Exception:
+                connection.close()
+                raise
+
+    async def ping(self):
+        for _ in range(self._request_count):
+            self._start()
+            self._next_payload()
+            while True:
+                try:
+                    await self._attempt(self._payload)
+                    self.record()
+                    break
+                except Exception as e:
+                    delay = self._retry_delay(e)
+                    if delay is None:
+                        self._record_failure(e)
+                        break
+                    self.log.error(
+                        "Exception %s for %s %s -> %s:%s, retrying in %.1fs",
+                        str(e), self.PROTOCOL, self._source,
+                        self._destination, self._port, delay)
+                    await self.retries.wait(delay)
+                    self._retry()
+
+
+class _TLSStream(object):
+    """
+    TLS over the streams of a connection with memory BIOs. The TLS
+    transports of asyncio can't resume a session, so the TLS records are
+    moved between the BIOs and the streams here.
+    """
+
+    READ_SIZE = 65536
+
+    def __init__(self, reader, writer, timeout, session=None):
+        self._reader = reader
+        self._writer = writer
+        self._timeout = timeout
+        self._incoming = ssl.MemoryBIO()
+        self._outgoing = ssl.MemoryBIO()
+        self.ssl = client_context().wrap_bio(
+            self._incoming, self._outgoing, session=session)
+
+    async def _flush(self):
+        data = self._outgoing.read()
+        if data:
+            self._writer.write(data)
+            await wait_for(self._writer.drain(), self._timeout)
+
+    async def _call(self, method, *args):
+        """
+        Call a method of the TLS object, feeding it records from the
+        connection until it doesn't need to read any more
+        """
+        while True:
+            try:
+                result = method(*args)
+            except ssl.SSLWantReadError:
+                await self._flush()
+                data = await wait_for(
+                    self._reader.read(self.READ_SIZE), self._timeout)
+                if not data:
+                    raise ConnectionResetError("Connection closed by peer")
+                self._incoming.write(data)
+                continue
+            await self._flush()
+            return result
+
+    async def handshake(self):
+        await self._call(self.ssl.do_handshake)
+
+    async def write(self, payload):
+        while payload:
+            written = await self._call(self.ssl.write, payload)
+            payload = payload[written:]
+
+    async def read_into(self, buffer, size):
+        """
+        Read up to size bytes into buffer
+        :return: bytes read
+        :rtype: int
+        """
+        return await self._call(self.ssl.read, size, buffer)
+
+
+class _UDPReplyProtocol(asyncio.DatagramProtocol):
+    """
+    Datagram protocol which resolves a future with the first reply or
+    the ICMP error reported for the connected socket
+    """
+
+    def __init__(self, loop):
+        self.reply = loop.create_future()
+
+    def datagram_received(self, data, addr):
+        if not self.reply.done():
+            self.reply.set_result(data)
+
+    def error_received(self, exc):
+        if not self.reply.done():
+            self.reply.set_exception(exc)
+
+
+class AsyncTLSClient(AsyncTCPClient, TLSClient):
+    """
+    TLS client which runs its requests as a coroutine, sessions are
+    resumed like by TLSClient.
+    """
+
+    async def _exchange(self, stream, payload):
+        buffer = self.payload.receive_buffer
+        self._mark('send')
+        await stream.write(payload)
+        received = await stream.read_into(buffer, len(payload))
+        self._mark('first_byte')
+        while received < len(payload):
+            size = await stream.read_into(
+                buffer[received:], len(payload) - received)
+            if not size:
+                raise ConnectionResetError("Connection closed by peer")
+            received += size
+
+    async def _attempt(self, payload):
+        self._stage = 'connect'
+        reader, writer = await wait_for(
+            asyncio.open_connection(self._destination, self._port),
+            self._timeout)
+        try:
+            self._mark('connect')
+            self._stage = 'handshake'
+            stream = _TLSStream(reader, writer, self._timeout,
+                                self._session())
+            await stream.handshake()
+            self._mark('handshake')
+            self._resumed = stream.ssl.session_reused
+            self._stage = 'exchange'
+            try:
+                await self._exchange(stream, payload)
+            finally:
+                self._read_tcp_info(writer.get_extra_info('socket'))
+            self._store_session(stream.ssl.session)
+        finally:
+            writer.close()
+
+
+class AsyncUDPClient(AsyncTCPClient, UDPClient):
+    """
+    UDP client which sends its requests as probes of the UDPProber shared
+    by all of the UDP rules of a traffic client, padded to the payload
+    size of the rule. A lost probe is not retried, it is recorded as
+    timed out.
+    Negative probes are sent from a connected socket of their own, so
+    ICMP unreachable errors can be told apart from silent drops.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncUDPClient, self).__init__(*args, **kwargs)
+        self.prober = None
+
+    async def _send_receive(self, payload):
+        loop = asyncio.get_event_loop()
+        family = socket.AF_INET6 if self._ipv6 else socket.AF_INET
+        transport, protocol = await loop.create_datagram_endpoint(
+            lambda: _UDPReplyProtocol(loop),
+            remote_addr=(self._destination, self._port), family=family)
+        try:
+            self._mark('send')
+            transport.sendto(payload)
+            await wait_for(protocol.reply, self._timeout)
+            self._mark('first_byte')
+        finally:
+            transport.close()
+
+    def _retriable(self, error):
+        return False
+
+    async def _attempt(self, payload):
+        self._stage = 'exchange'
+        if self.negative:
+            return await self._send_receive(payload)
+        # probes are padded to the payload size
+        self._payload_size = max(self._payload_size, self.prober.HEADER.size)
+        self._mark('send')
+        rtt = await self.prober.probe(
+            self._destination, self._port, self._ipv6, self._payload_size)
+        self._mark('first_byte')
+        if self.prober.timestamping:
+            self._kernel_latency = rtt
+
+
+class AsyncICMPClient(AsyncUDPClient, ICMPClient):
+    """
+    ICMP client which sends its requests as echoes of the ICMPProber
+    shared by all of the ICMP rules of a traffic client. Negative probes
+    go through the prober as well, with their shorter timeout.
+    """
+
+    async def _attempt(self, payload):
+        self._stage = 'exchange'
+        self._payload_size = max(self._payload_size, self.prober.HEADER.size)
+        self._mark('send')
+        await wait_for(self.prober.probe(
+            self._destination, ipv6=self._ipv6, size=self._payload_size),
+            self._timeout)
+        self._mark('first_byte')
+
+
+class AsyncHTTPClient(AsyncTCPClient, HTTPClient):
+    """
+    HTTP client which runs its requests as a coroutine
+    """
+
+    def _build_request(self):
+        host = '[%s]' % self._destination if self._ipv6 else self._destination
+        return ('GET / HTTP/1.1\r\nHost: %s:%s\r\n\r\n' %
+                (host, self._port)).encode()
+
+    async def _read_response(self, reader):
+        """
+        Read a complete response
+        :return: status code and whether the connection can be reused
+        :rtype: tuple
+        """
+        status_line = await wait_for(reader.readline(), self._timeout)
+        self._mark('first_byte')
+        try:
+            version, status = status_line.split()[:2]
+            status = int(status)
+        except ValueError:
+            raise Exception("Invalid HTTP status line %r" % status_line)
+        headers = {}
+        while True:
+            line = await wait_for(reader.readline(), self._timeout)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+        length = headers.get('content-length')
+        if length is None:
+            # body is delimited by the end of the connection
+            return status, False
+        await wait_for(reader.readexactly(int(length)), self._timeout)
+        keep_alive = version == b'HTTP/1.1' and \
+            headers.get('connection') != 'close'
+        return status, keep_alive
+
+    async def _exchange(self, connection):
+        try:
+            self._mark('send')
+            connection.writer.write(self._build_request())
+            await wait_for(connection.writer.drain(), self._timeout)
+            status, keep_alive = await self._read_response(connection.reader)
+        except Exception:
+            connection.close()
+            raise
+        if self.pool is None or self.negative or not keep_alive:
+            connection.close()
+        else:
+            self.pool.release(self._destination, self._port, connection)
+        return status
+
+    async def _get_status(self):
+        self._stage = 'connect'
+        if self.pool is None or self.negative:
+            connection = TCPConnection(
+                self._destination, self._port, self._timeout)
+            await connection.connect()
+            self._mark('connect')
+            self._stage = 'exchange'
+            return await self._exchange(connection)
+        connection, reused = await self.pool.acquire(
+            self._destination, self._port)
+        if not reused:
+            self._mark('connect')
+        self._stage = 'exchange'
+        try:
+            return await self._exchange(connection)
+        except Exception:
+            if not reused:
+                raise
+        # the server may have closed the idle connection in the meantime
+        self._retry()
+        self._stage = 'connect'
+        connection = await self.pool.connect(self._destination, self._port)
+        self._mark('connect')
+        self._stage = 'exchange'
+        return await self._exchange(connection)
+
+    async def _attempt(self, payload):
+        self._status = None
+        self._status = await self._get_status()
+        if self._status != 200:
+            raise Exception(
+                "HTTP Request failed with status %s" % self._status)
+
+
+class AsyncTrafficClient(TrafficClient):
+    """
+    Traffic client which runs all of the probes of an endpoint as
+    coroutines on a single event loop. Probes are started open loop at
+    request_rate requests per second, at most max_concurrency of them
+    are in flight at the same time.
+    """
+
+    CLIENT_CLASSES = {
+        'TCP': AsyncTCPClient,
+        'UDP': AsyncUDPClient,
+        'HTTP': AsyncHTTPClient,
+        'TLS': AsyncTLSClient,
+        'ICMP': AsyncICMPClient,
+    }
+
+    def __init__(self, src, destinations, record_queue, request_rate=None,
+                 ipv6=False, max_concurrency=None, arrival_profile=None,
+                 burst_size=None, start=None, rate_share=1.0):
+        """
+        :param request_rate: requests per second, by default each
+                             destination is probed once every 5 seconds
+                             up to TRAFFIC_REQUEST_RATE, scaled by
+                             rate_share
+        :type request_rate: float
+        :param arrival_profile: one of ArrivalProfile.allowed
+        :type arrival_profile: str
+        :param burst_size: requests per burst
+        :type burst_size: int
+        """
+        super(AsyncTrafficClient, self).__init__(
+            src, destinations, record_queue, ipv6=ipv6, start=start,
+            rate_share=rate_share)
+        if request_rate is None:
+            request_rate = min(conf.TRAFFIC_REQUEST_RATE * rate_share,
+                               self._destination_count / 5.0)
+        else:
+            request_rate *= rate_share
+        self._request_rate = request_rate
+        if request_rate > 0:
+            self._coverage.rate = request_rate
+        self._arrival_profile = arrival_profile or \
+            conf.TRAFFIC_ARRIVAL_PROFILE
+        self._burst_size = burst_size or conf.TRAFFIC_BURST_SIZE
+        self._max_concurrency = max_concurrency or \
+            conf.TRAFFIC_MAX_CONCURRENCY
+        self._semaphore = None
+        self._tasks = set()
+        self._stats = None
+        self._connections = ConnectionPool(
+            TCPConnection, conf.TRAFFIC_CLIENT_TIMEOUT)
+        self._pipelines = ConnectionPool(
+            PipelinedConnection, conf.TRAFFIC_CLIENT_TIMEOUT)
+        self._http_pool = AsyncHTTPConnectionPool(
+            timeout=conf.TRAFFIC_CLIENT_TIMEOUT)
+        self._prober = BatchUDPProber(conf.TRAFFIC_CLIENT_TIMEOUT)
+        # created on the first rule which asks for kernel timestamps
+        self._timestamping_prober = None
+        self._icmp_prober = ICMPProber(conf.TRAFFIC_CLIENT_TIMEOUT)
+        self._retries = AsyncRetryQueue()
+        self.log = logging.getLogger(__name__)
+
+    def _create_client(self, protocol, port, endpoint, connected, action,
+                       options=None):
+        client = super(AsyncTrafficClient, self)._create_client(
+            protocol, port, endpoint, connected, action, options)
+        mode = options.get('mode') if options else None
+        if protocol == 'TCP' and mode == Mode.PERSISTENT:
+            client.connection = self._connections.get(
+                self._src, endpoint, port)
+        elif protocol == 'TCP' and mode == Mode.PIPELINE:
+            client.connection = self._pipelines.get(
+                self._src, endpoint, port, window=options.get('window'))
+        elif protocol == 'UDP' and client._timestamping_enabled:
+            client.prober = self._get_timestamping_prober()
+        elif protocol == 'UDP':
+            client.prober = self._prober
+        elif protocol == 'ICMP':
+            client.prober = self._icmp_prober
+        return client
+
+    def _get_timestamping_prober(self):
+        if self._timestamping_prober is None:
+            self._timestamping_prober = TimestampingUDPProber(
+                conf.TRAFFIC_CLIENT_TIMEOUT)
+        return self._timestamping_prober
+
+    async def _ping(self, client, send_time):
+        async with self._semaphore:
+            self._stats.add(asyncio.get_event_loop().time() - send_time)
+            await client.ping()
+
+    def _dispatch(self, send_time):
+        client = self._create_client(
+            *unpack_client(next(self._coverage)))
+        task = asyncio.ensure_future(self._ping(client, send_time))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _report(self, now):
+        metrics = self._stats.report(now, self._request_rate)
+        metrics['in_flight'] = len(self._tasks)
+        metrics.update(self._coverage.report())
+        metrics.update(self._retries.report())
+        self.log.info("Schedule of %s: %s", self._src, metrics)
+        records = [ScheduleRecord(self._src, metrics)]
+        connection_stats = {}
+        if len(self._connections):
+            connection_stats.update(self._connections.stats())
+        if len(self._pipelines):
+            connection_stats.update(
+                ('pipelined_' + name, value)
+                for name, value in self._pipelines.stats().items())
+        if self._http_pool.opened:
+            connection_stats.update(self._http_pool.stats())
+        if connection_stats:
+            records.append(ConnectionRecord(self._src, connection_stats))
+        for prober in (self._prober, self._timestamping_prober):
+            if prober is not None and prober.active:
+                records.append(UDPProbeRecord(self._src, prober.report()))
+        if self._icmp_prober.active:
+            records.append(ICMPProbeRecord(
+                self._src, self._icmp_prober.report()))
+        try:
+            for record in records:
+                self._record_queue.put(record)
+        except Exception:
+            self.log.exception(
+                "Exception in adding metric records for src %s to "
+                "traffic queue %s", self._src, self._record_queue)
+
+    async def _run(self, count=None):
+        """
+        Send requests on schedule
+        :param count: number of requests to send, runs forever if None
+        :type count: int
+        """
+        loop = asyncio.get_event_loop()
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._retries.semaphore = self._semaphore
+        now = loop.time()
+        self._stats = ScheduleStats(now)
+        scheduler = RateScheduler(
+            self._request_rate, self._arrival_profile, self._burst_size,
+            start=now)
+        last_report = now
+        sent = 0
+        while count is None or sent < count:
+            send_time = scheduler.next_send_time()
+            # yield to the probes in flight even when behind schedule
+            await asyncio.sleep(max(send_time - loop.time(), 0))
+            self._dispatch(send_time)
+            sent += 1
+            now = loop.time()
+            if now - last_report >= conf.TRAFFIC_REPORT_INTERVAL:
+                self._report(now)
+                last_report = now
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+        self._report(loop.time())
+        self._connections.close()
+        self._pipelines.close()
+        self._http_pool.close()
+        self._prober.close()
+        if self._timestamping_prober is not None:
+            self._timestamping_prober.close()
+        self._icmp_prober.close()
+
+    def _raise_open_files_limit(self):
+        """
+        Every probe in flight holds a socket, so lift the soft limit
+        of open files up to the hard limit.
+        """
+        if not raise_open_files_limit():
+            self.log.warning("Unable to raise the open files limit")
+
+    def run(self):
+        self._raise_open_files_limit()
+        self._wait_for_start()
+        # streams run in threads of their own, next to the event loop
+        streams = self._start_streams()
+        if self._destination_count:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self._run())
+            finally:
+                loop.close()
+        for thread in streams:
+            thread.join()
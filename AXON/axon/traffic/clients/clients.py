@@ -5,22 +5,48 @@
 # in the root directory of this project.
 
 import abc
-import datetime
+import errno
 import ipaddress
-import itertools
 import logging
+import random
 import six
+from six.moves import http_client
 import socket
-from threading import Thread
+from threading import BoundedSemaphore, Lock, Thread
 import time
 
-try:
-    from urllib2 import urlopen
-except ImportError:
-    from urllib.request import urlopen
-
-from axon.common.config import PACKET_SIZE
-from axon.traffic.resources import TCPRecord, UDPRecord, HTTPRecord
+from axon.client.traffic_elements import Mode
+from axon.common.utils import monotonic_ns
+from axon.common.config import HTTP_POOL_SIZE, HTTP_POOL_IDLE_TIMEOUT, \
+    TRAFFIC_CLIENT_TIMEOUT, NEGATIVE_PROBE_TIMEOUT, \
+    TCP_INFO_ENABLED, UDP_TIMESTAMPING_ENABLED, TRAFFIC_REPORT_INTERVAL, \
+    TRAFFIC_ARRIVAL_PROFILE, TRAFFIC_BURST_SIZE
+from axon.traffic.clients.cps import create_cps
+from axon.traffic.clients.multicast import create_senders
+from axon.traffic.clients.payload import get_payload, receive_exactly
+from axon.traffic.clients.retry import RetryQueue
+from axon.traffic.clients.scheduler import CoverageScheduler, \
+    CoverageQueue, RateScheduler, ScheduleStats
+from axon.traffic.clients.stream import create_streams
+from axon.traffic.clients.tcp_info import read_tcp_info
+from axon.traffic.icmp import ECHO_HEADER, open_socket, pack_echo, \
+    parse_echo_reply
+from axon.traffic.timestamping import enable_timestamping, \
+    recv_into_with_timestamp, read_tx_timestamps
+from axon.traffic.tls import TLSSessionCache, client_context
+from axon.traffic.resources import TCPRecord, TLSRecord, UDPRecord, \
+    ICMPRecord, HTTPRecord, StartRecord, ScheduleRecord, Denial, unpack_client
+
+if six.PY3:
+    # held connections are coroutines of an event loop
+    from axon.traffic.clients.hold import create_holders
+    from axon.traffic.clients.sweep import create_sweeps
+else:
+    def create_holders(source, client, record_queue):
+        raise RuntimeError("Hold mode isn't supported on python 2")
+
+    def create_sweeps(source, client, record_queue):
+        raise RuntimeError("Sweep mode isn't supported on python 2")
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -44,8 +70,12 @@ class Client(object):
 
 
 class TCPClient(Client):
+
+    PROTOCOL = 'TCP'
+
     def __init__(self, source, destination, port, record_queue,
-                 connected=True, action=1, request_count=1, ipv6=False):
+                 connected=True, action=1, request_count=1, ipv6=False,
+                 options=None):
         """
         Client to send TCP requests
         :param source: source ip
@@ -61,17 +91,44 @@ class TCPClient(Client):
         :type action: int
         :param record_queue: traffic record queue
         :type record_queue: queue.Queue
+        :param options: per rule options
+        :type options: dict
         """
         self._source = source
+        self.payload = get_payload(
+            options.get('payload_size') if options else None)
+        self._payload_size = None
+        self._payload = None
         self._port = port
         self._destination = destination
-        self._start_time = None
+        # central queue of delayed retries, failed requests aren't
+        # retried without it
+        self.retries = None
+        self._remaining = 0
+        # monotonic nanosecond timestamps of the phases of a request
+        self._marks = {}
+        self._attempts = 1
+        self._tcp_info = {}
+        # latency measured with kernel timestamps
+        self._kernel_latency = None
         self._record_queue = record_queue
         self._request_count = request_count
         self._connected = connected
         self._action = action
         self.log = logging.getLogger(__name__)
         self._ipv6 = ipv6
+        self._options = options if options else {}
+        self._stage = None
+        # failure is the expected result of a negative probe, so it is
+        # sent with a short timeout and not retried
+        self._timeout = NEGATIVE_PROBE_TIMEOUT if self.negative else \
+            TRAFFIC_CLIENT_TIMEOUT
+        self._tcp_info_enabled = TCP_INFO_ENABLED or \
+            bool(self._options.get('tcp_info'))
+
+    @property
+    def negative(self):
+        return not bool(self._connected) or not bool(self._action)
 
     def _create_socket(self, address_family=socket.AF_INET,
                        socket_type=socket.SOCK_STREAM):
@@ -87,7 +144,7 @@ class TCPClient(Client):
         if self._ipv6:
             address_family = socket.AF_INET6
         sock = socket.socket(address_family, socket_type)
-        sock.settimeout(5)
+        sock.settimeout(self._timeout)
         return sock
 
     def __connect(self, sock):
@@ -98,41 +155,152 @@ class TCPClient(Client):
         """
         sock.connect((self._destination, self._port))
 
-    def _send_receive(self, sock, payload):
+    def _exchange(self, sock, payload):
         """
-        Send and recieve the packet
-        :param sock: socket which is connected to server
-        :type sock: socket
+        Send the payload and read its complete echo
         :param payload: data to be send
-        :type payload: str
-        :return: data returned from server
-        :rtype: str
+        :type payload: memoryview
+        """
+        buffer = self.payload.receive_buffer
+        self._mark('send')
+        sock.sendall(payload)
+        received = sock.recv_into(buffer[:len(payload)])
+        self._mark('first_byte')
+        if not received:
+            raise socket.error(errno.ECONNRESET, "Connection closed by peer")
+        receive_exactly(sock, buffer[received:], len(payload) - received)
+
+    def _attempt(self, payload):
         """
+        Make an attempt of the request over a new connection
+        :param payload: data to be send
+        :type payload: memoryview
+        """
+        self._stage = 'connect'
+        sock = self._create_socket()
         try:
-            sock.send(payload)
-            sock.recv(PACKET_SIZE)
-        except Exception as e:
+            self.__connect(sock)
+            self._mark('connect')
+            self._stage = 'exchange'
             try:
-                self.log.error("Exception %s for TCP %s -> %s:%s, trying again",
-                               str(e), self._source, self._destination, self._port)
-                time.sleep(1)
-                sock.send(payload)
-                sock.recv(PACKET_SIZE)
-            except Exception:
-                self.log.error("Exception %s for TCP %s -> %s:%s, second try",
-                               str(e), self._source, self._destination, self._port)
-                raise
+                self._exchange(sock, payload)
+            finally:
+                self._read_tcp_info(sock)
         finally:
             sock.close()
 
+    def _read_tcp_info(self, sock):
+        """
+        Read the kernel TCP_INFO of the connection before it is closed
+        """
+        if self._tcp_info_enabled:
+            self._tcp_info = read_tcp_info(sock)
+
+    def _start(self):
+        """
+        Start the timing of a request
+        """
+        now = monotonic_ns()
+        self._marks = {'start': now, 'attempt': now}
+        self._attempts = 1
+        self._tcp_info = {}
+        self._kernel_latency = None
+
+    def _mark(self, phase):
+        """
+        Mark the end of a phase of the request, i.e. 'connect' once the
+        handshake is done, 'send' when the request of an attempt is sent
+        and 'first_byte' when the first byte of the reply arrives
+        """
+        self._marks[phase] = monotonic_ns()
+
+    def _retry(self):
+        """
+        Start the next attempt of the request, the phases of the failed
+        attempt are dropped
+        """
+        self._attempts += 1
+        self._marks = {'start': self._marks['start'],
+                       'attempt': monotonic_ns()}
+
+    def _retriable(self, error):
+        """
+        Whether a failed attempt may be retried, requests are retried
+        if they fail after the connection is established
+        """
+        return not self.negative and self._stage == 'exchange'
+
+    def _retry_delay(self, error):
+        """
+        Get the delay before the next attempt of a failed request
+        :return: delay in seconds or None if the request isn't retried
+        :rtype: float
+        """
+        if self.retries is None or not self._retriable(error):
+            return None
+        return self.retries.policy.delay(self._attempts)
+
+    def _next_payload(self):
+        """
+        Get the payload of the request
+        :rtype: memoryview
+        """
+        self._payload_size = self.payload.size()
+        self._payload = self.payload.get(self._payload_size)
+        return self._payload
+
+    def _phase_time(self, start, end):
+        """
+        Get milliseconds between the marks of two phases
+        :rtype: float
+        """
+        if start not in self._marks or end not in self._marks:
+            return None
+        return (self._marks[end] - self._marks[start]) / 1e6
+
     def _get_latency(self):
         """
         Get latency of the request
         :return: latency of the request
         :rtype: float
         """
-        time_diff = datetime.datetime.now() - self._start_time
-        return time_diff.seconds * 1000 + time_diff.microseconds * .001
+        if self._kernel_latency is not None:
+            return self._kernel_latency
+        return (monotonic_ns() - self._marks['start']) / 1e6
+
+    def _get_timings(self):
+        """
+        Get the phase times and the payload size of the request as
+        keyword arguments of a traffic record
+        :rtype: dict
+        """
+        return {
+            'connect_time': self._phase_time('attempt', 'connect'),
+            'first_byte_time': self._phase_time('send', 'first_byte'),
+            'attempts': self._attempts,
+            'payload_size': self._payload_size,
+        }
+
+    def _classify_denial(self, error):
+        """
+        Classify how a request was denied from the error it failed with
+        :param error: exception raised by the request
+        :type error: Exception
+        :return: one of Denial.allowed or None if the error isn't a denial
+        :rtype: str
+        """
+        if isinstance(error, socket.timeout):
+            return Denial.DROP
+        code = getattr(error, 'errno', None)
+        if code in (errno.ECONNREFUSED, errno.ECONNRESET):
+            return Denial.RESET
+        if code in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+            return Denial.UNREACHABLE
+        return None
+
+    def _record_failure(self, error):
+        self.record(success=False, error=str(error),
+                    denial=self._classify_denial(error))
 
     def is_traffic_successful(self, success):
         if not bool(self._connected):
@@ -142,16 +310,20 @@ class TCPClient(Client):
             result = bool(self._action) == bool(success)
         return result
 
-    def record(self, success=True, error=None):
+    def record(self, success=True, error=None, denial=None):
         """
         Record the traffic to data source
         :return: None
         """
+        stage = None if success else self._stage
         success = self.is_traffic_successful(success)
+        measurements = self._get_timings()
+        measurements.update(self._tcp_info)
         record = TCPRecord(
             self._source, self._destination, self._port,
             self._get_latency(),
-            error, success, self._connected)
+            error, success, self._connected, stage, denial,
+            **measurements)
         try:
             self._record_queue.put(record)
         except Exception:
@@ -161,69 +333,207 @@ class TCPClient(Client):
                                                           self._destination,
                                                           self._record_queue))
 
+    def _run_attempt(self):
+        """
+        Make an attempt of the current request, a failed attempt is
+        either recorded or handed to the retry queue
+        :return: False if the request is retried later
+        :rtype: bool
+        """
+        try:
+            self._attempt(self._payload)
+            self.record()
+        except Exception as e:
+            delay = self._retry_delay(e)
+            if delay is None:
+                self._record_failure(e)
+                return True
+            self.log.error(
+                "Exception %s for %s %s -> %s:%s, retrying in %.1fs",
+                str(e), self.PROTOCOL, self._source, self._destination,
+                self._port, delay)
+            self.retries.schedule(delay, self._resume)
+            return False
+        return True
+
+    def _resume(self):
+        self._retry()
+        if self._run_attempt():
+            self._next_request()
+
+    def _next_request(self):
+        while self._remaining:
+            self._remaining -= 1
+            self._start()
+            self._next_payload()
+            if not self._run_attempt():
+                # the retry continues with the remaining requests
+                return
+
     def ping(self):
-        payload = 'Dinkirk'.encode()
-        for _ in range(self._request_count):
+        self._remaining = self._request_count
+        self._next_request()
+
+
+class TLSClient(TCPClient):
+    """
+    Client to send requests over TLS connections. Unless the rule sets
+    'tls_resumption' to False, a handshake resumes the session of the
+    previous handshake with the destination, so the records tell full
+    handshakes from resumed ones.
+    """
+
+    PROTOCOL = 'TLS'
+
+    def __init__(self, *args, **kwargs):
+        super(TLSClient, self).__init__(*args, **kwargs)
+        # sessions of the traffic client, a new session is negotiated by
+        # every handshake without it
+        self.sessions = None
+        self._resumed = None
+        self._resumption = self._options.get('tls_resumption', True)
+
+    def _start(self):
+        super(TLSClient, self)._start()
+        self._resumed = None
+
+    def _session(self):
+        if self.sessions is None or not self._resumption:
+            return None
+        return self.sessions.get(self._destination, self._port)
+
+    def _store_session(self, session):
+        if self.sessions is not None and self._resumption:
+            self.sessions.put(self._destination, self._port, session)
+
+    def _attempt(self, payload):
+        """
+        Make an attempt of the request over a new TLS connection
+        :param payload: data to be send
+        :type payload: memoryview
+        """
+        self._stage = 'connect'
+        sock = self._create_socket()
+        try:
+            sock.connect((self._destination, self._port))
+            self._mark('connect')
+            # payloads are sent a TLS record at a time
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._stage = 'handshake'
+            session = self._session()
+            # python 2 has no session resumption
+            kwargs = {'session': session} if session is not None else {}
+            sock = client_context().wrap_socket(
+                sock, do_handshake_on_connect=False, **kwargs)
+            sock.do_handshake()
+            self._mark('handshake')
+            self._resumed = getattr(sock, 'session_reused', False)
+            self._stage = 'exchange'
             try:
-                self._start_time = datetime.datetime.now()
-                sock = self._create_socket()
-                self.__connect(sock)
-                self._send_receive(sock, payload)
-                self.record()
-            except Exception as e:
-                self.record(success=False, error=str(e))
+                self._exchange(sock, payload)
+            finally:
+                self._read_tcp_info(sock)
+            # TLS 1.3 tickets arrive after the handshake, they are read
+            # along with the reply
+            self._store_session(getattr(sock, 'session', None))
+        finally:
+            sock.close()
+
+    def _get_timings(self):
+        timings = super(TLSClient, self)._get_timings()
+        timings.update({
+            'tls_handshake_time': self._phase_time('connect', 'handshake'),
+            'tls_resumed': self._resumed,
+        })
+        return timings
+
+    def record(self, success=True, error=None, denial=None):
+        """
+        Record the traffic to data source
+        :return: None
+        """
+        stage = None if success else self._stage
+        success = self.is_traffic_successful(success)
+        measurements = self._get_timings()
+        measurements.update(self._tcp_info)
+        record = TLSRecord(
+            self._source, self._destination, self._port,
+            self._get_latency(),
+            error, success, self._connected, stage, denial,
+            **measurements)
+        try:
+            self._record_queue.put(record)
+        except Exception:
+            self.log.exception(
+                "Exception in adding TLS record for src {0} "
+                "and dst {1} to traffic queue {2}".format(self._source,
+                                                          self._destination,
+                                                          self._record_queue))
 
 
 class UDPClient(TCPClient):
 
-    def ping(self):
-        payload = 'Dinkirk'.encode()
-        for _ in range(self._request_count):
-            try:
-                self._start_time = datetime.datetime.now()
-                address_family = socket.AF_INET6 if self._ipv6 else socket.AF_INET
-                sock = self._create_socket(address_family, socket.SOCK_DGRAM)
-                self._send_receive(sock, payload)
-                self.record()
-            except Exception as e:
-                self.record(success=False, error=str(e))
-
-    def _send_receive(self, sock, payload):
-        """
-        Send and receive the packet
-        :param sock: socket which is connected to server
-        :type sock: socket
+    PROTOCOL = 'UDP'
+
+    def __init__(self, *args, **kwargs):
+        super(UDPClient, self).__init__(*args, **kwargs)
+        self._timestamping_enabled = UDP_TIMESTAMPING_ENABLED or \
+            bool(self._options.get('timestamping'))
+
+    def _receive(self, sock, timestamping):
+        """
+        Receive the reply, with kernel timestamps the latency of the
+        request is the time between the kernel TX timestamp of the request
+        and the kernel RX timestamp of the reply
+        """
+        if not timestamping:
+            sock.recv_into(self.payload.receive_buffer)
+            return
+        sent = read_tx_timestamps(sock)
+        _, _, received = recv_into_with_timestamp(
+            sock, self.payload.receive_buffer)
+        sent = sent + read_tx_timestamps(sock)
+        if sent and received is not None:
+            self._kernel_latency = (received - sent[-1][1]) / 1e6
+
+    def _classify_denial(self, error):
+        # ICMP port unreachable is reported as connection refused
+        if getattr(error, 'errno', None) == errno.ECONNREFUSED:
+            return Denial.UNREACHABLE
+        return super(UDPClient, self)._classify_denial(error)
+
+    def _attempt(self, payload):
+        """
+        Send the datagram and receive its echo
         :param payload: data to be send
-        :type payload: str
-        :return: data returned from server
-        :rtype: str
+        :type payload: memoryview
         """
+        self._stage = 'exchange'
+        address_family = socket.AF_INET6 if self._ipv6 else socket.AF_INET
+        sock = self._create_socket(address_family, socket.SOCK_DGRAM)
+        timestamping = self._timestamping_enabled and \
+            enable_timestamping(sock, tx=True)
         try:
-            sock.sendto(payload, (self._destination, self._port))
-            sock.recvfrom(PACKET_SIZE)
-        except Exception as e:
-            try:
-                self.log.error("Exception %s for UDP %s -> %s:%s, trying again",
-                               str(e), self._source, self._destination, self._port)
-                time.sleep(1)
-                sock.sendto(payload, (self._destination, self._port))
-                sock.recvfrom(PACKET_SIZE)
-            except Exception:
-                self.log.error("Exception %s for UDP %s -> %s:%s, second try",
-                               str(e), self._source, self._destination, self._port)
-                raise
+            # ICMP unreachable errors are only reported on a connected socket
+            sock.connect((self._destination, self._port))
+            self._mark('send')
+            sock.send(payload)
+            self._receive(sock, timestamping)
+            self._mark('first_byte')
         finally:
             sock.close()
 
-    def record(self, success=True, error=None):
+    def record(self, success=True, error=None, denial=None):
         """
         Record the traffic to data source
         :return: None
         """
+        stage = None if success else self._stage
         success = self.is_traffic_successful(success)
         record = UDPRecord(
             self._source, self._destination, self._port,
-            self._get_latency(), error, success, self._connected)
+            self._get_latency(), error, success, self._connected, stage,
+            denial, **self._get_timings())
         try:
             self._record_queue.put(record)
         except Exception:
@@ -234,41 +544,266 @@ class UDPClient(TCPClient):
                                                           self._record_queue))
 
 
+class ICMPClient(UDPClient):
+    """
+    Client to send ICMP echo requests with the payload of the rule, no
+    server is needed on the destination and the port of the rule is
+    ignored. Every request opens an ICMP socket of its own.
+    """
+
+    PROTOCOL = 'ICMP'
+    # room for the IP header a raw socket receives with the reply
+    IP_HEADER_SIZE = 60
+
+    def _receive_echo(self, sock, family, raw, identifier, sequence):
+        """
+        Receive the reply to the echo request, the replies to other
+        echoes and ICMP packets which reach the socket are skipped until
+        the timeout
+        """
+        deadline = time.time() + self._timeout
+        size = ECHO_HEADER.size + len(self._payload) + self.IP_HEADER_SIZE
+        while True:
+            data = sock.recv(size)
+            reply = parse_echo_reply(memoryview(data), family, raw)
+            # the kernel matches the replies of datagram sockets to them
+            if reply is not None and reply[1] == sequence and \
+                    (not raw or reply[0] == identifier):
+                return
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise socket.timeout('timed out')
+            sock.settimeout(remaining)
+
+    def _attempt(self, payload):
+        """
+        Send an echo request and receive its reply
+        :param payload: payload of the echo request
+        :type payload: memoryview
+        """
+        self._stage = 'exchange'
+        family = socket.AF_INET6 if self._ipv6 else socket.AF_INET
+        sock, raw = open_socket(family)
+        identifier = random.getrandbits(16)
+        sequence = random.getrandbits(16)
+        size = ECHO_HEADER.size + len(payload)
+        packet = bytearray(size)
+        packet[ECHO_HEADER.size:] = payload
+        pack_echo(packet, family, identifier, sequence, size)
+        try:
+            sock.settimeout(self._timeout)
+            self._mark('send')
+            sock.sendto(packet, (self._destination, 0))
+            self._receive_echo(sock, family, raw, identifier, sequence)
+            self._mark('first_byte')
+        finally:
+            sock.close()
+
+    def record(self, success=True, error=None, denial=None):
+        """
+        Record the traffic to data source
+        :return: None
+        """
+        stage = None if success else self._stage
+        success = self.is_traffic_successful(success)
+        record = ICMPRecord(
+            self._source, self._destination, self._port,
+            self._get_latency(), error, success, self._connected, stage,
+            denial, **self._get_timings())
+        try:
+            self._record_queue.put(record)
+        except Exception:
+            self.log.exception(
+                "Exception in adding ICMP record for src {0} "
+                "and dst {1} to traffic queue {2}".format(self._source,
+                                                          self._destination,
+                                                          self._record_queue))
+
+
+class HTTPConnectionPool(object):
+    """
+    Keep alive HTTP/1.1 connections shared by all of the HTTP rules of a
+    traffic client. At most max_size idle connections are kept for every
+    destination, connections idle for more than idle_timeout seconds are
+    closed.
+    """
+
+    def __init__(self, max_size=None, idle_timeout=None,
+                 timeout=TRAFFIC_CLIENT_TIMEOUT):
+        self._max_size = max_size or HTTP_POOL_SIZE
+        self._idle_timeout = idle_timeout or HTTP_POOL_IDLE_TIMEOUT
+        self._timeout = timeout
+        self._idle = {}
+        self._lock = Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _close(self, connection):
+        connection.close()
+
+    def _evict(self, now):
+        expired = []
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                expired.extend(connection for connection, last_used in idle
+                               if now - last_used > self._idle_timeout)
+                idle = [(connection, last_used) for connection, last_used
+                        in idle if now - last_used <= self._idle_timeout]
+                if idle:
+                    self._idle[key] = idle
+                else:
+                    del self._idle[key]
+        for connection in expired:
+            self._close(connection)
+
+    def _pop_idle(self, destination, port):
+        """
+        Take the most recently used idle connection to a destination
+        :return: connection or None if there is no idle connection
+        """
+        self._evict(time.time())
+        with self._lock:
+            idle = self._idle.get((destination, port))
+            if not idle:
+                return None
+            self.reused += 1
+            return idle.pop()[0]
+
+    def connect(self, destination, port):
+        """
+        Open a new connection to a destination, the socket itself is
+        connected by the first request.
+        :rtype: http_client.HTTPConnection
+        """
+        with self._lock:
+            self.opened += 1
+        return http_client.HTTPConnection(
+            destination, port, timeout=self._timeout)
+
+    def acquire(self, destination, port):
+        """
+        Get an idle connection to a destination or a new one
+        :return: connection and whether it is reused
+        :rtype: tuple
+        """
+        connection = self._pop_idle(destination, port)
+        if connection is not None:
+            return connection, True
+        return self.connect(destination, port), False
+
+    def release(self, destination, port, connection):
+        """
+        Give back a connection after a complete response, the connection
+        is closed if the pool of the destination is full.
+        """
+        with self._lock:
+            idle = self._idle.setdefault((destination, port), [])
+            if len(idle) < self._max_size:
+                idle.append((connection, time.time()))
+                return
+        self._close(connection)
+
+    def stats(self):
+        """
+        Get the counters of the pool
+        :rtype: dict
+        """
+        with self._lock:
+            idle = sum(len(idle) for idle in self._idle.values())
+        return {
+            'http_idle': idle,
+            'http_opened': self.opened,
+            'http_reused': self.reused,
+        }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                self._close(connection)
+
+
 class HTTPClient(TCPClient):
+    """
+    HTTP client which sends its requests over the keep alive connections
+    of pool, or over a connection per request if it has no pool.
+    """
+
+    PROTOCOL = 'HTTP'
+
+    def __init__(self, *args, **kwargs):
+        super(HTTPClient, self).__init__(*args, **kwargs)
+        self.pool = None
+        self._status = None
 
-    def _send_receive(self):
-        url = 'http://%s:%s' % (self._destination, self._port)
-        status = None
+    def _request(self, connection):
+        """
+        Send a GET request and read the complete response
+        :param connection: connection to the destination
+        :type connection: http_client.HTTPConnection
+        :return: status code of the response
+        :rtype: int
+        """
         try:
-            status = urlopen(url).code
-            if status != 200:
-                raise Exception(
-                    "HTTP Request failed with status %s" % status)
-        except Exception as e:
-            if status:
-                raise
-            try:
-                self.log.error("Exception %s for HTTP %s -> %s:%s, trying again",
-                               str(e), self._source, self._destination, self._port)
-                time.sleep(1)
-                status = urlopen(url).code
-                if status != 200:
-                    raise Exception(
-                        "HTTP Request failed with status %s" % status)
-            except Exception:
-                self.log.error("Exception %s for HTTP %s -> %s:%s, second try",
-                               str(e), self._source, self._destination, self._port)
+            if connection.sock is None:
+                connection.connect()
+                self._mark('connect')
+            self._mark('send')
+            connection.request('GET', '/')
+            response = connection.getresponse()
+            self._mark('first_byte')
+            response.read()
+        except Exception:
+            connection.close()
+            raise
+        # connections of negative probes aren't opened by the pool
+        if self.pool is None or self.negative or response.will_close:
+            connection.close()
+        else:
+            self.pool.release(self._destination, self._port, connection)
+        return response.status
+
+    def _get_status(self):
+        if self.pool is None or self.negative:
+            return self._request(http_client.HTTPConnection(
+                self._destination, self._port, timeout=self._timeout))
+        connection, reused = self.pool.acquire(self._destination, self._port)
+        try:
+            return self._request(connection)
+        except Exception:
+            if not reused:
                 raise
-
-    def record(self, success=True, error=None):
+        # the server may have closed the idle connection in the meantime
+        self._retry()
+        return self._request(self.pool.connect(self._destination, self._port))
+
+    def _next_payload(self):
+        # requests are plain GETs
+        return None
+
+    def _retriable(self, error):
+        # a response with an error status isn't retried
+        return not self.negative and self._status is None
+
+    def _attempt(self, payload):
+        self._status = None
+        self._status = self._get_status()
+        if self._status != 200:
+            raise Exception(
+                "HTTP Request failed with status %s" % self._status)
+
+    def record(self, success=True, error=None, denial=None):
         """
         Record the traffic to data source
         :return: None
         """
+        stage = None if success else self._stage
         success = self.is_traffic_successful(success)
         record = HTTPRecord(
             self._source, self._destination, self._port,
-            self._get_latency(), error, success, self._connected)
+            self._get_latency(), error, success, self._connected, stage,
+            denial, **self._get_timings())
         try:
             self._record_queue.put(record)
         except Exception:
@@ -278,56 +813,209 @@ class HTTPClient(TCPClient):
                                                           self._destination,
                                                           self._record_queue))
 
-    def ping(self):
-        for _ in range(self._request_count):
-            try:
-                self._start_time = datetime.datetime.now()
-                self._send_receive()
-                self.record()
-            except Exception as e:
-                self.record(success=False, error=str(e))
-
 
 class TrafficClient(object):
 
-    def __init__(self, src, destinations, record_queue, request_rate=100, ipv6=False):
+    CLIENT_CLASSES = {
+        'TCP': TCPClient,
+        'UDP': UDPClient,
+        'HTTP': HTTPClient,
+        'TLS': TLSClient,
+        'ICMP': ICMPClient,
+    }
+    # rules in these modes run for their duration from the start of the
+    # client instead of being probed in turn, by the runners created for
+    # them
+    RUNNERS = {
+        Mode.STREAM: create_streams,
+        Mode.CPS: create_cps,
+        Mode.HOLD: create_holders,
+        Mode.SWEEP: create_sweeps,
+    }
+    # rules in these modes share their runners, which are created from
+    # all of the rules of the mode at once
+    SHARED_RUNNERS = {
+        Mode.MULTICAST: create_senders,
+    }
+
+    def __init__(self, src, destinations, record_queue, request_rate=100,
+                 ipv6=False, start=None, rate_share=1.0):
+        """
+        :param start: scheduled start of the client, it starts right away
+                      by default
+        :type start: ScheduledStart
+        :param rate_share: share of the request rate of the endpoint the
+                           client sends, when its destinations are split
+                           across several clients
+        :type rate_share: float
+        """
         self._src = src
-        self._request_rate = min(request_rate, len(destinations))
-        self._destinations = itertools.cycle(destinations)
-        self._record_queue = record_queue
+        self._streams = [client for client in destinations
+                         if self._runner(client) is not None]
+        destinations = [client for client in destinations
+                        if self._runner(client) is None]
+        self._destination_count = len(destinations)
+        self._request_rate = min(request_rate * rate_share,
+                                 len(destinations))
+        # request_rate probes are sent every 5 seconds
+        self._coverage = CoverageScheduler(
+            destinations, max(self._request_rate, 1) / 5.0)
+        # at most request_rate probes are in flight
+        self._slots = BoundedSemaphore(int(max(self._request_rate, 1)))
+        self._stats = None
+        # results of the probes are fed back to the coverage scheduler
+        self._record_queue = CoverageQueue(record_queue, self._coverage)
+        self._http_pool = HTTPConnectionPool()
+        self._tls_sessions = TLSSessionCache()
+        self._retries = RetryQueue()
+        self._start = start
+        self.log = logging.getLogger(__name__)
 
-    def _send_traffic(self):
-        threads = []
+    def _runner(self, client):
+        """
+        Get the function creating the runners of a rule which runs for a
+        duration
+        :return: function or None if the rule is probed in turn
+        :rtype: callable
+        """
+        mode = unpack_client(client)[5].get('mode')
+        return self.RUNNERS.get(mode, self.SHARED_RUNNERS.get(mode))
 
-        for _ in range(self._request_rate):
-            protocol, port, endpoint, connected, action = \
-                next(self._destinations)
-            try:
-                ipv6 = True if ipaddress.ip_address(endpoint).version == 6 else False
-            except ValueError:
-                ipv6 = False
-            if protocol == "TCP":
-                client = TCPClient(
-                    self._src, endpoint, port, self._record_queue,
-                    connected, action, ipv6=ipv6)
-            elif protocol == "UDP":
-                client = UDPClient(
-                    self._src, endpoint, port, self._record_queue,
-                    connected, action, ipv6=ipv6)
-            elif protocol == "HTTP":
-                client = HTTPClient(
-                    self._src, endpoint, port, self._record_queue,
-                    connected, action, ipv6=ipv6)
-            else:
-                raise RuntimeError("Invalid protocol name %s" % protocol)
-            thread = Thread(target=client.ping)
+    def _create_client(self, protocol, port, endpoint, connected, action,
+                       options=None):
+        """
+        Create the client object which sends traffic for a single rule
+        :param options: per rule options
+        :type options: dict
+        :return: client for the protocol of the rule
+        :rtype: Client
+        """
+        try:
+            ipv6 = True if ipaddress.ip_address(endpoint).version == 6 \
+                else False
+        except ValueError:
+            ipv6 = False
+        client_class = self.CLIENT_CLASSES.get(protocol)
+        if client_class is None:
+            raise RuntimeError("Invalid protocol name %s" % protocol)
+        client = client_class(
+            self._src, endpoint, port, self._record_queue,
+            connected, action, ipv6=ipv6, options=options)
+        if protocol == 'HTTP':
+            client.pool = self._http_pool
+        elif protocol == 'TLS':
+            client.sessions = self._tls_sessions
+        client.retries = self._retries
+        return client
+
+    def _probe(self, client):
+        try:
+            client.ping()
+        finally:
+            self._slots.release()
+
+    def _send_traffic(self, count=None):
+        """
+        Send requests on the schedule of a RateScheduler, request_rate of
+        them every 5 seconds, each in a thread of its own. A slow request
+        doesn't hold back the ones after it until request_rate of them are
+        in flight, the schedule lag and the achieved rate are reported.
+        :param count: number of requests to send, runs forever if None
+        :type count: int
+        """
+        now = monotonic_ns() / 1e9
+        self._stats = ScheduleStats(now)
+        scheduler = RateScheduler(self._request_rate / 5.0,
+                                  TRAFFIC_ARRIVAL_PROFILE,
+                                  TRAFFIC_BURST_SIZE, start=now)
+        last_report = now
+        threads = []
+        sent = 0
+        while count is None or sent < count:
+            send_time = scheduler.next_send_time()
+            delay = send_time - monotonic_ns() / 1e9
+            if delay > 0:
+                time.sleep(delay)
+            self._slots.acquire()
+            self._stats.add(monotonic_ns() / 1e9 - send_time)
+            client = self._create_client(
+                *unpack_client(next(self._coverage)))
+            thread = Thread(target=self._probe, args=(client,))
             thread.daemon = True
             thread.start()
-            threads.append(thread)
+            if count is not None:
+                threads.append(thread)
+            sent += 1
+            now = monotonic_ns() / 1e9
+            if now - last_report >= TRAFFIC_REPORT_INTERVAL:
+                self._report(now)
+                last_report = now
         for thread in threads:
             thread.join()
+        self._report(monotonic_ns() / 1e9)
+
+    def _wait_for_start(self):
+        """
+        Wait for the scheduled start and record how far the actual start
+        is from it
+        """
+        if self._start is None:
+            return
+        metrics = self._start.offsets(self._start.wait())
+        self.log.info("Start of %s: %s", self._src, metrics)
+        try:
+            self._record_queue.put(StartRecord(self._src, metrics))
+        except Exception:
+            self.log.exception(
+                "Exception in adding start record for src %s to "
+                "traffic queue %s", self._src, self._record_queue)
+
+    def _start_streams(self):
+        """
+        Start every runner of the rules which run for a duration, i.e.
+        the flows of streams, in a thread
+        :return: threads of the runners
+        :rtype: list
+        """
+        runners = []
+        shared = {}
+        for client in self._streams:
+            mode = unpack_client(client)[5].get('mode')
+            if mode in self.SHARED_RUNNERS:
+                shared.setdefault(mode, []).append(client)
+                continue
+            create = self._runner(client)
+            runners.extend(create(self._src, client, self._record_queue))
+        for mode, clients in shared.items():
+            runners.extend(self.SHARED_RUNNERS[mode](
+                self._src, clients, self._record_queue))
+        threads = []
+        for runner in runners:
+            thread = Thread(target=runner.run)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _report(self, now):
+        """
+        Record the schedule of the client and the staleness of its
+        destinations
+        """
+        metrics = self._stats.report(now, self._request_rate / 5.0)
+        metrics.update(self._coverage.report())
+        self.log.info("Schedule of %s: %s", self._src, metrics)
+        try:
+            self._record_queue.put(ScheduleRecord(self._src, metrics))
+        except Exception:
+            self.log.exception(
+                "Exception in adding schedule record for src %s to "
+                "traffic queue %s", self._src, self._record_queue)
 
     def run(self):
-        while True:
+        self._wait_for_start()
+        streams = self._start_streams()
+        if self._destination_count:
             self._send_traffic()
-            time.sleep(5)
+        for thread in streams:
+            thread.join()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Connection rate stress of the rules in 'cps' mode. New flows are opened
+and closed back to back for a duration at up to a rate cap, every flow
+from the next port of a source port range so each of them is a new
+5-tuple for the stateful devices on the path. Flows are opened by a pool
+of threads, blocking connects release the interpreter while the kernel
+makes the handshake.
+"""
+
+import ipaddress
+import logging
+import socket
+import threading
+import time
+
+from axon.client.traffic_elements import Mode
+from axon.common import config as conf
+from axon.traffic.resources import CPS_MAGIC, CPSRecord, unpack_client
+
+
+def is_cps(client):
+    """
+    Check if a client of the connected state is a rule in cps mode
+    :param client: (protocol, port, destination, connected, action[, options])
+    :type client: tuple
+    :rtype: bool
+    """
+    return unpack_client(client)[5].get('mode') == Mode.CPS
+
+
+class PortRange(object):
+    """
+    Source ports handed out in turn to the flows of a rule
+    """
+
+    def __init__(self, first, last):
+        self._first = first
+        self._last = last
+        self._next = first
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            port = self._next
+            self._next = self._first if port >= self._last else port + 1
+            return port
+
+
+class Pacer(object):
+    """
+    Start times of the flows of a rule, one every 1 / rate seconds. A
+    flow which can't start on time starts right away without holding the
+    ones after it back.
+    """
+
+    def __init__(self, rate, start):
+        self._interval = 1.0 / rate
+        self._next = start
+        self._lock = threading.Lock()
+
+    def reserve(self, now):
+        """
+        Reserve the start time of the next flow
+        :rtype: float
+        """
+        with self._lock:
+            slot = max(self._next, now)
+            self._next = slot + self._interval
+            return slot
+
+
+class CPSMeter(object):
+    """
+    Flows opened by a rule and their handshake latency, sampled every
+    interval
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._failures = 0
+        self.connections = 0
+        self.failures = 0
+
+    def add(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self.connections += 1
+
+    def fail(self):
+        with self._lock:
+            self._failures += 1
+            self.failures += 1
+
+    def sample(self, elapsed):
+        """
+        Get the flows since the last sample
+        :param elapsed: seconds since the last sample
+        :type elapsed: float
+        :return: rates per second and handshake latency in milliseconds
+        :rtype: dict
+        """
+        with self._lock:
+            latencies, self._latencies = self._latencies, []
+            failures, self._failures = self._failures, 0
+        latencies.sort()
+        count = len(latencies)
+        return {
+            'connections': count,
+            'failures': failures,
+            'cps': count / elapsed if elapsed > 0 else 0.0,
+            'failures_per_second': failures / elapsed if elapsed > 0
+            else 0.0,
+            'handshake_p50': latencies[int(count * .5)] if count else 0.0,
+            'handshake_p90': latencies[int(count * .9)] if count else 0.0,
+            'handshake_p99': latencies[int(count * .99)] if count else 0.0,
+            'handshake_max': latencies[-1] if count else 0.0,
+        }
+
+
+class TCPConnectionRate(object):
+    """
+    Flows of a TCP rule in cps mode. A flow is the handshake, CPS_MAGIC
+    and the close of the connection by the server, after which the
+    client closes its side.
+    """
+
+    PROTOCOL = 'TCP'
+    SOCKET_TYPE = socket.SOCK_STREAM
+
+    def __init__(self, source, destination, port, record_queue, ipv6=False,
+                 options=None):
+        """
+        :param options: cps options of the rule, see
+                        traffic_elements.ConnectionRate
+        :type options: dict
+        """
+        options = options if options else {}
+        self._source = source
+        self._destination = destination
+        self._port = port
+        self._record_queue = record_queue
+        self._ipv6 = ipv6
+        self._duration = options.get('duration', conf.CPS_DURATION)
+        self._rate = options.get('rate', conf.CPS_RATE)
+        self._concurrency = options.get('concurrency', conf.CPS_CONCURRENCY)
+        self._ports = PortRange(
+            *options.get('source_ports', conf.CPS_SOURCE_PORTS))
+        self._meter = CPSMeter()
+        self._pacer = None
+        self._error = None
+        self.log = logging.getLogger(__name__)
+
+    def _create_socket(self, source_port):
+        family = socket.AF_INET6 if self._ipv6 else socket.AF_INET
+        sock = socket.socket(family, self.SOCKET_TYPE)
+        try:
+            sock.settimeout(conf.TRAFFIC_CLIENT_TIMEOUT)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('::' if self._ipv6 else '', source_port))
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _exchange(self, sock):
+        """
+        Finish the flow once the handshake is done
+        """
+        sock.sendall(CPS_MAGIC)
+        # wait for the server to close the connection
+        sock.recv(len(CPS_MAGIC))
+
+    def _flow(self, source_port):
+        """
+        Open and close a flow
+        :return: handshake latency in milliseconds
+        :rtype: float
+        """
+        sock = self._create_socket(source_port)
+        try:
+            start = time.time()
+            sock.connect((self._destination, self._port))
+            latency = (time.time() - start) * 1e3
+            self._exchange(sock)
+            return latency
+        finally:
+            sock.close()
+
+    def _work(self, deadline):
+        while True:
+            now = time.time()
+            slot = self._pacer.reserve(now)
+            if slot >= deadline:
+                return
+            if slot > now:
+                time.sleep(slot - now)
+            try:
+                latency = self._flow(self._ports.next())
+            except Exception as e:
+                self._error = e
+                self._meter.fail()
+                continue
+            self._meter.add(latency)
+
+    def run(self):
+        start = time.time()
+        deadline = start + self._duration
+        self._pacer = Pacer(self._rate, start)
+        threads = []
+        for _ in range(self._concurrency):
+            thread = threading.Thread(target=self._work, args=(deadline,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        last = start
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(min(conf.CPS_INTERVAL, 0.1))
+            now = time.time()
+            if now - last >= conf.CPS_INTERVAL:
+                self._report(self._meter.sample(now - last))
+                last = now
+        now = time.time()
+        duration = now - start
+        # flows of the last partial interval
+        metrics = self._meter.sample(now - last)
+        if metrics['connections'] or metrics['failures']:
+            self._report(metrics)
+        self._record({
+            'connections': self._meter.connections,
+            'failures': self._meter.failures,
+            'duration': duration,
+            'cps': self._meter.connections / duration,
+        })
+
+    def _report(self, metrics):
+        if metrics['failures'] and self._error is not None:
+            self.log.error("%s cps %s -> %s:%s, %s flows failed: %s",
+                           self.PROTOCOL, self._source, self._destination,
+                           self._port, metrics['failures'], self._error)
+        self._record(metrics)
+
+    def _record(self, metrics):
+        try:
+            self._record_queue.put(CPSRecord(
+                self._source, metrics, self._destination, self._port))
+        except Exception:
+            self.log.exception(
+                "Exception in adding cps record for src %s and dst %s "
+                "to traffic queue %s", self._source, self._destination,
+                self._record_queue)
+
+
+class UDPConnectionRate(TCPConnectionRate):
+    """
+    Flows of a UDP rule in cps mode. A flow is a datagram from a new
+    source port, the latency is the round trip of its echo.
+    """
+
+    PROTOCOL = 'UDP'
+    SOCKET_TYPE = socket.SOCK_DGRAM
+
+    def _flow(self, source_port):
+        sock = self._create_socket(source_port)
+        try:
+            sock.connect((self._destination, self._port))
+            start = time.time()
+            sock.send(CPS_MAGIC)
+            sock.recv(len(CPS_MAGIC))
+            return (time.time() - start) * 1e3
+        finally:
+            sock.close()
+
+
+CPS_CLASSES = {
+    'TCP': TCPConnectionRate,
+    'UDP': UDPConnectionRate,
+}
+
+
+def create_cps(source, client, record_queue):
+    """
+    Create the runner of a rule in cps mode
+    :param client: client of the connected state
+    :type client: tuple
+    :return: the runner of the rule, in a list like the flows of streams
+    :rtype: list
+    """
+    protocol, port, destination, _, _, options = unpack_client(client)
+    try:
+        ipv6 = ipaddress.ip_address(destination).version == 6
+    except ValueError:
+        ipv6 = False
+    cps_class = CPS_CLASSES.get(protocol)
+    if cps_class is None:
+        raise RuntimeError("Invalid cps protocol name %s" % protocol)
+    return [cps_class(source, destination, port, record_queue, ipv6=ipv6,
+                      options=options)]
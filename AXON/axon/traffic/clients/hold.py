@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Idle connections of the rules in 'hold' mode. A rule holds its
+connections open for a duration and sends a heartbeat on each of them
+every heartbeat interval, which the server echoes. Connections which are
+reset, closed or whose heartbeat times out are counted and opened again,
+so the count of live connections shows whether the stateful devices on
+the path keep all of them. All of the connections of a rule are
+coroutines of an event loop of its own.
+"""
+
+import asyncio
+import logging
+import random
+
+from axon.client.traffic_elements import Mode
+from axon.common import config as conf
+from axon.common.utils import raise_open_files_limit
+from axon.traffic.resources import HOLD_MAGIC, HOLD_HEARTBEAT, HoldRecord, \
+    unpack_client
+
+
+def is_hold(client):
+    """
+    Check if a client of the connected state is a rule in hold mode
+    :param client: (protocol, port, destination, connected, action[, options])
+    :type client: tuple
+    :rtype: bool
+    """
+    return unpack_client(client)[5].get('mode') == Mode.HOLD
+
+
+class ConnectionHolder(object):
+    """
+    Held connections of a TCP rule in hold mode
+    """
+
+    def __init__(self, source, destination, port, record_queue,
+                 options=None):
+        """
+        :param options: hold options of the rule, see traffic_elements.Hold
+        :type options: dict
+        """
+        options = options if options else {}
+        self._source = source
+        self._destination = destination
+        self._port = port
+        self._record_queue = record_queue
+        self._connections = options.get('connections', conf.HOLD_CONNECTIONS)
+        self._heartbeat = options.get('heartbeat', conf.HOLD_HEARTBEAT)
+        self._duration = options.get('duration')
+        self._timeout = conf.TRAFFIC_CLIENT_TIMEOUT
+        self._connects = None
+        self._random = random.Random()
+        self.live = 0
+        self._reset_stats()
+        self.log = logging.getLogger(__name__)
+
+    def _reset_stats(self):
+        self._opened = 0
+        self._connect_failures = 0
+        self._resets = 0
+        self._closed = 0
+        self._timeouts = 0
+        self._heartbeats = 0
+        self._rtts = []
+
+    async def _connect(self):
+        async with self._connects:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self._destination, self._port),
+                self._timeout)
+        writer.write(HOLD_MAGIC)
+        return reader, writer
+
+    async def _send_heartbeats(self, reader, writer, deadline):
+        """
+        Send the heartbeats of a connection until the deadline
+        """
+        loop = asyncio.get_event_loop()
+        # heartbeats of the connections are spread over the interval
+        delay = self._random.uniform(0, self._heartbeat)
+        while True:
+            if deadline is not None:
+                delay = min(delay, deadline - loop.time())
+                if delay <= 0:
+                    return
+            await asyncio.sleep(delay)
+            if deadline is not None and loop.time() >= deadline:
+                return
+            sent = loop.time()
+            writer.write(HOLD_HEARTBEAT)
+            await asyncio.wait_for(writer.drain(), self._timeout)
+            data = await asyncio.wait_for(
+                reader.read(len(HOLD_HEARTBEAT)), self._timeout)
+            if not data:
+                raise EOFError("Connection closed by peer")
+            self._heartbeats += 1
+            self._rtts.append((loop.time() - sent) * 1e3)
+            delay = self._heartbeat
+
+    async def _hold(self, deadline):
+        """
+        Hold a connection until the deadline, it is opened again
+        whenever it is lost
+        """
+        loop = asyncio.get_event_loop()
+        while deadline is None or loop.time() < deadline:
+            try:
+                reader, writer = await self._connect()
+            except Exception as e:
+                self.log.debug("Hold connection to %s:%s failed: %s",
+                               self._destination, self._port, e)
+                self._connect_failures += 1
+                await asyncio.sleep(self._heartbeat)
+                continue
+            self._opened += 1
+            self.live += 1
+            try:
+                await self._send_heartbeats(reader, writer, deadline)
+            except EOFError:
+                self._closed += 1
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+            except OSError:
+                self._resets += 1
+            finally:
+                self.live -= 1
+                writer.close()
+
+    def _report(self):
+        rtts = self._rtts
+        metrics = {
+            'live': self.live,
+            'target': self._connections,
+            'opened': self._opened,
+            'connect_failures': self._connect_failures,
+            'resets': self._resets,
+            'closed': self._closed,
+            'timeouts': self._timeouts,
+            'heartbeats': self._heartbeats,
+            'heartbeat_rtt_avg': sum(rtts) / len(rtts) if rtts else 0.0,
+            'heartbeat_rtt_max': max(rtts) if rtts else 0.0,
+        }
+        self._reset_stats()
+        try:
+            self._record_queue.put(HoldRecord(
+                self._source, metrics, self._destination, self._port))
+        except Exception:
+            self.log.exception(
+                "Exception in adding hold record for src %s and dst %s "
+                "to traffic queue %s", self._source, self._destination,
+                self._record_queue)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        self._connects = asyncio.Semaphore(conf.HOLD_CONNECT_CONCURRENCY)
+        deadline = loop.time() + self._duration if self._duration else None
+        tasks = [asyncio.ensure_future(self._hold(deadline))
+                 for _ in range(self._connections)]
+        pending = tasks
+        while pending:
+            _, pending = await asyncio.wait(
+                pending, timeout=conf.HOLD_INTERVAL)
+            self._report()
+
+    def run(self):
+        if not raise_open_files_limit():
+            self.log.warning("Unable to raise the open files limit")
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._run())
+        finally:
+            loop.close()
+
+
+def create_holders(source, client, record_queue):
+    """
+    Create the holder of a rule in hold mode
+    :param client: client of the connected state
+    :type client: tuple
+    :return: the holder of the rule, in a list like the flows of streams
+    :rtype: list
+    """
+    protocol, port, destination, _, _, options = unpack_client(client)
+    if protocol != 'TCP':
+        raise RuntimeError("Invalid hold protocol name %s" % protocol)
+    return [ConnectionHolder(source, destination, port, record_queue,
+                             options=options)]
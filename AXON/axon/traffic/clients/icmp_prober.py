@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import random
+
+from axon.common.config import ECHO_BUFFER_SIZE
+from axon.traffic.clients.udp_prober import UDPProber, _SocketEndpoint
+from axon.traffic.icmp import ECHO_HEADER, open_socket, pack_echo, \
+    parse_echo_reply
+
+
+class _ICMPEndpoint(_SocketEndpoint):
+    """
+    ICMP socket of a prober, probes are sent as the payload of echo
+    requests and the payload of the echo replies is handed to the prober
+    """
+
+    def __init__(self, prober, family):
+        self.raw = False
+        super(_ICMPEndpoint, self).__init__(prober, family)
+        # replies to the echoes of other processes reach raw sockets too
+        self._identifier = random.getrandbits(16)
+        self._packet = bytearray(ECHO_HEADER.size)
+        self._buffer = memoryview(bytearray(ECHO_BUFFER_SIZE))
+        self._start_reading()
+
+    def _create_socket(self, family):
+        sock, self.raw = open_socket(family)
+        return sock
+
+    def sendto(self, data, address):
+        size = ECHO_HEADER.size + len(data)
+        if len(self._packet) < size:
+            self._packet = bytearray(size)
+        self._packet[ECHO_HEADER.size:size] = data
+        # the icmp sequence number is the low half of the probe's
+        pack_echo(self._packet, self._family, self._identifier,
+                  self._prober.HEADER.unpack_from(data)[1], size)
+        try:
+            self.sock.sendto(memoryview(self._packet)[:size],
+                             (address[0], 0))
+        except OSError:
+            # unanswered probe, expired by the timer wheel
+            pass
+
+    def _read(self):
+        while True:
+            try:
+                size = self.sock.recv_into(self._buffer)
+            except OSError:
+                return
+            reply = parse_echo_reply(self._buffer[:size], self._family,
+                                     self.raw)
+            if reply is None:
+                continue
+            identifier, _, offset = reply
+            if self.raw and identifier != self._identifier:
+                continue
+            self._prober.reply_received(self._buffer[offset:size])
+
+
+class ICMPProber(UDPProber):
+    """
+    Sends the ICMP echoes of a traffic client over one ICMP socket per
+    address family. Every echo carries a probe of the UDPProber, so
+    replies are matched by the sequence number of the probe and echoes
+    left unanswered are expired by its timer wheel.
+    """
+
+    async def _create_transport(self, family):
+        return _ICMPEndpoint(self, family)
+
+    async def probe(self, destination, port=0, ipv6=False, size=None):
+        """
+        Send an echo request and wait for its reply
+        :param size: size of the payload of the echo in bytes
+        :type size: int
+        :return: round trip time in milliseconds
+        :rtype: float
+        :raises socket.timeout: if no reply arrives within the timeout
+        """
+        return await super(ICMPProber, self).probe(
+            destination, 0, ipv6, size)
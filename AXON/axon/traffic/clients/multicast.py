@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+One to many traffic of the rules in 'multicast' mode. The rules of a
+source to the same group and port share a sender, which sends a single
+sequence numbered datagram to the group every interval however many
+receivers the group has. Every receiver joins the group on the port and
+sends what it got from the sender back to it in a report, so the sender
+records the datagrams received and lost and their latency per receiver.
+A receiver of the rules which doesn't report is recorded as such.
+"""
+
+import ipaddress
+import logging
+import random
+import select
+import socket
+import time
+
+from axon.client.traffic_elements import Mode
+from axon.common import config as conf
+from axon.traffic.resources import STREAM_HEADER, STREAM_TIMESTAMP, \
+    STREAM_SUMMARY, STREAM_STATS, MULTICAST_MAGIC, MULTICAST_REPORT_MAGIC, \
+    MULTICAST_LATENCY, MulticastRecord, unpack_client
+
+REPORT_SIZE = STREAM_HEADER.size + STREAM_SUMMARY.size + STREAM_STATS.size + \
+    MULTICAST_LATENCY.size
+
+
+def is_multicast(client):
+    """
+    Check if a client of the connected state is a rule in multicast mode
+    :param client: (protocol, port, destination, connected, action[, options])
+    :type client: tuple
+    :rtype: bool
+    """
+    return unpack_client(client)[5].get('mode') == Mode.MULTICAST
+
+
+def get_group(options, ipv6=False):
+    """
+    Get the group of a rule in multicast mode
+    :param options: options of the rule
+    :type options: dict
+    :param ipv6: whether the source of the rule is an IPv6 address
+    :type ipv6: bool
+    :rtype: str
+    """
+    if options.get('group'):
+        return options['group']
+    return conf.MULTICAST_GROUP_V6 if ipv6 else conf.MULTICAST_GROUP
+
+
+def parse_report(data):
+    """
+    Parse a report of a receiver
+    :param data: datagram received by the sender
+    :type data: bytearray
+    :return: stream id and the datagrams, expected, reordered, duplicates,
+             jitter, average and maximum latency of the report or None if
+             the datagram isn't a report
+    :rtype: tuple
+    """
+    if len(data) < REPORT_SIZE:
+        return None
+    magic, stream, _ = STREAM_HEADER.unpack_from(data)
+    if magic != MULTICAST_REPORT_MAGIC:
+        return None
+    offset = STREAM_HEADER.size
+    _, datagrams = STREAM_SUMMARY.unpack_from(data, offset)
+    offset += STREAM_SUMMARY.size
+    expected, reordered, duplicates, jitter = STREAM_STATS.unpack_from(
+        data, offset)
+    offset += STREAM_STATS.size
+    latency_avg, latency_max = MULTICAST_LATENCY.unpack_from(data, offset)
+    return stream, (datagrams, expected, reordered, duplicates, jitter,
+                    latency_avg, latency_max)
+
+
+class ReceiverCounters(object):
+    """
+    Reports of a receiver of a sender. The counters of the reports are
+    totals since the receiver saw the first datagram of the sender, they
+    are sampled as the difference to the previous sample.
+    """
+
+    def __init__(self):
+        self._base = (0, 0, 0, 0)
+        self._last = (0, 0, 0, 0)
+        self._jitter = 0.0
+        self._reports = 0
+        self._latency_total = 0.0
+        self._latency_count = 0
+        self._latency_max = 0.0
+
+    def add(self, report):
+        datagrams, expected, reordered, duplicates, jitter, latency_avg, \
+            latency_max = report
+        if datagrams < self._last[0]:
+            # the receiver started over
+            self._base = self._last = (0, 0, 0, 0)
+        count = datagrams - self._last[0]
+        if count > 0:
+            self._latency_total += latency_avg * count
+            self._latency_max = latency_max if not self._latency_count \
+                else max(self._latency_max, latency_max)
+            self._latency_count += count
+        self._last = (datagrams, expected, reordered, duplicates)
+        self._jitter = jitter
+        self._reports += 1
+
+    def sample(self, sent):
+        """
+        Get the datagrams of the sender the receiver reported since the
+        previous sample
+        :param sent: datagrams sent since the previous sample
+        :type sent: int
+        :rtype: dict
+        """
+        datagrams, expected, reordered, duplicates = (
+            last - base for last, base in zip(self._last, self._base))
+        received = max(datagrams - duplicates, 0)
+        if not self._reports:
+            # nothing came back, the datagrams may as well be lost
+            expected = sent
+        lost = max(expected - received, 0)
+        metrics = {
+            'reporting': 1 if self._reports else 0,
+            'sent': sent,
+            'received': received,
+            'lost': lost,
+            'loss': lost / float(expected) if expected else 0.0,
+            'reordered': reordered,
+            'duplicates': duplicates,
+            'jitter': self._jitter,
+            'latency_avg': self._latency_total / self._latency_count
+            if self._latency_count else 0.0,
+            'latency_max': self._latency_max,
+        }
+        self._base = self._last
+        self._reports = 0
+        self._latency_total = 0.0
+        self._latency_count = 0
+        self._latency_max = 0.0
+        return metrics
+
+
+class MulticastSender(object):
+    """
+    Sender of the rules of a source in multicast mode to a group and port
+    """
+
+    def __init__(self, source, group, port, receivers, record_queue,
+                 options=None):
+        """
+        :param receivers: destinations of the rules, the receivers which
+                          are expected to report
+        :type receivers: list
+        :param options: multicast options of the rules, see
+                        traffic_elements.Multicast
+        :type options: dict
+        """
+        options = options if options else {}
+        self._source = source
+        self._group = group
+        self._port = port
+        self._receivers = dict(
+            (receiver, ReceiverCounters()) for receiver in receivers)
+        self._record_queue = record_queue
+        self._family = socket.AF_INET6 \
+            if ipaddress.ip_address(u'%s' % group).version == 6 \
+            else socket.AF_INET
+        self._interval = options.get('interval', conf.MULTICAST_INTERVAL)
+        self._ttl = options.get('ttl', conf.MULTICAST_TTL)
+        self._id = random.getrandbits(32)
+        self._datagram = bytearray(STREAM_HEADER.size + STREAM_TIMESTAMP.size)
+        self._report = bytearray(REPORT_SIZE)
+        self.sent = 0
+        self.log = logging.getLogger(__name__)
+
+    def _create_socket(self):
+        sock = socket.socket(self._family, socket.SOCK_DGRAM)
+        try:
+            if self._family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6,
+                                socket.IPV6_MULTICAST_HOPS, self._ttl)
+                sock.setsockopt(socket.IPPROTO_IPV6,
+                                socket.IPV6_MULTICAST_LOOP, 1)
+            else:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL,
+                                self._ttl)
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP,
+                                1)
+                try:
+                    # send from the interface of the source rather than
+                    # the one of the route to the group
+                    sock.setsockopt(socket.IPPROTO_IP,
+                                    socket.IP_MULTICAST_IF,
+                                    socket.inet_aton(self._source))
+                except (socket.error, ValueError):
+                    self.log.debug("%s isn't a local address, multicast "
+                                   "of %s follows the route to %s",
+                                   self._source, self._source, self._group)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def send(self, sock):
+        """
+        Send the next datagram to the group
+        """
+        STREAM_HEADER.pack_into(self._datagram, 0, MULTICAST_MAGIC,
+                                self._id, self.sent)
+        STREAM_TIMESTAMP.pack_into(self._datagram, STREAM_HEADER.size,
+                                   int(time.time() * 1e9))
+        sock.sendto(self._datagram, (self._group, self._port))
+        self.sent += 1
+
+    def read_reports(self, sock, timeout):
+        """
+        Read the reports of the receivers until the timeout
+        :param timeout: seconds to wait for reports
+        :type timeout: float
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0 or \
+                    not select.select([sock], [], [], remaining)[0]:
+                return
+            size, address = sock.recvfrom_into(self._report)
+            report = parse_report(memoryview(self._report)[:size])
+            if report is None or report[0] != self._id:
+                continue
+            receiver = address[0]
+            counters = self._receivers.get(receiver)
+            if counters is None:
+                # other members of the group are recorded too
+                counters = self._receivers[receiver] = ReceiverCounters()
+            counters.add(report[1])
+
+    def _record(self, sent):
+        for receiver, counters in self._receivers.items():
+            metrics = counters.sample(sent)
+            if not metrics['reporting']:
+                self.log.error("Multicast %s -> %s:%s, no report from "
+                               "receiver %s", self._source, self._group,
+                               self._port, receiver)
+            try:
+                self._record_queue.put(MulticastRecord(
+                    self._source, metrics, receiver, self._port))
+            except Exception:
+                self.log.exception(
+                    "Exception in adding multicast record for src %s and "
+                    "dst %s to traffic queue %s", self._source, receiver,
+                    self._record_queue)
+
+    def run(self):
+        sock = self._create_socket()
+        try:
+            recorded = 0
+            last = start = time.time()
+            while True:
+                self.send(sock)
+                # datagrams are sent on a fixed schedule, the reports are
+                # read in between
+                self.read_reports(
+                    sock, start + self.sent * self._interval - time.time())
+                now = time.time()
+                if now - last >= conf.MULTICAST_REPORT_INTERVAL:
+                    self._record(self.sent - recorded)
+                    recorded = self.sent
+                    last = now
+        finally:
+            sock.close()
+
+
+def create_senders(source, clients, record_queue):
+    """
+    Create the senders of the rules in multicast mode of a source
+    :param clients: clients of the connected state in multicast mode
+    :type clients: list
+    :return: a sender per group and port of the rules
+    :rtype: list
+    """
+    try:
+        ipv6 = ipaddress.ip_address(u'%s' % source).version == 6
+    except ValueError:
+        ipv6 = False
+    groups = {}
+    for client in clients:
+        protocol, port, destination, _, _, options = unpack_client(client)
+        if protocol != 'UDP':
+            raise RuntimeError("Invalid multicast protocol name %s" %
+                               protocol)
+        key = (get_group(options, ipv6), port)
+        if key not in groups:
+            # the options of the first rule apply to the group
+            groups[key] = ([], options)
+        groups[key][0].append(destination)
+    return [MulticastSender(source, group, port, receivers, record_queue,
+                            options=options)
+            for (group, port), (receivers, options) in groups.items()]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import bisect
+import errno
+import random
+import socket
+import threading
+
+from axon.client.traffic_elements import PayloadSize
+
+DEFAULT_PAYLOAD = b'Dinkirk'
+
+
+class Payload(object):
+    """
+    Payloads of the requests of a rule. The sizes are drawn from a
+    weighted distribution and every payload is a memoryview of a send
+    buffer allocated once, replies are read into a receive buffer
+    allocated once, so large payloads don't allocate per request.
+    """
+
+    def __init__(self, sizes=None):
+        """
+        :param sizes: size in bytes or (size, weight) pairs, by default
+                      DEFAULT_PAYLOAD is sent
+        :type sizes: int or tuple
+        """
+        if sizes is None:
+            self._sizes = [len(DEFAULT_PAYLOAD)]
+            self._weights = [1.0]
+        else:
+            sizes = PayloadSize.normalize(sizes)
+            self._sizes = [size for size, _ in sizes]
+            self._weights = []
+            for _, weight in sizes:
+                self._weights.append(
+                    weight + (self._weights[-1] if self._weights else 0))
+        self.max_size = max(self._sizes)
+        repeat = -(-self.max_size // len(DEFAULT_PAYLOAD))
+        self._send = memoryview(
+            bytearray(DEFAULT_PAYLOAD * repeat)[:self.max_size])
+        # replies are only counted, so the buffer is a scratch area which
+        # concurrent requests may overwrite
+        self.receive_buffer = memoryview(bytearray(self.max_size))
+
+    def size(self):
+        """
+        Draw the size of the next payload
+        :rtype: int
+        """
+        if len(self._sizes) == 1:
+            return self._sizes[0]
+        return self._sizes[bisect.bisect_right(
+            self._weights, random.random() * self._weights[-1])]
+
+    def get(self, size):
+        """
+        Get a payload of size bytes
+        :rtype: memoryview
+        """
+        return self._send[:size]
+
+
+_payloads = {}
+_payloads_lock = threading.Lock()
+
+
+def get_payload(sizes=None):
+    """
+    Get the payload of a payload size option, the payloads of the rules
+    are shared by all of their clients so their buffers are allocated once
+    :param sizes: size or (size, weight) pairs
+    :type sizes: int or tuple
+    :rtype: Payload
+    """
+    key = None if sizes is None else PayloadSize.normalize(sizes)
+    with _payloads_lock:
+        payload = _payloads.get(key)
+        if payload is None:
+            payload = _payloads[key] = Payload(key)
+        return payload
+
+
+def receive_exactly(sock, buffer, size):
+    """
+    Read size bytes of a stream socket into buffer
+    :param buffer: receive buffer of at least size bytes
+    :type buffer: memoryview
+    :raises socket.error: if the peer closes the connection before
+    """
+    received = 0
+    while received < size:
+        count = sock.recv_into(buffer[received:size])
+        if not count:
+            raise socket.error(errno.ECONNRESET, "Connection closed by peer")
+        received += count
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import collections
+import socket
+
+from axon.common import config as conf
+from axon.common.utils import monotonic_ns
+from axon.traffic.clients.clients import HTTPConnectionPool
+from axon.traffic.resources import PIPELINE_MAGIC, PIPELINE_HEADER
+
+
+async def wait_for(coro, timeout):
+    """
+    Wait for a coroutine and raise socket.timeout like a blocking
+    socket would, so records carry the same error as threaded clients.
+    """
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        raise socket.timeout('timed out')
+
+
+class TCPConnection(object):
+    """
+    Long lived TCP connection over which the requests of a rule are
+    exchanged one at a time.
+    """
+
+    def __init__(self, destination, port, timeout):
+        self._destination = destination
+        self._port = port
+        self._timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+        self.connects = 0
+
+    @property
+    def connected(self):
+        return self.writer is not None and \
+            not self.writer.transport.is_closing()
+
+    @property
+    def reconnects(self):
+        return max(self.connects - 1, 0)
+
+    async def connect(self):
+        self.close()
+        self.reader, self.writer = await wait_for(
+            asyncio.open_connection(self._destination, self._port),
+            self._timeout)
+        self.connects += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader, self.writer = None, None
+
+
+class PipelinedConnection(TCPConnection):
+    """
+    Long lived TCP connection over which up to window length prefixed
+    requests of a rule are outstanding at the same time. Responses arrive
+    in the order of the requests and are matched to them by a reader task.
+    """
+
+    def __init__(self, destination, port, timeout, window=None):
+        super(PipelinedConnection, self).__init__(destination, port, timeout)
+        self.window = asyncio.Semaphore(window or conf.PIPELINE_WINDOW)
+        # (sequence, future) of the outstanding requests
+        self._pending = collections.deque()
+        self._sequence = 0
+        self._reader_task = None
+
+    async def connect(self):
+        await super(PipelinedConnection, self).connect()
+        self.writer.write(PIPELINE_MAGIC)
+        self._reader_task = asyncio.ensure_future(
+            self._read_responses(self.reader))
+
+    async def _read_responses(self, reader):
+        try:
+            while True:
+                header = await reader.readexactly(PIPELINE_HEADER.size)
+                received = monotonic_ns()
+                sequence, _, size = PIPELINE_HEADER.unpack(header)
+                if size:
+                    await reader.readexactly(size)
+                if not self._pending or self._pending[0][0] != sequence:
+                    raise ConnectionError(
+                        "Unexpected response %s on pipelined connection" %
+                        sequence)
+                future = self._pending.popleft()[1]
+                if not future.done():
+                    future.set_result(received)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        pending, self._pending = self._pending, collections.deque()
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+        self.close()
+
+    async def request(self, payload, response_size):
+        """
+        Send a request and wait for its response
+        :param payload: payload of the request
+        :type payload: memoryview
+        :param response_size: size of the payload of the response
+        :type response_size: int
+        :return: monotonic nanosecond timestamp of the first byte of the
+                 response
+        :rtype: int
+        """
+        self._sequence = (self._sequence + 1) & 0xffffffff
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((self._sequence, future))
+        self.writer.write(PIPELINE_HEADER.pack(
+            self._sequence, len(payload), response_size))
+        self.writer.write(payload)
+        await self.writer.drain()
+        return await future
+
+    def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        super(PipelinedConnection, self).close()
+        if self._pending:
+            self._fail(ConnectionResetError("Pipelined connection closed"))
+
+
+class ConnectionPool(object):
+    """
+    Connections of a traffic client keyed by (src, dst, port)
+    """
+
+    def __init__(self, connection_class, timeout):
+        self._connection_class = connection_class
+        self._timeout = timeout
+        self._connections = {}
+
+    def get(self, src, destination, port, **kwargs):
+        """
+        Get the connection to a destination, created on first use
+        :param kwargs: arguments of a new connection
+        :return: connection
+        :rtype: TCPConnection
+        """
+        key = (src, destination, port)
+        connection = self._connections.get(key)
+        if connection is None:
+            connection = self._connection_class(destination, port,
+                                                self._timeout, **kwargs)
+            self._connections[key] = connection
+        return connection
+
+    def __len__(self):
+        return len(self._connections)
+
+    def stats(self):
+        """
+        Get the connection counters of the pool
+        :rtype: dict
+        """
+        connections = list(self._connections.values())
+        return {
+            'connections': len(connections),
+            'connected': len([c for c in connections if c.connected]),
+            'reconnects': sum(c.reconnects for c in connections),
+        }
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+
+class AsyncHTTPConnectionPool(HTTPConnectionPool):
+    """
+    Keep alive HTTP/1.1 connections of an asyncio traffic client
+    """
+
+    async def connect(self, destination, port):
+        self.opened += 1
+        connection = TCPConnection(destination, port, self._timeout)
+        await connection.connect()
+        return connection
+
+    async def acquire(self, destination, port):
+        connection = self._pop_idle(destination, port)
+        if connection is not None:
+            return connection, True
+        return await self.connect(destination, port), False
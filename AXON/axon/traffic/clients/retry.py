@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from axon.common import config as conf
+
+
+class RetryPolicy(object):
+    """
+    Number of retries of a failed probe and the delay before each of
+    them, which backs off exponentially with jitter so retries of a
+    flapping path don't arrive in lock step.
+    """
+
+    def __init__(self, count=None, backoff=None, max_backoff=None,
+                 jitter=None, rand=None):
+        """
+        :param count: retries after the first attempt
+        :type count: int
+        :param backoff: delay before the first retry in seconds
+        :type backoff: float
+        :param max_backoff: upper bound of the delay in seconds
+        :type max_backoff: float
+        :param jitter: spread of the delay as a fraction of it
+        :type jitter: float
+        :param rand: random generator of the jitter
+        :type rand: random.Random
+        """
+        self.count = conf.TRAFFIC_RETRY_COUNT if count is None else count
+        self._backoff = conf.TRAFFIC_RETRY_BACKOFF if backoff is None \
+            else backoff
+        self._max_backoff = conf.TRAFFIC_RETRY_MAX_BACKOFF \
+            if max_backoff is None else max_backoff
+        self._jitter = conf.TRAFFIC_RETRY_JITTER if jitter is None \
+            else jitter
+        self._random = rand or random.Random()
+
+    def delay(self, attempts):
+        """
+        Get the delay before the next attempt of a probe
+        :param attempts: attempts made so far
+        :type attempts: int
+        :return: delay in seconds or None if the probe isn't retried
+        :rtype: float
+        """
+        if attempts > self.count:
+            return None
+        delay = min(self._backoff * 2 ** (attempts - 1), self._max_backoff)
+        return delay * (1 + self._random.uniform(-self._jitter, self._jitter))
+
+
+class RetryQueue(object):
+    """
+    Central queue of the delayed retries of the threaded clients. A
+    single timer thread starts every retry in a thread of its own once it
+    is due, so no thread is parked while a retry waits.
+    """
+
+    def __init__(self, policy=None):
+        self.policy = policy or RetryPolicy()
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.retried = 0
+
+    def schedule(self, delay, callback):
+        """
+        Run callback in a new thread after delay seconds
+        """
+        with self._condition:
+            heapq.heappush(self._heap, (time.time() + delay,
+                                        next(self._counter), callback))
+            self.retried += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    @property
+    def pending(self):
+        with self._condition:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and \
+                        (not self._heap or self._heap[0][0] > time.time()):
+                    timeout = self._heap[0][0] - time.time() \
+                        if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                callback = heapq.heappop(self._heap)[2]
+            thread = threading.Thread(target=callback)
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._heap = []
+            self._condition.notify()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import heapq
+import random
+import threading
+import time
+
+from axon.common import config as conf
+from axon.traffic.resources import TrafficRecord, unpack_client
+
+
+class ArrivalProfile(object):
+    """
+    This class enlists the arrival profiles supported by RateScheduler.
+        - constant: requests are evenly spaced.
+        - poisson: exponentially distributed inter arrival times.
+        - burst: groups of burst_size requests, evenly spaced.
+    """
+    CONSTANT = 'constant'
+    POISSON = 'poisson'
+    BURST = 'burst'
+
+    allowed = [CONSTANT, POISSON, BURST]
+
+
+class TokenBucket(object):
+    """
+    Token bucket which caps the send rate at rate tokens per second, with
+    bursts of at most capacity tokens.
+    """
+
+    def __init__(self, rate, capacity, now):
+        self._rate = float(rate)
+        self._capacity = float(max(capacity, 1))
+        self._tokens = self._capacity
+        self._last = now
+
+    def admit(self, now):
+        """
+        Take a token at time now
+        :param now: time at which a request wants to be sent
+        :type now: float
+        :return: time at which the request may be sent
+        :rtype: float
+        """
+        if now > self._last:
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._last) * self._rate)
+            self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return max(now, self._last)
+        # wait for the missing fraction of the token, which is consumed
+        # as soon as it is available
+        self._last += (1 - self._tokens) / self._rate
+        self._tokens = 0
+        return self._last
+
+
+class RateScheduler(object):
+    """
+    Open loop scheduler which computes when every request is meant to be
+    sent for a target rate. The schedule doesn't depend on how long the
+    previous requests took, so a slow destination can't lower the rate.
+    """
+
+    def __init__(self, rate, profile=ArrivalProfile.CONSTANT, burst_size=1,
+                 start=0.0, rand=None):
+        """
+        :param rate: target requests per second
+        :type rate: float
+        :param profile: arrival profile, one of ArrivalProfile.allowed
+        :type profile: str
+        :param burst_size: requests per burst and capacity of the bucket
+        :type burst_size: int
+        :param start: time of the first request
+        :type start: float
+        :param rand: random generator used for poisson arrivals
+        :type rand: random.Random
+        """
+        if rate <= 0:
+            raise ValueError("Invalid request rate %s" % rate)
+        if profile not in ArrivalProfile.allowed:
+            raise ValueError("Invalid arrival profile %s" % profile)
+        self._rate = float(rate)
+        self._profile = profile
+        self._burst_size = max(int(burst_size), 1)
+        self._random = rand or random.Random()
+        self._bucket = TokenBucket(rate, self._burst_size, start)
+        self._arrival = start
+        self._count = 0
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def _next_interval(self):
+        if self._count == 0:
+            return 0.0
+        if self._profile == ArrivalProfile.POISSON:
+            return self._random.expovariate(self._rate)
+        if self._profile == ArrivalProfile.BURST:
+            if self._count % self._burst_size:
+                return 0.0
+            return self._burst_size / self._rate
+        return 1 / self._rate
+
+    def next_send_time(self):
+        """
+        Get the time at which the next request is meant to be sent
+        :return: intended send time
+        :rtype: float
+        """
+        self._arrival += self._next_interval()
+        self._count += 1
+        return self._bucket.admit(self._arrival)
+
+
+class ScheduledStart(object):
+    """
+    Absolute wall clock time at which a traffic client starts sending, so
+    the agents of a test start together regardless of the latency of the
+    calls which started them. Every agent draws an offset in [0, jitter)
+    of its own, the clocks of the agents are expected to be synchronized.
+    """
+
+    # the last seconds before the start are busy waited, since a sleep
+    # overshoots by the timer slack of the kernel
+    SPIN = 0.002
+
+    def __init__(self, start_time, jitter=0.0, rand=None):
+        """
+        :param start_time: unix timestamp of the start of the test
+        :type start_time: float
+        :param jitter: spread of the start of the agents in seconds
+        :type jitter: float
+        :param rand: random generator of the offset
+        :type rand: random.Random
+        """
+        self.start_time = float(start_time)
+        self.jitter = float(jitter or 0.0)
+        self.offset = (rand or random).uniform(0, self.jitter) \
+            if self.jitter > 0 else 0.0
+        self.target = self.start_time + self.offset
+
+    def wait(self, clock=time.time, sleep=time.sleep):
+        """
+        Block until the start of the agent
+        :return: time at which the wait ended
+        :rtype: float
+        """
+        while True:
+            now = clock()
+            remaining = self.target - now
+            if remaining <= 0:
+                return now
+            if remaining > self.SPIN:
+                sleep(remaining - self.SPIN)
+
+    def offsets(self, started):
+        """
+        Get the offsets of an actual start
+        :param started: time at which the client started
+        :type started: float
+        :return: offsets in milliseconds, 'offset' from the start of the
+                 test and 'error' from the start of the agent
+        :rtype: dict
+        """
+        return {
+            'start_time': self.start_time,
+            'jitter': self.offset * 1000,
+            'offset': (started - self.start_time) * 1000,
+            'error': (started - self.target) * 1000,
+        }
+
+
+class ScheduleStats(object):
+    """
+    Collects the achieved rate and schedule lag of a traffic client, the
+    lag being the delay between the intended and the actual start of a
+    request.
+    """
+
+    def __init__(self, now):
+        self._start = now
+        self._lags = []
+
+    def add(self, lag):
+        self._lags.append(max(lag, 0.0))
+
+    def report(self, now, target_rate):
+        """
+        Get the stats since the last report and start a new interval
+        :return: measurements, latencies in milliseconds
+        :rtype: dict
+        """
+        elapsed = now - self._start
+        lags = sorted(self._lags)
+        sent = len(lags)
+        stats = {
+            'target_rate': target_rate,
+            'achieved_rate': sent / elapsed if elapsed > 0 else 0.0,
+            'sent': sent,
+            'lag_avg': sum(lags) * 1000 / sent if sent else 0.0,
+            'lag_p99': lags[int(sent * .99)] * 1000 if sent else 0.0,
+            'lag_max': lags[-1] * 1000 if sent else 0.0,
+        }
+        self._start = now
+        self._lags = []
+        return stats
+
+
+class PairState(object):
+    """
+    Probe history of a source destination pair of a CoverageScheduler
+    """
+
+    def __init__(self, index, client, now):
+        self.index = index
+        self.client = client
+        protocol, port, destination, _, _, options = unpack_client(client)
+        self.key = (protocol, destination, port)
+        self.criticality = options.get('criticality', 1.0)
+        self.last = now
+        self.due = now
+        self.version = 0
+        self.score = 0.0
+        self.streak = 0
+        self.probes = 0
+        self.failures = 0
+        # longest time the pair went without a probe
+        self.worst = 0.0
+
+
+class CoverageScheduler(object):
+    """
+    Staleness aware order in which a traffic client probes its
+    destinations. Every pair is due a probe an interval after its last
+    one and the pair due first is probed next, whatever the rate of the
+    client. The interval is the share of the pair of the rate, shorter for
+    critical rules and pairs which failed recently and longer for pairs
+    which have been stable for a while, so a failing pair is checked
+    again well before a round over all of the destinations. With equal
+    intervals the pairs are probed round robin.
+    """
+
+    def __init__(self, destinations, rate, now=None,
+                 failure_weight=conf.TRAFFIC_FAILURE_WEIGHT,
+                 failure_decay=conf.TRAFFIC_FAILURE_DECAY,
+                 stable_probes=conf.TRAFFIC_STABLE_PROBES,
+                 max_backoff=conf.TRAFFIC_MAX_BACKOFF, clock=time.time):
+        """
+        :param destinations: clients of the connected state
+        :type destinations: list
+        :param rate: probes per second of the client
+        :type rate: float
+        :param clock: clock of the probe times
+        :type clock: callable
+        """
+        self._clock = clock
+        now = clock() if now is None else now
+        self._failure_weight = failure_weight
+        self._failure_decay = failure_decay
+        self._stable_probes = stable_probes
+        self._max_backoff = max_backoff
+        self._pairs = [PairState(index, client, now)
+                       for index, client in enumerate(destinations)]
+        self._index = {}
+        for pair in self._pairs:
+            self._index.setdefault(pair.key, []).append(pair)
+        self._heap = [(now, index, 0) for index in range(len(self._pairs))]
+        self._lock = threading.Lock()
+        self._period = None
+        self.rate = rate
+
+    def __len__(self):
+        return len(self._pairs)
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate):
+        if rate <= 0:
+            raise ValueError("Invalid request rate %s" % rate)
+        self._rate = float(rate)
+        # a round over all of the pairs
+        self._period = len(self._pairs) / self._rate
+
+    def interval(self, pair):
+        """
+        Get the time between the probes of a pair
+        :rtype: float
+        """
+        backoff = min(self._max_backoff,
+                      1.0 + pair.streak // self._stable_probes)
+        weight = pair.criticality * (1 + self._failure_weight * pair.score)
+        return self._period * backoff / weight
+
+    def _push(self, pair, due):
+        pair.due = due
+        pair.version += 1
+        heapq.heappush(self._heap, (due, pair.index, pair.version))
+
+    def next(self):
+        """
+        Get the destination to be probed next
+        :return: client of the connected state
+        :rtype: tuple
+        """
+        with self._lock:
+            while True:
+                _, index, version = heapq.heappop(self._heap)
+                pair = self._pairs[index]
+                if version == pair.version:
+                    break
+            now = self._clock()
+            pair.worst = max(pair.worst, now - pair.last)
+            pair.last = now
+            pair.probes += 1
+            self._push(pair, now + self.interval(pair))
+            return pair.client
+
+    __next__ = next
+
+    def __iter__(self):
+        return self
+
+    def observe(self, protocol, destination, port, success):
+        """
+        Take the result of a probe into account, a failed pair is due
+        again after its shorter interval
+        :param success: whether the probe got the expected result
+        :type success: bool
+        """
+        with self._lock:
+            for pair in self._index.get((protocol, destination, port), ()):
+                pair.score *= self._failure_decay
+                if success:
+                    pair.streak += 1
+                    continue
+                pair.score += 1
+                pair.streak = 0
+                pair.failures += 1
+                due = pair.last + self.interval(pair)
+                if due < pair.due:
+                    self._push(pair, due)
+
+    def staleness(self, now=None):
+        """
+        Get the staleness of every pair
+        :return: per pair the seconds since its last probe, the worst
+                 case seen so far and its current interval
+        :rtype: list
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            return [{
+                'protocol': pair.key[0],
+                'destination': pair.key[1],
+                'port': pair.key[2],
+                'staleness': now - pair.last,
+                'worst_staleness': max(pair.worst, now - pair.last),
+                'interval': self.interval(pair),
+                'probes': pair.probes,
+                'failures': pair.failures,
+                'failing': bool(pair.failures) and not pair.streak,
+            } for pair in self._pairs]
+
+    def report(self, now=None):
+        """
+        Get the staleness of the pairs of the client, in seconds
+        :rtype: dict
+        """
+        pairs = self.staleness(now)
+        if not pairs:
+            return {}
+        staleness = [pair['staleness'] for pair in pairs]
+        return {
+            'destinations': len(pairs),
+            'failing': sum(1 for pair in pairs if pair['failing']),
+            'staleness_avg': sum(staleness) / len(pairs),
+            'staleness_max': max(staleness),
+            'worst_staleness': max(pair['worst_staleness']
+                                   for pair in pairs),
+        }
+
+
+class CoverageQueue(object):
+    """
+    Record queue of a traffic client which hands the result of every
+    probe to its CoverageScheduler on the way to the queue
+    """
+
+    def __init__(self, queue, scheduler):
+        self._queue = queue
+        self._scheduler = scheduler
+
+    def put(self, record, *args, **kwargs):
+        if isinstance(record, TrafficRecord):
+            self._scheduler.observe(record.traffic_type, record.dst,
+                                    record.port, record.success)
+        return self._queue.put(record, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._queue, name)
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Bulk throughput streams of the rules in 'stream' mode. A stream sends
+data back to back for a duration or a byte count to a traffic server,
+which drains it and reports back what it received. Every flow of a
+stream runs in a thread of its own, blocking socket I/O releases the
+interpreter while the kernel moves the data.
+"""
+
+import ipaddress
+import logging
+import random
+import select
+import socket
+import threading
+import time
+
+from axon.client.traffic_elements import Mode
+from axon.common import config as conf
+from axon.traffic.clients.payload import DEFAULT_PAYLOAD, receive_exactly
+from axon.traffic.resources import STREAM_MAGIC, STREAM_HEADER, \
+    STREAM_DATA_MAGIC, STREAM_END_MAGIC, STREAM_REPORT_MAGIC, \
+    STREAM_TIMESTAMP, STREAM_SUMMARY, STREAM_STATS, StreamRecord, \
+    unpack_client
+
+# end datagrams of a UDP stream sent before the stream is given up
+END_ATTEMPTS = 3
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_stream_buffer(size):
+    """
+    Get the send buffer of streams written in chunks of size bytes, it
+    is shared by all of the streams and only ever read
+    :rtype: memoryview
+    """
+    with _buffers_lock:
+        buffer = _buffers.get(size)
+        if buffer is None:
+            repeat = -(-size // len(DEFAULT_PAYLOAD))
+            buffer = _buffers[size] = memoryview(
+                bytearray(DEFAULT_PAYLOAD * repeat)[:size])
+        return buffer
+
+
+def is_stream(client):
+    """
+    Check if a client of the connected state is a rule in stream mode
+    :param client: (protocol, port, destination, connected, action[, options])
+    :type client: tuple
+    :rtype: bool
+    """
+    return unpack_client(client)[5].get('mode') == Mode.STREAM
+
+
+class StreamMeter(object):
+    """
+    Bytes sent by a stream, the throughput is sampled every interval
+    seconds
+    """
+
+    def __init__(self, interval, now):
+        self._interval = interval
+        self._last = now
+        self._bytes = 0
+        self.total = 0
+        self.count = 0
+
+    def add(self, size, now):
+        """
+        Count size bytes sent at time now
+        :return: throughput of the interval if it is complete
+        :rtype: dict
+        """
+        self.total += size
+        self.count += 1
+        self._bytes += size
+        if now - self._last >= self._interval:
+            return self.sample(now)
+        return None
+
+    def sample(self, now):
+        """
+        Get the throughput since the last sample, in bits per second
+        :rtype: dict
+        """
+        elapsed = now - self._last
+        metrics = {
+            'bytes': self._bytes,
+            'throughput': self._bytes * 8 / elapsed if elapsed > 0 else 0.0,
+        }
+        self._last = now
+        self._bytes = 0
+        return metrics
+
+
+class TCPStream(object):
+    """
+    Stream of back to back writes over a TCP connection, the server
+    replies with the bytes it received once the stream is shut down
+    """
+
+    PROTOCOL = 'TCP'
+    WRITE_SIZE = conf.STREAM_TCP_WRITE_SIZE
+
+    def __init__(self, source, destination, port, record_queue, ipv6=False,
+                 options=None):
+        """
+        :param options: stream options of the rule, see
+                        traffic_elements.Stream
+        :type options: dict
+        """
+        options = options if options else {}
+        self._source = source
+        self._destination = destination
+        self._port = port
+        self._record_queue = record_queue
+        self._ipv6 = ipv6
+        self._stream_bytes = options.get('stream_bytes')
+        self._duration = options.get('duration')
+        if self._duration is None and self._stream_bytes is None:
+            self._duration = conf.STREAM_DURATION
+        sizes = options.get('payload_size')
+        self._size = max(size for size, _ in sizes) if sizes else \
+            self.WRITE_SIZE
+        self._buffer = get_stream_buffer(self._size)
+        self._meter = None
+        self.log = logging.getLogger(__name__)
+
+    def _create_socket(self, socket_type):
+        family = socket.AF_INET6 if self._ipv6 else socket.AF_INET
+        sock = socket.socket(family, socket_type)
+        sock.settimeout(conf.TRAFFIC_CLIENT_TIMEOUT)
+        return sock
+
+    def _next_size(self, now, deadline):
+        """
+        Get the size of the next write
+        :return: bytes to be written or 0 once the stream is complete
+        :rtype: int
+        """
+        if deadline is not None and now >= deadline:
+            return 0
+        if self._stream_bytes is None:
+            return self._size
+        return min(self._size, self._stream_bytes - self._meter.total)
+
+    def _send(self, sock, start):
+        """
+        Send the stream
+        """
+        deadline = start + self._duration if self._duration else None
+        now = start
+        while True:
+            size = self._next_size(now, deadline)
+            if size <= 0:
+                return
+            sock.sendall(self._buffer[:size])
+            now = time.time()
+            interval = self._meter.add(size, now)
+            if interval is not None:
+                self._record(interval)
+
+    def _summary(self, sock):
+        """
+        Shut the stream down and read the summary of the server
+        :return: bytes and datagrams received by the server
+        :rtype: tuple
+        """
+        sock.shutdown(socket.SHUT_WR)
+        summary = memoryview(bytearray(STREAM_SUMMARY.size))
+        receive_exactly(sock, summary, STREAM_SUMMARY.size)
+        return STREAM_SUMMARY.unpack(summary.tobytes())
+
+    def _stream(self, start):
+        """
+        Run the stream
+        :return: bytes and datagrams received by the server
+        :rtype: tuple
+        """
+        sock = self._create_socket(socket.SOCK_STREAM)
+        try:
+            sock.connect((self._destination, self._port))
+            sock.sendall(STREAM_MAGIC)
+            self._send(sock, start)
+            return self._summary(sock)
+        finally:
+            sock.close()
+
+    def _get_results(self, received, duration):
+        """
+        Get the measurements of the complete stream
+        :rtype: dict
+        """
+        return {
+            'bytes_sent': self._meter.total,
+            'bytes_received': received[0],
+            'duration': duration,
+            'goodput': received[0] * 8 / duration if duration > 0 else 0.0,
+            'failed': 0,
+        }
+
+    def run(self):
+        start = time.time()
+        self._meter = StreamMeter(conf.STREAM_INTERVAL, start)
+        try:
+            received = self._stream(start)
+        except Exception as e:
+            self.log.error("%s stream %s -> %s:%s failed: %s",
+                           self.PROTOCOL, self._source, self._destination,
+                           self._port, e)
+            self._record({'bytes_sent': self._meter.total,
+                          'duration': time.time() - start, 'failed': 1})
+            return
+        self._record(self._get_results(received, time.time() - start))
+
+    def _record(self, metrics):
+        try:
+            self._record_queue.put(StreamRecord(
+                self._source, metrics, self._destination, self._port))
+        except Exception:
+            self.log.exception(
+                "Exception in adding stream record for src %s and dst %s "
+                "to traffic queue %s", self._source, self._destination,
+                self._record_queue)
+
+
+class UDPStream(TCPStream):
+    """
+    One way stream of datagrams, every datagram carries the id of the
+    stream, a sequence number and the time it was sent at. The server
+    counts the datagrams of the stream, the ones out of order and the
+    duplicates, and keeps the interarrival jitter. It reports them every
+    interval and in its reply to the end datagram, the difference of the
+    datagrams received to the ones sent is the loss.
+    """
+
+    PROTOCOL = 'UDP'
+    WRITE_SIZE = conf.STREAM_UDP_DATAGRAM_SIZE
+    MIN_SIZE = STREAM_HEADER.size + STREAM_TIMESTAMP.size
+    REPLY_SIZE = STREAM_HEADER.size + STREAM_SUMMARY.size + STREAM_STATS.size
+
+    def __init__(self, *args, **kwargs):
+        super(UDPStream, self).__init__(*args, **kwargs)
+        options = kwargs.get('options') or {}
+        self._bandwidth = options.get('bandwidth')
+        self._packet_rate = options.get('packet_rate')
+        self._size = max(self._size, self.MIN_SIZE)
+        self._id = random.getrandbits(32)
+        self._datagram = bytearray(self._buffer[:self._size].tobytes())
+        self._reply = bytearray(self.REPLY_SIZE)
+
+    def _delay(self, start, now):
+        """
+        Get the time the next datagram is ahead of the schedule of the
+        bandwidth and packet rate of the stream
+        :rtype: float
+        """
+        ahead = 0
+        if self._bandwidth:
+            ahead = start + self._meter.total * 8 / self._bandwidth - now
+        if self._packet_rate:
+            ahead = max(ahead,
+                        start + self._meter.count / self._packet_rate - now)
+        return ahead
+
+    def _send(self, sock, start):
+        deadline = start + self._duration if self._duration else None
+        view = memoryview(self._datagram)
+        now = start
+        while True:
+            size = self._next_size(now, deadline)
+            if size <= 0:
+                return
+            size = max(size, self.MIN_SIZE)
+            STREAM_HEADER.pack_into(self._datagram, 0, STREAM_DATA_MAGIC,
+                                    self._id, self._meter.count)
+            STREAM_TIMESTAMP.pack_into(self._datagram, STREAM_HEADER.size,
+                                       int(time.time() * 1e9))
+            sock.send(view[:size])
+            now = time.time()
+            interval = self._meter.add(size, now)
+            if interval is not None:
+                interval.update(self._read_reports(sock))
+                self._record(interval)
+            # pace the stream, datagrams sent ahead of the schedule wait
+            # for it
+            ahead = self._delay(start, now)
+            if ahead > 0:
+                time.sleep(ahead)
+                now = time.time()
+
+    def _parse_reply(self, size):
+        """
+        Parse the counters of the server from a reply
+        :return: bytes, datagrams, expected, reordered, duplicates and
+                 jitter of the stream, the last four are None for a
+                 server without STREAM_STATS
+        :rtype: tuple
+        """
+        summary = STREAM_SUMMARY.unpack_from(self._reply, STREAM_HEADER.size)
+        if size < self.REPLY_SIZE:
+            return summary + (None,) * 4
+        return summary + STREAM_STATS.unpack_from(
+            self._reply, STREAM_HEADER.size + STREAM_SUMMARY.size)
+
+    def _read_reports(self, sock):
+        """
+        Read the reports of the server received since the last interval
+        :return: counters of the last report
+        :rtype: dict
+        """
+        counters = {}
+        while select.select([sock], [], [], 0)[0]:
+            size = sock.recv_into(self._reply)
+            if size < STREAM_HEADER.size + STREAM_SUMMARY.size:
+                continue
+            magic, stream_id, _ = STREAM_HEADER.unpack_from(self._reply)
+            if magic == STREAM_REPORT_MAGIC and stream_id == self._id:
+                counters = self._get_counters(self._parse_reply(size))
+        return counters
+
+    def _get_counters(self, received, sent=None):
+        """
+        Get the counters of the server as metrics, loss is relative to the
+        datagrams sent if given, else to the ones expected by the server
+        :rtype: dict
+        """
+        _, datagrams, expected, reordered, duplicates, jitter = received
+        counters = {'datagrams_received': datagrams}
+        if expected is None:
+            if sent is not None:
+                counters['loss'] = max(sent - datagrams, 0) / float(sent) \
+                    if sent else 0.0
+            return counters
+        if sent is not None:
+            expected = sent
+        lost = max(expected - datagrams + duplicates, 0)
+        counters.update({
+            'loss': lost / float(expected) if expected else 0.0,
+            'reordered': reordered,
+            'duplicates': duplicates,
+            'jitter': jitter,
+        })
+        return counters
+
+    def _summary(self, sock):
+        end = STREAM_HEADER.pack(STREAM_END_MAGIC, self._id, self._meter.count)
+        for _ in range(END_ATTEMPTS):
+            sock.send(end)
+            try:
+                while True:
+                    size = sock.recv_into(self._reply)
+                    if size < STREAM_HEADER.size + STREAM_SUMMARY.size:
+                        continue
+                    magic, stream_id, _ = STREAM_HEADER.unpack_from(
+                        self._reply)
+                    if magic == STREAM_END_MAGIC and stream_id == self._id:
+                        return self._parse_reply(size)
+            except socket.timeout:
+                continue
+        raise socket.timeout("No summary of the stream received")
+
+    def _stream(self, start):
+        sock = self._create_socket(socket.SOCK_DGRAM)
+        try:
+            sock.connect((self._destination, self._port))
+            self._send(sock, start)
+            return self._summary(sock)
+        finally:
+            sock.close()
+
+    def _get_results(self, received, duration):
+        results = super(UDPStream, self)._get_results(received, duration)
+        sent = self._meter.count
+        results['datagrams_sent'] = sent
+        results.update(self._get_counters(received, sent))
+        return results
+
+
+STREAM_CLASSES = {
+    'TCP': TCPStream,
+    'UDP': UDPStream,
+}
+
+
+def create_streams(source, client, record_queue):
+    """
+    Create the flows of a rule in stream mode
+    :param client: client of the connected state
+    :type client: tuple
+    :return: a stream per flow of the rule
+    :rtype: list
+    """
+    protocol, port, destination, _, _, options = unpack_client(client)
+    try:
+        ipv6 = ipaddress.ip_address(destination).version == 6
+    except ValueError:
+        ipv6 = False
+    stream_class = STREAM_CLASSES.get(protocol)
+    if stream_class is None:
+        raise RuntimeError("Invalid stream protocol name %s" % protocol)
+    return [stream_class(source, destination, port, record_queue,
+                         ipv6=ipv6, options=options)
+            for _ in range(options.get('flows', 1))]
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Port sweeps of the rules in 'sweep' mode. Every port of the port ranges
+of a rule is connected to with a non blocking connect, thousands of them
+in flight at the same time on an event loop of the rule. A port is open
+if the handshake completes, refused if the destination resets it and
+filtered if it doesn't answer within a short timeout or an ICMP error
+comes back. A sweep of a destination is recorded as a single SweepRecord
+of counters and bitmaps of the ports instead of a record per port.
+"""
+
+import asyncio
+import base64
+import errno
+import ipaddress
+import logging
+import socket
+import time
+
+from axon.client.traffic_elements import Mode
+from axon.common import config as conf
+from axon.common.utils import raise_open_files_limit
+from axon.traffic.resources import SweepRecord, unpack_client
+
+FILTERED = 0
+OPEN = 1
+REFUSED = 2
+# the socket couldn't be created or connected, i.e. out of files
+ERROR = 3
+
+REFUSED_ERRORS = (errno.ECONNREFUSED, errno.ECONNRESET)
+FILTERED_ERRORS = (errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EACCES,
+                   errno.EPERM, errno.ETIMEDOUT)
+
+
+def is_sweep(client):
+    """
+    Check if a client of the connected state is a rule in sweep mode
+    :param client: (protocol, port, destination, connected, action[, options])
+    :type client: tuple
+    :rtype: bool
+    """
+    return unpack_client(client)[5].get('mode') == Mode.SWEEP
+
+
+def expand_ports(ranges):
+    """
+    Get the ports of port ranges in order
+    :param ranges: (first, last) pairs
+    :type ranges: tuple
+    :rtype: list
+    """
+    return [port for first, last in ranges
+            for port in range(first, last + 1)]
+
+
+def format_ports(ports):
+    """
+    Format ports as compact ranges, i.e. '22,80-81'
+    :type ports: iterable
+    :rtype: str
+    """
+    ranges = []
+    for port in sorted(set(ports)):
+        if ranges and ranges[-1][1] == port - 1:
+            ranges[-1][1] = port
+        else:
+            ranges.append([port, port])
+    return ','.join(str(first) if first == last else '%s-%s' % (first, last)
+                    for first, last in ranges)
+
+
+def encode_bitmap(states, state):
+    """
+    Encode which ports are in a state as a bitmap, a bit per port in the
+    order they were swept, most significant bit first
+    :param states: state of every port swept
+    :type states: bytearray
+    :rtype: str
+    """
+    bitmap = bytearray((len(states) + 7) // 8)
+    for index, value in enumerate(states):
+        if value == state:
+            bitmap[index >> 3] |= 0x80 >> (index & 7)
+    return base64.b64encode(bytes(bitmap)).decode('ascii')
+
+
+def decode_bitmap(bitmap, ports):
+    """
+    Get the ports set in a bitmap
+    :param bitmap: bitmap from encode_bitmap
+    :type bitmap: str
+    :param ports: ports in the order they were swept
+    :type ports: list
+    :rtype: list
+    """
+    bitmap = bytearray(base64.b64decode(bitmap))
+    return [port for index, port in enumerate(ports)
+            if bitmap[index >> 3] & (0x80 >> (index & 7))]
+
+
+class PortSweep(object):
+    """
+    Sweep of the port ranges of a destination by a TCP rule in sweep mode
+    """
+
+    def __init__(self, source, destination, port, record_queue, ipv6=False,
+                 options=None):
+        """
+        :param options: sweep options of the rule, see
+                        traffic_elements.Sweep
+        :type options: dict
+        """
+        options = options if options else {}
+        self._source = source
+        self._destination = destination
+        self._port = port
+        self._record_queue = record_queue
+        self._family = socket.AF_INET6 if ipv6 else socket.AF_INET
+        self._ranges = options.get('ports', ((port, port),))
+        self._ports = expand_ports(self._ranges)
+        expected = options.get('expect_open')
+        self._expected = set(expand_ports(expected)) if expected else None
+        self._concurrency = options.get('concurrency', conf.SWEEP_CONCURRENCY)
+        self._timeout = options.get('timeout', conf.SWEEP_TIMEOUT)
+        self._interval = options.get('interval')
+        self.log = logging.getLogger(__name__)
+
+    async def _connect(self, port):
+        """
+        Connect to a port
+        :return: state of the port
+        :rtype: int
+        """
+        loop = asyncio.get_event_loop()
+        try:
+            sock = socket.socket(self._family, socket.SOCK_STREAM)
+        except OSError:
+            return ERROR
+        try:
+            sock.setblocking(False)
+            await asyncio.wait_for(
+                loop.sock_connect(sock, (self._destination, port)),
+                self._timeout)
+            return OPEN
+        except asyncio.TimeoutError:
+            return FILTERED
+        except OSError as e:
+            if e.errno in REFUSED_ERRORS:
+                return REFUSED
+            if e.errno in FILTERED_ERRORS:
+                return FILTERED
+            return ERROR
+        finally:
+            sock.close()
+
+    async def _work(self, indexes, states):
+        for index in indexes:
+            states[index] = await self._connect(self._ports[index])
+
+    async def sweep(self):
+        """
+        Sweep every port once
+        :return: state of every port, in the order of the ports
+        :rtype: bytearray
+        """
+        states = bytearray(len(self._ports))
+        # the workers share the iterator, so every port is taken once
+        indexes = iter(range(len(self._ports)))
+        await asyncio.gather(*[
+            self._work(indexes, states)
+            for _ in range(min(self._concurrency, len(self._ports)))])
+        return states
+
+    def _get_results(self, states, duration):
+        """
+        Get the counters and bitmaps of a sweep
+        :return: metrics and ports of a SweepRecord
+        :rtype: tuple
+        """
+        metrics = {
+            'swept': len(states),
+            'open': states.count(OPEN),
+            'refused': states.count(REFUSED),
+            'filtered': states.count(FILTERED),
+            'errors': states.count(ERROR),
+            'duration': duration,
+        }
+        if self._expected is not None:
+            opened = set(port for port, state in zip(self._ports, states)
+                         if state == OPEN)
+            swept = set(self._ports)
+            unexpected_open = opened - self._expected
+            unexpected_closed = (self._expected & swept) - opened
+            metrics.update({
+                'unexpected_open': len(unexpected_open),
+                'unexpected_closed': len(unexpected_closed),
+            })
+            if unexpected_open or unexpected_closed:
+                self.log.error(
+                    "Sweep %s -> %s, unexpected open ports: %s, "
+                    "unexpected closed ports: %s", self._source,
+                    self._destination, format_ports(unexpected_open),
+                    format_ports(unexpected_closed))
+        ports = {
+            'ranges': format_ports(self._ports),
+            'open': encode_bitmap(states, OPEN),
+            'refused': encode_bitmap(states, REFUSED),
+        }
+        return metrics, ports
+
+    def _record(self, metrics, ports):
+        try:
+            self._record_queue.put(SweepRecord(
+                self._source, metrics, self._destination, self._port,
+                ports=ports))
+        except Exception:
+            self.log.exception(
+                "Exception in adding sweep record for src %s and dst %s "
+                "to traffic queue %s", self._source, self._destination,
+                self._record_queue)
+
+    async def _run(self):
+        while True:
+            start = time.time()
+            states = await self.sweep()
+            duration = time.time() - start
+            self._record(*self._get_results(states, duration))
+            if not self._interval:
+                return
+            await asyncio.sleep(max(self._interval - duration, 0))
+
+    def run(self):
+        if not raise_open_files_limit():
+            self.log.warning("Unable to raise the open files limit")
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._run())
+        finally:
+            loop.close()
+
+
+def create_sweeps(source, client, record_queue):
+    """
+    Create the sweep of a rule in sweep mode
+    :param client: client of the connected state
+    :type client: tuple
+    :return: the sweep of the rule, in a list like the flows of streams
+    :rtype: list
+    """
+    protocol, port, destination, _, _, options = unpack_client(client)
+    if protocol != 'TCP':
+        raise RuntimeError("Invalid sweep protocol name %s" % protocol)
+    try:
+        ipv6 = ipaddress.ip_address(destination).version == 6
+    except ValueError:
+        ipv6 = False
+    return [PortSweep(source, destination, port, record_queue, ipv6=ipv6,
+                      options=options)]
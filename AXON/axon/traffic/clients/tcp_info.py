@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import socket
+import struct
+
+from axon.common.config import LINUX_OS
+
+# value of TCP_INFO in linux/tcp.h, socket.TCP_INFO is missing on python 2
+TCP_INFO = getattr(socket, 'TCP_INFO', 11)
+
+# leading part of struct tcp_info of linux/tcp.h, 8 u8 fields followed by
+# u32 fields up to tcpi_total_retrans
+_TCP_INFO = struct.Struct('8B24I')
+_RTT, _RTTVAR, _SND_CWND, _TOTAL_RETRANS = 8 + 15, 8 + 16, 8 + 18, 8 + 23
+
+
+def read_tcp_info(sock):
+    """
+    Read the kernel measurements of a connected TCP socket, linux only
+    :param sock: connected TCP socket
+    :type sock: socket.socket
+    :return: smoothed rtt and rtt variance in milliseconds, total
+             retransmits and congestion window in segments, or an empty
+             dict if TCP_INFO isn't available
+    :rtype: dict
+    """
+    if not LINUX_OS:
+        return {}
+    try:
+        data = sock.getsockopt(socket.IPPROTO_TCP, TCP_INFO, _TCP_INFO.size)
+        info = _TCP_INFO.unpack(data[:_TCP_INFO.size])
+    except Exception:
+        return {}
+    return {
+        'tcp_rtt': info[_RTT] / 1000.0,
+        'tcp_rttvar': info[_RTTVAR] / 1000.0,
+        'tcp_retransmits': info[_TOTAL_RETRANS],
+        'tcp_cwnd': info[_SND_CWND],
+    }
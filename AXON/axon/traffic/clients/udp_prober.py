@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+import asyncio
+import collections
+import math
+import socket
+import struct
+
+from axon.common.config import ECHO_BUFFER_SIZE, UDP_BATCH_SIZE
+from axon.common.utils import monotonic_ns
+from axon.traffic.mmsg import MessageBatch, MMSG_SUPPORTED, encode_address
+from axon.traffic.resources import PROBE_HEADER, PROBE_MAGIC, PROBE_DWELL
+from axon.traffic.timestamping import enable_timestamping, \
+    recv_into_with_timestamp, read_tx_timestamps
+
+
+class TimerWheel(object):
+    """
+    Hashed timer wheel, timers are kept in the slot of the tick at which
+    they expire so adding a timer and expiring a tick are O(1) regardless
+    of the number of timers.
+    """
+
+    def __init__(self, tick, slots, now):
+        """
+        :param tick: resolution of the wheel in seconds
+        :type tick: float
+        :param slots: number of slots, timers further away than a
+                      rotation of the wheel stay in their slot until due
+        :type slots: int
+        :param now: current time
+        :type now: float
+        """
+        self._tick = float(tick)
+        self._slots = [set() for _ in range(max(int(slots), 1))]
+        self._current = int(now / self._tick)
+
+    def add(self, key, deadline):
+        tick = max(int(math.ceil(deadline / self._tick)), self._current + 1)
+        self._slots[tick % len(self._slots)].add((tick, key))
+
+    def advance(self, now):
+        """
+        Move the wheel to time now
+        :return: keys of the timers which expired
+        :rtype: list
+        """
+        target = int(now / self._tick)
+        expired = []
+        # a slot is visited once even if the wheel went around
+        last = self._current + min(target - self._current, len(self._slots))
+        for tick in range(self._current + 1, last + 1):
+            slot = self._slots[tick % len(self._slots)]
+            due = [timer for timer in slot if timer[0] <= target]
+            for timer in due:
+                slot.discard(timer)
+                expired.append(timer[1])
+        self._current = max(self._current, target)
+        return expired
+
+
+class _ProberProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, prober):
+        self._prober = prober
+
+    def datagram_received(self, data, addr):
+        self._prober.reply_received(data)
+
+
+class _SocketEndpoint(object):
+    """
+    Non blocking socket of a prober read by the event loop, for the
+    system calls asyncio datagram transports don't make
+    """
+
+    def __init__(self, prober, family):
+        self._prober = prober
+        self._family = family
+        self._loop = asyncio.get_event_loop()
+        self.sock = self._create_socket(family)
+        self.sock.setblocking(False)
+
+    def _create_socket(self, family):
+        return socket.socket(family, socket.SOCK_DGRAM)
+
+    def _start_reading(self):
+        self._loop.add_reader(self.sock.fileno(), self._read)
+
+    def _read(self):
+        raise NotImplementedError()
+
+    def close(self):
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+class _TimestampingEndpoint(_SocketEndpoint):
+    """
+    Endpoint of a prober which reads its datagrams with the kernel RX
+    timestamps and the kernel TX timestamps of its probes
+    """
+
+    def __init__(self, prober, family):
+        super(_TimestampingEndpoint, self).__init__(prober, family)
+        self.timestamping = enable_timestamping(self.sock, tx=True)
+        # (OPT_ID, sequence) of the probes waiting for their TX timestamp
+        self._sent = collections.deque()
+        self._next_id = 0
+        self._buffer = memoryview(bytearray(ECHO_BUFFER_SIZE))
+        # errors queued with the TX timestamps wake up the reader as well
+        self._start_reading()
+
+    def sendto(self, data, address):
+        try:
+            self.sock.sendto(data, address)
+        except OSError:
+            # unanswered probe, expired by the timer wheel
+            return
+        if self.timestamping:
+            self._sent.append(
+                (self._next_id, PROBE_HEADER.unpack_from(data)[1]))
+        self._next_id += 1
+
+    def _read(self):
+        if self.timestamping:
+            for datagram_id, timestamp in read_tx_timestamps(self.sock):
+                while self._sent and self._sent[0][0] <= datagram_id:
+                    sent_id, sequence = self._sent.popleft()
+                    if sent_id == datagram_id:
+                        self._prober.sent_at(sequence, timestamp)
+        while True:
+            try:
+                size, _, received = recv_into_with_timestamp(
+                    self.sock, self._buffer)
+            except OSError:
+                return
+            self._prober.reply_received(self._buffer[:size], received)
+
+
+class _BatchEndpoint(_SocketEndpoint):
+    """
+    Endpoint of a prober which sends the probes of an iteration of the
+    event loop with one sendmmsg and reads replies with recvmmsg
+    """
+
+    def __init__(self, prober, family, batch_size):
+        super(_BatchEndpoint, self).__init__(prober, family)
+        self._out = MessageBatch(batch_size, ECHO_BUFFER_SIZE)
+        self._in = MessageBatch(batch_size, ECHO_BUFFER_SIZE)
+        self._queued = 0
+        self._names = {}
+        self._start_reading()
+
+    def sendto(self, data, address):
+        name = self._names.get(address)
+        if name is None:
+            name = self._names[address] = encode_address(
+                self._family, address)
+        self._out.set_message(self._queued, data, name)
+        self._queued += 1
+        if self._queued == 1:
+            self._loop.call_soon(self._flush)
+        elif self._queued == self._out.count:
+            self._flush()
+
+    def _flush(self):
+        queued, self._queued = self._queued, 0
+        if not queued:
+            return
+        try:
+            self._out.send(self.sock, queued)
+        except OSError:
+            # unsent probes are expired by the timer wheel
+            pass
+
+    def _read(self):
+        while True:
+            try:
+                count = self._in.recv(self.sock)
+            except OSError:
+                return
+            for index in range(count):
+                self._prober.reply_received(self._in.message(index))
+            if count < self._in.count:
+                return
+
+    def close(self):
+        self._queued = 0
+        super(_BatchEndpoint, self).close()
+
+
+class UDPProber(object):
+    """
+    Sends the UDP probes of a traffic client over one socket per address
+    family. Every probe carries a sequence number and its send timestamp,
+    replies are matched to probes by sequence number as they arrive and
+    probes left unanswered are expired by a timer wheel.
+    """
+
+    HEADER = PROBE_HEADER
+    MAGIC = PROBE_MAGIC
+    TICK = 0.1
+    timestamping = False
+
+    def __init__(self, timeout):
+        self._timeout = timeout
+        self._transports = {}
+        self._pending = {}
+        self._highest = {}
+        self._sequence = 0
+        # kernel TX timestamps of the probes in flight
+        self._sent_at = {}
+        # probes are packed into a buffer which grows to the largest size
+        self._buffer = bytearray(self.HEADER.size)
+        self._wheel = None
+        self._expiry = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._sent = 0
+        self._lost = 0
+        self._reordered = 0
+        self._late = 0
+        self._rtts = []
+
+    async def _transport(self, family):
+        loop = asyncio.get_event_loop()
+        if self._expiry is None:
+            self._wheel = TimerWheel(
+                self.TICK, math.ceil(self._timeout / self.TICK) + 1,
+                loop.time())
+            self._expiry = asyncio.ensure_future(self._expire_probes())
+        transport = self._transports.get(family)
+        if transport is None:
+            transport = await self._create_transport(family)
+            self._transports[family] = transport
+        return transport
+
+    async def _create_transport(self, family):
+        transport, _ = await asyncio.get_event_loop().create_datagram_endpoint(
+            lambda: _ProberProtocol(self), family=family)
+        return transport
+
+    async def _expire_probes(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.TICK)
+            for sequence in self._wheel.advance(loop.time()):
+                probe = self._pending.pop(sequence, None)
+                self._sent_at.pop(sequence, None)
+                if probe is None:
+                    continue
+                self._lost += 1
+                if not probe[0].done():
+                    probe[0].set_exception(socket.timeout('timed out'))
+
+    async def probe(self, destination, port, ipv6=False, size=None):
+        """
+        Send a probe and wait for its reply
+        :param size: size of the probe in bytes, the header is padded up
+                     to size
+        :type size: int
+        :return: round trip time in milliseconds
+        :rtype: float
+        :raises socket.timeout: if no reply arrives within the timeout
+        """
+        family = socket.AF_INET6 if ipv6 else socket.AF_INET
+        transport = await self._transport(family)
+        loop = asyncio.get_event_loop()
+        self._sequence = (self._sequence + 1) & 0xffffffff
+        sequence = self._sequence
+        size = max(size or 0, self.HEADER.size)
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        sent = monotonic_ns()
+        reply = loop.create_future()
+        self._pending[sequence] = (reply, (destination, port), sent, size)
+        self._wheel.add(sequence, loop.time() + self._timeout)
+        self.HEADER.pack_into(self._buffer, 0, self.MAGIC, sequence, sent)
+        # transports copy the data they can't send right away
+        transport.sendto(memoryview(self._buffer)[:size], (destination, port))
+        self._sent += 1
+        return await reply
+
+    def sent_at(self, sequence, timestamp):
+        """
+        Set the kernel TX timestamp of a probe
+        """
+        if sequence in self._pending:
+            self._sent_at[sequence] = timestamp
+
+    def reply_received(self, data, received_at=None):
+        """
+        Match a reply to its probe
+        :param data: payload echoed by the server
+        :type data: bytes
+        :param received_at: kernel RX timestamp of the reply
+        :type received_at: int
+        """
+        received = monotonic_ns()
+        try:
+            magic, sequence, sent = self.HEADER.unpack_from(data)
+        except struct.error:
+            return
+        if magic != self.MAGIC:
+            return
+        probe = self._pending.pop(sequence, None)
+        if probe is None:
+            # reply to an expired probe or a duplicate
+            self._late += 1
+            return
+        reply, destination, _, size = probe
+        if sequence < self._highest.get(destination, 0):
+            self._reordered += 1
+        else:
+            self._highest[destination] = sequence
+        sent_at = self._sent_at.pop(sequence, None)
+        if sent_at is not None and received_at is not None:
+            elapsed = received_at - sent_at
+        else:
+            elapsed = received - sent
+        # time spent in a timestamping server isn't part of the rtt
+        if len(data) == size + PROBE_DWELL.size:
+            elapsed -= PROBE_DWELL.unpack_from(data, size)[0]
+        rtt = max(elapsed, 0) / 1e6
+        self._rtts.append(rtt)
+        if not reply.done():
+            reply.set_result(rtt)
+
+    @property
+    def active(self):
+        return bool(self._transports)
+
+    def report(self):
+        """
+        Get the stats since the last report and start a new interval
+        :return: measurements, round trip times in milliseconds
+        :rtype: dict
+        """
+        rtts = sorted(self._rtts)
+        received = len(rtts)
+        answered = received + self._lost
+        stats = {
+            'sent': self._sent,
+            'received': received,
+            'lost': self._lost,
+            'loss': self._lost / float(answered) if answered else 0.0,
+            'reordered': self._reordered,
+            'late': self._late,
+            'rtt_avg': sum(rtts) / received if received else 0.0,
+            'rtt_p99': rtts[int(received * .99)] if received else 0.0,
+            'rtt_max': rtts[-1] if received else 0.0,
+        }
+        self._reset_stats()
+        return stats
+
+    def close(self):
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        for transport in self._transports.values():
+            transport.close()
+        self._transports = {}
+        for reply, _, _, _ in self._pending.values():
+            if not reply.done():
+                reply.cancel()
+        self._pending = {}
+        self._sent_at = {}
+
+
+class BatchUDPProber(UDPProber):
+    """
+    UDP prober which sends and receives its probes in batches with the
+    linux sendmmsg and recvmmsg system calls, it uses asyncio transports
+    where they aren't available.
+    """
+
+    def __init__(self, timeout, batch_size=UDP_BATCH_SIZE):
+        super(BatchUDPProber, self).__init__(timeout)
+        self._batch_size = batch_size
+
+    async def _create_transport(self, family):
+        if not MMSG_SUPPORTED or self._batch_size < 2:
+            return await super(BatchUDPProber, self)._create_transport(
+                family)
+        return _BatchEndpoint(self, family, self._batch_size)
+
+
+class TimestampingUDPProber(UDPProber):
+    """
+    UDP prober which measures the rtt of its probes with the kernel
+    software TX and RX timestamps of its sockets, probes fall back to user
+    space timing when the kernel doesn't timestamp them.
+    """
+
+    async def _create_transport(self, family):
+        transport = _TimestampingEndpoint(self, family)
+        self.timestamping = self.timestamping or transport.timestamping
+        return transport
@@ -179,16 +179,13 @@ class ConnectedStateProcessor(object):
         """
         Update clients list
         """
-        client_map = {
-            (protocol, port, destination):
-                (protocol, port, destination, connected, action) for
-            protocol, port, destination, connected, action in current_clients}
-        for protocol, port, destination, connected, action in new_clients:
+        client_map = {tuple(client[:3]): tuple(client)
+                      for client in current_clients}
+        for client in new_clients:
             if op == 'add':
-                client_map[(protocol, port, destination)] = (
-                    protocol, port, destination, connected, action)
+                client_map[tuple(client[:3])] = tuple(client)
             else:
-                client_map.pop((protocol, port, destination), None)
+                client_map.pop(tuple(client[:3]), None)
 
         return list(client_map.values())
 
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+ICMP and ICMPv6 echo requests and replies. Echoes are sent from
+unprivileged datagram ICMP sockets where the kernel allows them, see
+net.ipv4.ping_group_range, and from raw sockets otherwise. The kernel
+demultiplexes the replies of a datagram socket by its identifier, a raw
+socket gets every ICMP packet of the host.
+"""
+
+import socket
+import struct
+
+# type, code, checksum, identifier and sequence number
+ECHO_HEADER = struct.Struct('!BBHHH')
+# echo request and reply types of every family
+ECHO_TYPES = {
+    socket.AF_INET: (8, 0),
+    socket.AF_INET6: (128, 129),
+}
+ICMP_PROTOCOLS = {
+    socket.AF_INET: socket.IPPROTO_ICMP,
+    socket.AF_INET6: getattr(socket, 'IPPROTO_ICMPV6', 58),
+}
+
+
+def checksum(data):
+    """
+    Internet checksum of data
+    :type data: bytes
+    :rtype: int
+    """
+    data = bytearray(data)
+    if len(data) % 2:
+        data.append(0)
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), bytes(data)))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+def open_socket(family):
+    """
+    Open an ICMP socket
+    :param family: socket.AF_INET or socket.AF_INET6
+    :return: the socket and whether it is a raw socket
+    :rtype: tuple
+    :raises socket.error: if neither kind of socket is permitted
+    """
+    protocol = ICMP_PROTOCOLS[family]
+    try:
+        return socket.socket(family, socket.SOCK_DGRAM, protocol), False
+    except socket.error:
+        return socket.socket(family, socket.SOCK_RAW, protocol), True
+
+
+def pack_echo(buffer, family, identifier, sequence, size):
+    """
+    Write the header of an echo request in front of the payload in buffer
+    :param buffer: echo request, the payload follows the header
+    :type buffer: bytearray
+    :param identifier: identifier of the echo, the kernel replaces it
+                       with its own on datagram sockets
+    :type identifier: int
+    :param size: size of the echo request, header included
+    :type size: int
+    """
+    ECHO_HEADER.pack_into(buffer, 0, ECHO_TYPES[family][0], 0, 0,
+                          identifier & 0xffff, sequence & 0xffff)
+    # the kernel computes the checksum of ICMPv6, which covers the IPv6
+    # pseudo header
+    if family == socket.AF_INET:
+        struct.pack_into('!H', buffer, 2,
+                         checksum(memoryview(buffer)[:size].tobytes()))
+
+
+def parse_echo_reply(data, family, raw):
+    """
+    Parse an echo reply
+    :param data: packet received from an ICMP socket, raw ICMP sockets
+                 of IPv4 receive the IP header too
+    :type data: memoryview
+    :param raw: whether the packet was received from a raw socket
+    :type raw: bool
+    :return: identifier, sequence number and offset of the payload or
+             None if the packet isn't an echo reply
+    :rtype: tuple
+    """
+    offset = 0
+    if raw and family == socket.AF_INET:
+        if not len(data):
+            return None
+        offset = (struct.unpack_from('!B', data)[0] & 0x0f) * 4
+    if len(data) < offset + ECHO_HEADER.size:
+        return None
+    kind, _, _, identifier, sequence = ECHO_HEADER.unpack_from(data, offset)
+    if kind != ECHO_TYPES[family][1]:
+        return None
+    return identifier, sequence, offset + ECHO_HEADER.size
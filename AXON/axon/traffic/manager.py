@@ -10,12 +10,28 @@ import logging
 import six
 import platform
 import threading
+import zlib
 if "Linux" in platform.uname():  # noqa
     from axon.utils import nsenter
 
+from axon.common import config as conf
 from axon.traffic.servers import create_server_class
-from axon.traffic.workers import WorkerProcess
+from axon.traffic.workers import WorkerProcess, WorkerGroup
 from axon.traffic.clients import TrafficClient
+from axon.traffic.resources import unpack_client
+if six.PY3:
+    from axon.traffic.clients import AsyncTrafficClient
+
+
+def get_traffic_client_class():
+    """
+    Get the traffic client class of the configured traffic engine
+    :return: traffic client class
+    :rtype: TrafficClient
+    """
+    if six.PY3 and conf.TRAFFIC_ENGINE == 'asyncio':
+        return AsyncTrafficClient
+    return TrafficClient
 
 
 class ServerRegistry(object):
@@ -168,7 +184,7 @@ class RootNsServerManager(ServerManager):
         self._server_registry = ServerRegistry()
         self.log = logging.getLogger(__name__)
 
-    def start_server(self, protocol, port, src="0.0.0.0"):
+    def start_server(self, protocol, port, src="0.0.0.0", options=None):
         server_process = self._server_registry.get_server(
             self.ROOT_NAMESPACE_NAME, port, protocol)
         if server_process and server_process.is_running():
@@ -179,7 +195,8 @@ class RootNsServerManager(ServerManager):
             "Starting %s server on port %s on interface %s" %
             (protocol, port, src))
         try:
-            server_cls, args, kwargs = create_server_class(protocol, port, src)
+            server_cls, args, kwargs = create_server_class(
+                protocol, port, src, options=options)
             process = WorkerProcess(server_cls, args, kwargs)
             process.start()
             self._server_registry.add_server(
@@ -214,38 +231,38 @@ class RootNsServerManager(ServerManager):
             raise e
 
     def stop_all_servers(self):
-        servers = [(conf, server) for ns, conf_server_map in
+        servers = [(key, server) for ns, conf_server_map in
                    self._server_registry.get_all_servers() for
-                   conf, server in list(conf_server_map.items())]
-        for conf, server in servers:
+                   key, server in list(conf_server_map.items())]
+        for key, server in servers:
             self.log.info(
-                "Stopping %s server on port %s" % (conf[1], conf[0]))
+                "Stopping %s server on port %s" % (key[1], key[0]))
             try:
                 if server.is_running():
                     server.stop()
                     self._server_registry.remove_server(
-                        self.ROOT_NAMESPACE_NAME, conf[0], conf[1])
+                        self.ROOT_NAMESPACE_NAME, key[0], key[1])
                 else:
                     self.log.warning("%s server is not running on %s" %
-                                     (conf[1], conf[0]))
+                                     (key[1], key[0]))
                     self._server_registry.remove_server(
-                        self.ROOT_NAMESPACE_NAME, conf[0], conf[1])
+                        self.ROOT_NAMESPACE_NAME, key[0], key[1])
             except Exception:
                 self.log.exception(
                     "Stopping %s server on port %s failed" %
-                    (conf[1], conf[0]))
+                    (key[1], key[0]))
 
     def list_servers(self):
-        servers = [(ns, conf) for ns, conf_server_map in
+        servers = [(ns, key) for ns, conf_server_map in
                    self._server_registry.get_all_servers() for
-                   conf, server in list(conf_server_map.items())]
+                   key, server in list(conf_server_map.items())]
         return servers
 
     def get_server(self, protocol, port, namespace=None):
-        servers = [(ns, conf) for ns, conf_server_map in
+        servers = [(ns, key) for ns, conf_server_map in
                    self._server_registry.get_all_servers() for
-                   conf, server in list(conf_server_map.items()) if
-                   conf[0] == port and conf[1] == protocol]
+                   key, server in list(conf_server_map.items()) if
+                   key[0] == port and key[1] == protocol]
         return servers
 
 
@@ -260,7 +277,7 @@ class NamespaceServerManager(RootNsServerManager):
         self._ns = namespace
         self._ns_full_path = self.NAMESPACE_PATH + self._ns
 
-    def start_server(self, protocol, port, src="0.0.0.0"):
+    def start_server(self, protocol, port, src="0.0.0.0", options=None):
         server_process = self._server_registry.get_server(
             self._ns, port, protocol)
         if server_process and server_process.is_running():
@@ -271,7 +288,8 @@ class NamespaceServerManager(RootNsServerManager):
             "Starting %s server on port %s on interface %s in namespace %s" %
             (protocol, port, src, self._ns))
         try:
-            server_cls, args, kwargs = create_server_class(protocol, port, src)
+            server_cls, args, kwargs = create_server_class(
+                protocol, port, src, options=options)
             process = WorkerProcess(server_cls, args, kwargs)
             with nsenter.namespace(self._ns_full_path, 'net'):
                 process.start()
@@ -338,6 +356,50 @@ class ClientManager(object):
         pass
 
 
+def shard_clients(clients, workers):
+    """
+    Partition the clients of an endpoint by a stable hash of their
+    destination, so a destination is always probed by the same worker
+    :param clients: client tuples of the connected state
+    :type clients: list
+    :param workers: number of shards
+    :type workers: int
+    :return: non empty shards
+    :rtype: list
+    """
+    shards = [[] for _ in range(max(workers, 1))]
+    for client in clients:
+        destination = str(unpack_client(client)[2]).encode('utf-8')
+        index = (zlib.crc32(destination) & 0xffffffff) % len(shards)
+        shards[index].append(client)
+    return [shard for shard in shards if shard]
+
+
+def create_client_worker(src, clients, record_queue, workers=None,
+                         start=None):
+    """
+    Create the worker of the clients of an endpoint, a group of processes
+    sharing the record queue if they are sharded across several workers.
+    Each process sends the share of the request rate of the endpoint of
+    its clients.
+    :param workers: number of processes, TRAFFIC_CLIENT_WORKERS by default
+    :type workers: int
+    :param start: scheduled start shared by the processes
+    :type start: ScheduledStart
+    :rtype: Worker
+    """
+    workers = conf.TRAFFIC_CLIENT_WORKERS if workers is None else workers
+    client_cls = get_traffic_client_class()
+    kwargs = {'start': start} if start is not None else {}
+    if workers <= 1:
+        return WorkerProcess(client_cls, (src, clients, record_queue), kwargs)
+    total = float(len(clients))
+    return WorkerGroup(
+        WorkerProcess(client_cls, (src, shard, record_queue),
+                      dict(kwargs, rate_share=len(shard) / total))
+        for shard in shard_clients(clients, workers))
+
+
 class RootNsClientManager(ClientManager):
     """
     Class which manages the clients in root NameSpace
@@ -350,15 +412,15 @@ class RootNsClientManager(ClientManager):
         self.log = logging.getLogger(__name__)
         self._record_queue = record_queue
 
-    def start_client(self, src, clients):
+    def start_client(self, src, clients, workers=None, start=None):
         self.log.info("Starting client process on interface %s" % src)
         client = self._client_registry.get_client(self.ROOT_NAMESPACE_NAME)
         if client and client.is_running():
             self.log.warning("Client is already running on %s" % src)
             return
         try:
-            process = WorkerProcess(
-                TrafficClient, (src, clients, self._record_queue), {})
+            process = create_client_worker(
+                src, clients, self._record_queue, workers, start)
             process.start()
             self._client_registry.add_client(self.ROOT_NAMESPACE_NAME, process)
         except Exception as e:
@@ -409,14 +471,14 @@ class NamespaceClientManager(RootNsClientManager):
         self._ns = namespace
         self._ns_full_path = self.NAMESPACE_PATH + self._ns
 
-    def start_client(self, src, clients):
+    def start_client(self, src, clients, workers=None, start=None):
         client = self._client_registry.get_client(self._ns)
         if client and client.is_running():
             self.log.warning("Client is already running on %s" % src)
             return
         try:
-            process = WorkerProcess(
-                TrafficClient, (src, clients, self._record_queue), {})
+            process = create_client_worker(
+                src, clients, self._record_queue, workers, start)
             with nsenter.namespace(self._ns_full_path, 'net'):
                 process.start()
                 self._client_registry.add_client(self._ns, process)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Batched datagram I/O with the linux sendmmsg and recvmmsg system calls,
+which move a vector of datagrams per system call. The python socket
+module has no binding for them, so they are called through ctypes.
+"""
+
+import ctypes
+import errno
+import os
+import socket
+import struct
+
+from axon.common.config import LINUX_OS
+
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+# size of struct sockaddr_storage
+_SOCKADDR_SIZE = 128
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr),
+                ('msg_len', ctypes.c_uint)]
+
+
+def _load():
+    if not LINUX_OS:
+        return None, None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        sendmmsg, recvmmsg = libc.sendmmsg, libc.recvmmsg
+    except (OSError, AttributeError):
+        return None, None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                         ctypes.c_uint, ctypes.c_int]
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                         ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    return sendmmsg, recvmmsg
+
+
+_sendmmsg, _recvmmsg = _load()
+MMSG_SUPPORTED = _sendmmsg is not None
+
+
+def _error():
+    code = ctypes.get_errno()
+    return OSError(code, os.strerror(code))
+
+
+def encode_address(family, address):
+    """
+    Encode an address as the struct sockaddr of its family
+    :param address: (host, port) of a numeric host
+    :type address: tuple
+    :rtype: bytes
+    """
+    host, port = address[:2]
+    if family == socket.AF_INET6:
+        return struct.pack('=H', family) + struct.pack('!HI', port, 0) + \
+            socket.inet_pton(family, host) + struct.pack('=I', 0)
+    return struct.pack('=H', family) + struct.pack('!H', port) + \
+        socket.inet_pton(family, host) + b'\0' * 8
+
+
+class MessageBatch(object):
+    """
+    Preallocated vector of datagrams for sendmmsg and recvmmsg. Every
+    message has a buffer of buffer_size bytes and room for the address of
+    its peer, a received batch can be echoed in place.
+    """
+
+    def __init__(self, count, buffer_size):
+        self.count = count
+        self.buffer_size = buffer_size
+        self._data = bytearray(count * buffer_size)
+        self._names = bytearray(count * _SOCKADDR_SIZE)
+        self._view = memoryview(self._data)
+        data = ctypes.addressof(
+            (ctypes.c_char * len(self._data)).from_buffer(self._data))
+        names = ctypes.addressof(
+            (ctypes.c_char * len(self._names)).from_buffer(self._names))
+        self._iovecs = (_IOVec * count)()
+        self._messages = (_MMsgHdr * count)()
+        for index in range(count):
+            self._iovecs[index].iov_base = data + index * buffer_size
+            self._iovecs[index].iov_len = buffer_size
+            header = self._messages[index].msg_hdr
+            header.msg_name = names + index * _SOCKADDR_SIZE
+            header.msg_namelen = _SOCKADDR_SIZE
+            header.msg_iov = ctypes.pointer(self._iovecs[index])
+            header.msg_iovlen = 1
+
+    def message(self, index):
+        """
+        Get the datagram received into a message
+        :rtype: memoryview
+        """
+        start = index * self.buffer_size
+        return self._view[start:start + self._messages[index].msg_len]
+
+    def buffer(self, index):
+        """
+        Get the whole buffer of a message, e.g. to write a reply into it
+        :rtype: memoryview
+        """
+        start = index * self.buffer_size
+        return self._view[start:start + self.buffer_size]
+
+    def name(self, index):
+        """
+        Get the address of the peer of a received message
+        :return: struct sockaddr of the peer
+        :rtype: bytes
+        """
+        start = index * _SOCKADDR_SIZE
+        return bytes(self._names[
+            start:start + self._messages[index].msg_hdr.msg_namelen])
+
+    def set_message(self, index, data, name):
+        """
+        Copy a datagram to be sent into a message
+        :param data: datagram of at most buffer_size bytes
+        :type data: bytes
+        :param name: address of the peer from encode_address
+        :type name: bytes
+        """
+        start = index * self.buffer_size
+        self._view[start:start + len(data)] = data
+        self._iovecs[index].iov_len = len(data)
+        start = index * _SOCKADDR_SIZE
+        self._names[start:start + len(name)] = name
+        self._messages[index].msg_hdr.msg_namelen = len(name)
+
+    def recv(self, sock, flags=MSG_DONTWAIT):
+        """
+        Receive up to count datagrams without blocking
+        :return: number of datagrams received, 0 if none is pending
+        :rtype: int
+        """
+        for index in range(self.count):
+            self._iovecs[index].iov_len = self.buffer_size
+            self._messages[index].msg_hdr.msg_namelen = _SOCKADDR_SIZE
+        received = _recvmmsg(sock.fileno(), self._messages, self.count,
+                             flags, None)
+        if received < 0:
+            error = _error()
+            if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return 0
+            raise error
+        return received
+
+    def _send(self, sock, first, count, flags=0):
+        sent = 0
+        while sent < count:
+            result = _sendmmsg(
+                sock.fileno(),
+                ctypes.cast(ctypes.byref(
+                    self._messages,
+                    (first + sent) * ctypes.sizeof(_MMsgHdr)),
+                    ctypes.POINTER(_MMsgHdr)),
+                count - sent, flags)
+            if result < 0:
+                error = _error()
+                if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return sent
+                raise error
+            sent += result
+        return sent
+
+    def send(self, sock, count, flags=0):
+        """
+        Send the first count messages
+        :return: number of datagrams sent, less than count if the socket
+                 buffer of a non blocking socket is full
+        :rtype: int
+        """
+        return self._send(sock, 0, count, flags)
+
+    def echo(self, sock, count, sizes=None):
+        """
+        Send the first count received datagrams back to their peers
+        :param sizes: size of the reply of every message, written into its
+                      buffer, messages with a reply of size 0 aren't
+                      answered. By default the datagrams are echoed as
+                      received
+        :type sizes: list
+        :return: number of datagrams sent
+        :rtype: int
+        """
+        for index in range(count):
+            self._iovecs[index].iov_len = self._messages[index].msg_len \
+                if sizes is None else sizes[index]
+        if sizes is None:
+            return self.send(sock, count)
+        sent = 0
+        first = 0
+        while first < count:
+            if not sizes[first]:
+                first += 1
+                continue
+            end = first
+            while end < count and sizes[end]:
+                end += 1
+            sent += self._send(sock, first, end - first)
+            first = end
+        return sent
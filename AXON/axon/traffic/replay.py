@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Replay of the flows of a pcap file, i.e. one written by the TCPDump app,
+over real sockets. The file is read a packet at a time, so captures of
+any size replay in constant memory. Every TCP and UDP flow of the capture
+is opened again from the replaying endpoint to its destination, mapped to
+a test segment, and the payloads sent by the side which opened the flow
+are sent again at their original times, scaled by a speed up. The other
+side of a flow is left to the traffic servers of the destination, their
+answers are drained. The replay reports how closely it kept to the
+timing of the capture.
+"""
+
+import collections
+import errno
+import logging
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from axon.common import config as conf
+from axon.traffic.resources import ReplayRecord
+
+# magic numbers of pcap files with microsecond and nanosecond timestamps
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_MAGIC_NS = 0xa1b23c4d
+# magic, version, thiszone, sigfigs, snaplen and link type
+PCAP_HEADER = '%sIHHiIII'
+# seconds, fraction of a second, captured and original length
+PCAP_RECORD = '%sIIII'
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 14, 101)
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_VLAN = (0x8100, 0x88a8)
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+PROTOCOLS = {6: 'TCP', 17: 'UDP'}
+
+# a TCP or UDP packet of a capture. The payload is padded to its
+# original size if the capture truncated it.
+Packet = collections.namedtuple(
+    'Packet', ['timestamp', 'protocol', 'src', 'sport', 'dst', 'dport',
+               'flags', 'payload'])
+
+
+class PcapError(Exception):
+    """
+    The file isn't a pcap file or a link type which can't be replayed
+    """
+    pass
+
+
+def _network_offset(data, linktype):
+    """
+    Get the offset of the IP header of a frame
+    :return: offset or None if the frame isn't IP
+    :rtype: int
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 12
+        ethertype, = struct.unpack_from('!H', data, offset)
+        while ethertype in ETHERTYPE_VLAN and len(data) >= offset + 6:
+            offset += 4
+            ethertype, = struct.unpack_from('!H', data, offset)
+        return offset + 2 \
+            if ethertype in (ETHERTYPE_IPV4, ETHERTYPE_IPV6) else None
+    if linktype in LINKTYPE_RAW:
+        return 0
+    if linktype == LINKTYPE_LINUX_SLL:
+        return 16
+    if linktype == LINKTYPE_LINUX_SLL2:
+        return 20
+    if linktype == LINKTYPE_NULL:
+        return 4
+    raise PcapError("Link type %s can't be replayed" % linktype)
+
+
+def parse_packet(data, linktype, timestamp, length):
+    """
+    Parse a TCP or UDP packet of a frame
+    :param data: captured bytes of the frame
+    :type data: bytes
+    :param linktype: link type of the capture
+    :type linktype: int
+    :param length: original length of the frame
+    :type length: int
+    :return: the packet or None if the frame isn't a TCP or UDP packet
+             carrying the start of its payload
+    :rtype: Packet
+    """
+    try:
+        offset = _network_offset(data, linktype)
+        if offset is None or len(data) < offset + 20:
+            return None
+        truncated = length - len(data)
+        version = data[offset] >> 4
+        if version == 4:
+            header = (data[offset] & 0x0f) * 4
+            total, fragment, number = struct.unpack_from(
+                '!H2xHxB', data, offset + 2)
+            if fragment & 0x1fff:
+                # only the first fragment has the TCP or UDP header
+                return None
+            src = socket.inet_ntop(socket.AF_INET,
+                                   data[offset + 12:offset + 16])
+            dst = socket.inet_ntop(socket.AF_INET,
+                                   data[offset + 16:offset + 20])
+            end = offset + total
+        elif version == 6:
+            header = 40
+            payload_length, number = struct.unpack_from(
+                '!HB', data, offset + 4)
+            src = socket.inet_ntop(socket.AF_INET6,
+                                   data[offset + 8:offset + 24])
+            dst = socket.inet_ntop(socket.AF_INET6,
+                                   data[offset + 24:offset + 40])
+            end = offset + header + payload_length
+        else:
+            return None
+        protocol = PROTOCOLS.get(number)
+        if protocol is None:
+            return None
+        offset += header
+        if protocol == 'TCP':
+            sport, dport, data_offset, flags = struct.unpack_from(
+                '!HH8xBB', data, offset)
+            offset += (data_offset >> 4) * 4
+        else:
+            sport, dport = struct.unpack_from('!HH', data, offset)
+            flags = 0
+            offset += 8
+    except (IndexError, ValueError, struct.error):
+        return None
+    # frames may be padded past the end of the IP packet
+    payload = data[offset:end]
+    if truncated > 0 and end > len(data):
+        payload += b'\x00' * (end - max(len(data), offset))
+    return Packet(timestamp, protocol, src, sport, dst, dport, flags,
+                  payload)
+
+
+def read_packets(path):
+    """
+    Read the TCP and UDP packets of a pcap file one at a time
+    :param path: path of the pcap file
+    :type path: str
+    :return: generator of the packets
+    :rtype: generator
+    :raises PcapError: if the file isn't a pcap file
+    """
+    with open(path, 'rb') as pcap:
+        data = pcap.read(struct.calcsize(PCAP_HEADER % '<'))
+        for order in ('<', '>'):
+            magic = struct.unpack_from(order + 'I', data)[0] \
+                if len(data) >= 4 else None
+            if magic in (PCAP_MAGIC, PCAP_MAGIC_NS):
+                break
+        else:
+            raise PcapError("%s isn't a pcap file" % path)
+        linktype = struct.unpack(PCAP_HEADER % order, data)[6] & 0x0fffffff
+        scale = 1e-9 if magic == PCAP_MAGIC_NS else 1e-6
+        record = struct.Struct(PCAP_RECORD % order)
+        while True:
+            data = pcap.read(record.size)
+            if len(data) < record.size:
+                return
+            seconds, fraction, captured, length = record.unpack(data)
+            frame = pcap.read(captured)
+            if len(frame) < captured:
+                return
+            packet = parse_packet(frame, linktype,
+                                  seconds + fraction * scale, length)
+            if packet is not None:
+                yield packet
+
+
+class ReplayFlow(object):
+    """
+    Socket of a flow of the capture opened again by the replay
+    """
+
+    def __init__(self, sock, now):
+        self.sock = sock
+        self.last = now
+
+
+class PcapReplay(object):
+    """
+    Replay of the TCP and UDP flows of a pcap file. The side of a flow
+    which sent its first packet, or the SYN, opens it and its payloads
+    are replayed. Packet i of the capture is sent at
+    start + (timestamp(i) - timestamp(0)) / speed.
+    """
+
+    def __init__(self, path, mapping=None, ports=None, speed=1.0,
+                 source=None, record_queue=None):
+        """
+        :param path: path of the pcap file
+        :type path: str
+        :param mapping: addresses of the capture to the addresses they
+                        are replayed to, others are replayed to themselves
+        :type mapping: dict
+        :param ports: destination ports of the capture to the ports they
+                      are replayed to
+        :type ports: dict
+        :param speed: speed up of the timing of the capture
+        :type speed: float
+        :param source: address of the replaying endpoint in its record
+        :type source: str
+        :param record_queue: queue the report of the replay is put onto
+        """
+        if speed <= 0:
+            raise ValueError("Invalid speed %r" % speed)
+        self._path = path
+        self._mapping = dict(mapping) if mapping else {}
+        self._ports = dict(ports) if ports else {}
+        self._speed = float(speed)
+        self._source = source
+        self._record_queue = record_queue
+        self._flows = {}
+        self._selector = None
+        self._buffer = bytearray(65536)
+        self._stopped = threading.Event()
+        self._reset_stats()
+        self.log = logging.getLogger(__name__)
+
+    def _reset_stats(self):
+        self._packets = 0
+        self._bytes = 0
+        self._opened = 0
+        self._responses = 0
+        self._errors = 0
+        self._timed = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._late = 0
+
+    def stop(self):
+        self._stopped.set()
+
+    def _destination(self, packet):
+        return (self._mapping.get(packet.dst, packet.dst),
+                int(self._ports.get(packet.dport, packet.dport)))
+
+    def _open(self, packet, now):
+        """
+        Open a flow again
+        :rtype: ReplayFlow
+        """
+        family = socket.AF_INET6 if ':' in packet.dst else socket.AF_INET
+        kind = socket.SOCK_STREAM if packet.protocol == 'TCP' \
+            else socket.SOCK_DGRAM
+        sock = socket.socket(family, kind)
+        try:
+            sock.settimeout(conf.TRAFFIC_CLIENT_TIMEOUT)
+            sock.connect(self._destination(packet))
+            sock.setblocking(False)
+        except Exception:
+            sock.close()
+            raise
+        self._selector.register(sock, selectors.EVENT_READ)
+        self._opened += 1
+        return ReplayFlow(sock, now)
+
+    def _close(self, key):
+        flow = self._flows.pop(key)
+        if flow.sock is not None:
+            if flow.sock in self._selector.get_map():
+                self._selector.unregister(flow.sock)
+            flow.sock.close()
+
+    def _drain(self, timeout):
+        """
+        Read and drop what the servers send back until the timeout
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = max(deadline - time.time(), 0)
+            if not self._flows:
+                if remaining:
+                    self._stopped.wait(remaining)
+                return
+            for key, _ in self._selector.select(remaining):
+                try:
+                    if not key.fileobj.recv_into(self._buffer) and \
+                            key.fileobj.type == socket.SOCK_STREAM:
+                        # closed by the server
+                        self._selector.unregister(key.fileobj)
+                except socket.error:
+                    self._selector.unregister(key.fileobj)
+            if remaining <= 0 or self._stopped.is_set():
+                return
+
+    def _expire(self, now):
+        for key, flow in list(self._flows.items()):
+            if now - flow.last > conf.REPLAY_IDLE_TIMEOUT:
+                self._close(key)
+
+    def _replay(self, packet, now):
+        """
+        Send a packet of the capture again if its side opened the flow
+        """
+        key = (packet.protocol, packet.src, packet.sport, packet.dst,
+               packet.dport)
+        reverse = (packet.protocol, packet.dst, packet.dport, packet.src,
+                   packet.sport)
+        if key not in self._flows:
+            if reverse in self._flows:
+                self._responses += 1
+                return
+            if packet.protocol == 'TCP' and \
+                    packet.flags & (TCP_SYN | TCP_ACK) == TCP_SYN | TCP_ACK:
+                # the capture starts with the answer of the server, the
+                # flow is opened by the other side
+                self._responses += 1
+                key = reverse
+                packet = packet._replace(
+                    src=packet.dst, sport=packet.dport, dst=packet.src,
+                    dport=packet.sport, payload=b'')
+            if packet.protocol == 'TCP' and packet.flags & \
+                    (TCP_FIN | TCP_RST) and not packet.payload:
+                # the end of a flow which started before the capture
+                return
+            try:
+                self._flows[key] = self._open(packet, now)
+            except Exception as e:
+                self.log.debug("Replay of %s to %s failed: %s", key,
+                               self._destination(packet), e)
+                self._errors += 1
+                self._flows[key] = ReplayFlow(None, now)
+                return
+        flow = self._flows[key]
+        flow.last = now
+        if flow.sock is not None and packet.payload:
+            try:
+                if packet.protocol == 'TCP':
+                    flow.sock.settimeout(conf.TRAFFIC_CLIENT_TIMEOUT)
+                    flow.sock.sendall(packet.payload)
+                    flow.sock.setblocking(False)
+                else:
+                    flow.sock.send(packet.payload)
+                self._packets += 1
+                self._bytes += len(packet.payload)
+            except socket.error as e:
+                if e.errno != errno.ECONNREFUSED:
+                    self.log.debug("Replay of %s failed: %s", key, e)
+                self._errors += 1
+        elif flow.sock is None and packet.payload:
+            self._errors += 1
+        if packet.protocol == 'TCP' and packet.flags & (TCP_FIN | TCP_RST):
+            self._close(key)
+
+    def _get_report(self, first, last, duration):
+        capture = last - first if last is not None else 0.0
+        target = capture / self._speed
+        target_rate = self._packets / target if target > 0 else 0.0
+        rate = self._packets / duration if duration > 0 else 0.0
+        return {
+            'packets': self._packets,
+            'bytes': self._bytes,
+            'flows': self._opened,
+            'responses': self._responses,
+            'errors': self._errors,
+            'speed': self._speed,
+            'capture_duration': capture,
+            'target_duration': target,
+            'duration': duration,
+            'target_rate': target_rate,
+            'rate': rate,
+            'rate_accuracy': rate / target_rate if target_rate else 1.0,
+            'lag_avg': self._lag_total / self._timed * 1e3
+            if self._timed else 0.0,
+            'lag_max': self._lag_max * 1e3,
+            'late': self._late,
+        }
+
+    def run(self):
+        """
+        Replay the capture
+        :return: report of the replay, rates are of the packets with a
+                 payload, lag is how late the packets were sent in
+                 milliseconds
+        :rtype: dict
+        """
+        self._reset_stats()
+        self._selector = selectors.DefaultSelector()
+        first = last = None
+        start = time.time()
+        last_expiry = start
+        try:
+            for packet in read_packets(self._path):
+                if self._stopped.is_set():
+                    break
+                if first is None:
+                    first = packet.timestamp
+                last = packet.timestamp
+                due = start + (packet.timestamp - first) / self._speed
+                self._drain(due - time.time())
+                if self._stopped.is_set():
+                    break
+                now = time.time()
+                lag = max(now - due, 0.0)
+                self._replay(packet, now)
+                if packet.payload:
+                    self._timed += 1
+                    self._lag_total += lag
+                    self._lag_max = max(self._lag_max, lag)
+                    if lag > conf.REPLAY_LATE_THRESHOLD:
+                        self._late += 1
+                if now - last_expiry >= conf.REPLAY_IDLE_TIMEOUT:
+                    self._expire(now)
+                    last_expiry = now
+        finally:
+            duration = time.time() - start
+            for key in list(self._flows):
+                self._close(key)
+            self._selector.close()
+        report = self._get_report(first, last, duration)
+        self.log.info("Replay of %s: %s", self._path, report)
+        if self._record_queue is not None:
+            try:
+                self._record_queue.put(ReplayRecord(self._source, report))
+            except Exception:
+                self.log.exception(
+                    "Exception in adding replay record of %s to traffic "
+                    "queue %s", self._path, self._record_queue)
+        return report
@@ -4,17 +4,141 @@
 # The full license information can be found in LICENSE.txt
 # in the root directory of this project.
 
+import struct
 import time
 
+# kernel TCP_INFO measurements carried by TCP records
+TCP_INFO_FIELDS = ('tcp_rtt', 'tcp_rttvar', 'tcp_retransmits', 'tcp_cwnd')
+# TLS handshake measurements carried by TLS records
+TLS_FIELDS = ('tls_handshake_time', 'tls_resumed')
 
-class TrafficRecord:
+# header of UDP probes, magic, sequence number and send timestamp
+PROBE_HEADER = struct.Struct('!4sIQ')
+PROBE_MAGIC = b'AXUP'
+# trailer added to the reply of a probe by a timestamping UDP server,
+# nanoseconds the probe spent in the server
+PROBE_DWELL = struct.Struct('!Q')
+# TCP streams start with STREAM_MAGIC, the server drains the stream and
+# replies with a STREAM_SUMMARY once the client shuts down its side
+STREAM_MAGIC = b'AXST'
+# header of the datagrams of UDP streams, magic, stream id and sequence
+# number. Data datagrams carry the STREAM_TIMESTAMP they were sent at
+# after the header. A stream ends with an end datagram carrying the number
+# of datagrams sent, which the server answers with its STREAM_SUMMARY and
+# STREAM_STATS. While the stream runs the server sends the same every
+# STREAM_INTERVAL seconds in a report datagram.
+STREAM_HEADER = struct.Struct('!4sII')
+STREAM_DATA_MAGIC = b'AXSD'
+STREAM_END_MAGIC = b'AXSE'
+STREAM_REPORT_MAGIC = b'AXSR'
+# nanoseconds since the epoch
+STREAM_TIMESTAMP = struct.Struct('!Q')
+# bytes and datagrams of a stream received by the server
+STREAM_SUMMARY = struct.Struct('!QQ')
+# datagrams expected from the highest sequence number received, datagrams
+# received out of order, duplicates and the RFC 3550 interarrival jitter
+# in milliseconds
+STREAM_STATS = struct.Struct('!QQQd')
+# pipelined TCP connections start with PIPELINE_MAGIC, every request and
+# response is prefixed by a header of the sequence number of the request,
+# the size of its payload and the size of the payload of its response
+PIPELINE_MAGIC = b'AXPL'
+PIPELINE_HEADER = struct.Struct('!III')
+# flows of rules in cps mode send CPS_MAGIC once connected, TCP servers
+# close the connection on it so the TIME_WAIT of the flow is kept by the
+# server and clients can reuse their source ports right away
+CPS_MAGIC = b'AXCP'
+# held connections start with HOLD_MAGIC, the server echoes every
+# HOLD_HEARTBEAT sent on them from an event loop instead of a thread
+HOLD_MAGIC = b'AXHD'
+HOLD_HEARTBEAT = b'\x01'
+# datagrams of rules in multicast mode are a STREAM_HEADER of
+# MULTICAST_MAGIC, the stream id of the sender and the sequence number
+# followed by the STREAM_TIMESTAMP they were sent at. Every
+# STREAM_INTERVAL seconds a receiver sends a report of the sender back to
+# it, a STREAM_HEADER of MULTICAST_REPORT_MAGIC followed by the
+# STREAM_SUMMARY, STREAM_STATS and MULTICAST_LATENCY of the sender.
+MULTICAST_MAGIC = b'AXMC'
+MULTICAST_REPORT_MAGIC = b'AXMR'
+# average and maximum one way latency in milliseconds since the previous
+# report, from the send timestamps and the clock of the receiver
+MULTICAST_LATENCY = struct.Struct('!dd')
+
+
+def unpack_client(client):
+    """
+    Unpack a client of the connected state, clients registered
+    without options are 5 tuples
+    :param client: (protocol, port, destination, connected, action[, options])
+    :type client: tuple
+    :return: protocol, port, destination, connected, action and options
+    :rtype: tuple
+    """
+    protocol, port, destination, connected, action = client[:5]
+    options = dict(client[5]) if len(client) > 5 and client[5] else {}
+    return protocol, port, destination, connected, action, options
+
+
+def unpack_server(server):
+    """
+    Unpack a server of the connected state, servers registered
+    without options are 2 tuples
+    :param server: (protocol, port[, options])
+    :type server: tuple
+    :return: protocol, port and options
+    :rtype: tuple
+    """
+    protocol, port = server[:2]
+    options = dict(server[2]) if len(server) > 2 and server[2] else {}
+    return protocol, port, options
+
+
+class Denial(object):
+    """
+    This class enlists the ways in which a request is denied.
+        - reset: the connection was refused or reset by a TCP RST.
+        - unreachable: an ICMP unreachable was received.
+        - drop: the request was silently dropped and timed out.
+    """
+    RESET = 'reset'
+    UNREACHABLE = 'unreachable'
+    DROP = 'drop'
+
+    allowed = [RESET, UNREACHABLE, DROP]
+
+
+class TrafficRecord(object):
     """
     Class to represent TrafficRecord
     """
     TRAFFIC_TYPE = None
 
     def __init__(self, src, dst, port, latency,
-                 error=None, success=True, connected=True):
+                 error=None, success=True, connected=True, stage=None,
+                 denial=None, connect_time=None, first_byte_time=None,
+                 attempts=1, payload_size=None):
+        """
+        :param latency: total time of the request in milliseconds
+        :type latency: float
+        :param stage: stage at which a request failed, i.e. 'connect' for
+                      the handshake, 'handshake' for the TLS handshake and
+                      'exchange' for the data exchange
+        :type stage: str
+        :param denial: how a failed request was denied, one of
+                       Denial.allowed
+        :type denial: str
+        :param connect_time: milliseconds taken by the handshake, None if
+                             no connection was established for the request
+        :type connect_time: float
+        :param first_byte_time: milliseconds from sending the request of
+                                the last attempt to the first byte of reply
+        :type first_byte_time: float
+        :param attempts: number of attempts, more than 1 if retried
+        :type attempts: int
+        :param payload_size: bytes sent by the request, None if it sent
+                             no payload of its own
+        :type payload_size: int
+        """
         self.src = src
         self.dst = dst
         self.port = port
@@ -23,6 +147,12 @@ class TrafficRecord:
         self.success = success
         self.traffic_type = self.TRAFFIC_TYPE
         self.connected = connected
+        self.stage = stage
+        self.denial = denial
+        self.connect_time = connect_time
+        self.first_byte_time = first_byte_time
+        self.attempts = attempts
+        self.payload_size = payload_size
         self.created = time.time()
 
     def as_dict(self):
@@ -30,7 +160,11 @@ class TrafficRecord:
             'src': self.src, 'dst': self.dst, 'port': self.port,
             'latency': self.latency, 'error': self.error,
             'success': self.success, 'type': self.traffic_type,
-            'created': self.created, 'connected': self.connected}
+            'created': self.created, 'connected': self.connected,
+            'stage': self.stage, 'denial': self.denial,
+            'connect_time': self.connect_time,
+            'first_byte_time': self.first_byte_time,
+            'attempts': self.attempts, 'payload_size': self.payload_size}
 
 
 class TCPRecord(TrafficRecord):
@@ -39,6 +173,52 @@ class TCPRecord(TrafficRecord):
     """
     TRAFFIC_TYPE = "TCP"
 
+    def __init__(self, *args, **kwargs):
+        """
+        :param tcp_rtt: kernel smoothed rtt of the connection in milliseconds
+        :type tcp_rtt: float
+        :param tcp_rttvar: kernel rtt variance in milliseconds
+        :type tcp_rttvar: float
+        :param tcp_retransmits: total retransmitted segments
+        :type tcp_retransmits: int
+        :param tcp_cwnd: congestion window in segments
+        :type tcp_cwnd: int
+        """
+        for field in TCP_INFO_FIELDS:
+            setattr(self, field, kwargs.pop(field, None))
+        super(TCPRecord, self).__init__(*args, **kwargs)
+
+    def as_dict(self):
+        record = super(TCPRecord, self).as_dict()
+        for field in TCP_INFO_FIELDS:
+            record[field] = getattr(self, field)
+        return record
+
+
+class TLSRecord(TCPRecord):
+    """
+    TLS Traffic record
+    """
+    TRAFFIC_TYPE = "TLS"
+
+    def __init__(self, *args, **kwargs):
+        """
+        :param tls_handshake_time: milliseconds taken by the TLS handshake
+        :type tls_handshake_time: float
+        :param tls_resumed: whether the handshake resumed an earlier
+                            session, None if no handshake completed
+        :type tls_resumed: bool
+        """
+        for field in TLS_FIELDS:
+            setattr(self, field, kwargs.pop(field, None))
+        super(TLSRecord, self).__init__(*args, **kwargs)
+
+    def as_dict(self):
+        record = super(TLSRecord, self).as_dict()
+        for field in TLS_FIELDS:
+            record[field] = getattr(self, field)
+        return record
+
 
 class UDPRecord(TrafficRecord):
     """
@@ -47,8 +227,147 @@ class UDPRecord(TrafficRecord):
     TRAFFIC_TYPE = "UDP"
 
 
+class ICMPRecord(TrafficRecord):
+    """
+    ICMP echo Traffic Record
+    """
+    TRAFFIC_TYPE = "ICMP"
+
+
 class HTTPRecord(TrafficRecord):
     """
     HTTP Traffic Record
     """
     TRAFFIC_TYPE = 'HTTP'
+
+
+class MetricRecord(object):
+    """
+    Class to represent measurements reported periodically by a traffic
+    client, i.e. rates and counters which don't belong to a single request
+    """
+    METRIC_TYPE = None
+
+    def __init__(self, src, metrics, dst=None, port=None):
+        """
+        :param src: source ip
+        :type src: str
+        :param metrics: measurements as name to value map
+        :type metrics: dict
+        :param dst: destination ip, if the metrics are of a single destination
+        :type dst: str
+        :param port: destination port
+        :type port: int
+        """
+        self.src = src
+        self.dst = dst
+        self.port = port
+        self.metrics = metrics
+        self.metric_type = self.METRIC_TYPE
+        self.created = time.time()
+
+    def as_dict(self):
+        return {
+            'src': self.src, 'dst': self.dst, 'port': self.port,
+            'metrics': dict(self.metrics), 'type': self.metric_type,
+            'created': self.created}
+
+
+class ScheduleRecord(MetricRecord):
+    """
+    Achieved rate and schedule lag of a traffic client and the staleness
+    of its destinations
+    """
+    METRIC_TYPE = 'SCHEDULE'
+
+
+class StartRecord(MetricRecord):
+    """
+    Actual start of a traffic client with a scheduled start
+    """
+    METRIC_TYPE = 'START'
+
+
+class StreamRecord(MetricRecord):
+    """
+    Throughput of an interval of a stream, or the goodput and loss of a
+    complete stream
+    """
+    METRIC_TYPE = 'STREAM'
+
+
+class CPSRecord(MetricRecord):
+    """
+    Flows opened in an interval of a rule in cps mode and their handshake
+    latency, or the totals of the complete run
+    """
+    METRIC_TYPE = 'CPS'
+
+
+class HoldRecord(MetricRecord):
+    """
+    Live connections of a rule in hold mode and how the ones which were
+    lost in an interval ended
+    """
+    METRIC_TYPE = 'HOLD'
+
+
+class MulticastRecord(MetricRecord):
+    """
+    Datagrams a receiver of a multicast group got from the source, as
+    last reported by the receiver
+    """
+    METRIC_TYPE = 'MULTICAST'
+
+
+class ReplayRecord(MetricRecord):
+    """
+    Packets of a pcap replay and how closely the replay kept to the rate
+    and timing of the capture
+    """
+    METRIC_TYPE = 'REPLAY'
+
+
+class SweepRecord(MetricRecord):
+    """
+    Open, refused and filtered ports of a sweep of a destination
+    """
+    METRIC_TYPE = 'SWEEP'
+
+    def __init__(self, src, metrics, dst=None, port=None, ports=None):
+        """
+        :param ports: the port ranges swept as 'ranges' and the base64
+                      bitmaps of the 'open' and 'refused' ports, a bit per
+                      port of the ranges in order
+        :type ports: dict
+        """
+        super(SweepRecord, self).__init__(src, metrics, dst, port)
+        self.ports = ports
+
+    def as_dict(self):
+        record = super(SweepRecord, self).as_dict()
+        record['ports'] = dict(self.ports) if self.ports else None
+        return record
+
+
+class ConnectionRecord(MetricRecord):
+    """
+    Counters of the long lived connections of a traffic client
+    """
+    METRIC_TYPE = 'CONNECTION'
+
+
+class UDPProbeRecord(MetricRecord):
+    """
+    Loss, round trip time and reordering of the UDP probes of a traffic
+    client
+    """
+    METRIC_TYPE = 'UDP_PROBE'
+
+
+class ICMPProbeRecord(MetricRecord):
+    """
+    Loss, round trip time and reordering of the ICMP echoes of a traffic
+    client
+    """
+    METRIC_TYPE = 'ICMP_PROBE'
@@ -5,28 +5,370 @@
 # in the root directory of this project.
 
 import abc
+import errno
 import ipaddress
 import os
+try:
+    import selectors
+except ImportError:
+    # python 2 servers handle held connections in their own thread
+    selectors = None
 import signal
 import six
 import socket
+import ssl
+import struct
 from six.moves import socketserver
 import subprocess
+import threading
+import time
 from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
 
-from axon.common.config import REQUEST_QUEUE_SIZE, PACKET_SIZE,\
-    ALLOW_REUSE_ADDRESS
+from axon.common.utils import raise_open_files_limit, time_ns
+from axon.common.config import REQUEST_QUEUE_SIZE, ECHO_BUFFER_SIZE, \
+    ALLOW_REUSE_ADDRESS, HTTP_KEEP_ALIVE_TIMEOUT, UDP_TIMESTAMPING_ENABLED, \
+    UDP_BATCH_SIZE, STREAM_INTERVAL, MULTICAST_GROUP, MULTICAST_GROUP_V6
+from axon.traffic.mmsg import MessageBatch, MMSG_SUPPORTED
+from axon.traffic.tls import server_context
+from axon.traffic.resources import PROBE_HEADER, PROBE_MAGIC, PROBE_DWELL, \
+    STREAM_MAGIC, STREAM_HEADER, STREAM_DATA_MAGIC, STREAM_END_MAGIC, \
+    STREAM_REPORT_MAGIC, STREAM_TIMESTAMP, STREAM_SUMMARY, STREAM_STATS, \
+    PIPELINE_MAGIC, PIPELINE_HEADER, CPS_MAGIC, HOLD_MAGIC, MULTICAST_MAGIC, \
+    MULTICAST_REPORT_MAGIC, MULTICAST_LATENCY
+from axon.traffic.timestamping import enable_timestamping, \
+    recv_into_with_timestamp
+
+
+class EchoBuffers(object):
+    """
+    Free list of the buffers into which servers receive the requests they
+    echo, so requests don't allocate. At most max_free buffers are kept.
+    """
+
+    def __init__(self, size, max_free=REQUEST_QUEUE_SIZE):
+        self._size = size
+        self._max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return bytearray(self._size)
+
+    def release(self, buffer):
+        with self._lock:
+            if len(self._free) < self._max_free:
+                self._free.append(buffer)
+
+
+echo_buffers = EchoBuffers(ECHO_BUFFER_SIZE)
+# payload of the responses to pipelined requests, only ever read
+pipeline_payload = memoryview(bytearray(ECHO_BUFFER_SIZE))
+
+
+class StreamFlow(object):
+    """
+    Counters of a UDP stream received by a server. Sequence numbers up
+    to window behind the highest one received are tracked, a missing one
+    which arrives late is reordered and one which arrives again is a
+    duplicate. Anything older is taken to be reordered.
+    """
+
+    def __init__(self, now, window=65536):
+        self._window = window
+        self._missing = set()
+        self._transit = None
+        self.bytes = 0
+        self.datagrams = 0
+        self.expected = 0
+        self.reordered = 0
+        self.duplicates = 0
+        # interarrival jitter in nanoseconds
+        self.jitter = 0.0
+        self.last = now
+        self.reported = now
+
+    def add(self, sequence, size, sent, received):
+        """
+        Count a datagram of the stream
+        :param sent: send time of the datagram in nanoseconds, if known
+        :type sent: int
+        :param received: receive time of the datagram in nanoseconds
+        :type received: int
+        """
+        self.bytes += size
+        self.datagrams += 1
+        if sequence >= self.expected:
+            self._missing.update(
+                range(max(self.expected, sequence - self._window), sequence))
+            self.expected = sequence + 1
+            if len(self._missing) > 2 * self._window:
+                oldest = self.expected - self._window
+                self._missing = set(
+                    missing for missing in self._missing
+                    if missing >= oldest)
+        elif sequence in self._missing:
+            self._missing.discard(sequence)
+            self.reordered += 1
+        elif sequence < self.expected - self._window:
+            self.reordered += 1
+        else:
+            self.duplicates += 1
+        if sent is None:
+            return
+        # RFC 3550 6.4.1, the clock offset of the client and the server
+        # cancels out of the difference of the transit times
+        transit = received - sent
+        if self._transit is not None:
+            self.jitter += (abs(transit - self._transit) - self.jitter) / 16.0
+        self._transit = transit
+
+    def pack_into(self, buffer, offset):
+        """
+        Write the STREAM_SUMMARY and STREAM_STATS of the stream
+        :return: size written
+        :rtype: int
+        """
+        STREAM_SUMMARY.pack_into(buffer, offset, self.bytes, self.datagrams)
+        STREAM_STATS.pack_into(
+            buffer, offset + STREAM_SUMMARY.size, self.expected,
+            self.reordered, self.duplicates, self.jitter / 1e6)
+        return STREAM_SUMMARY.size + STREAM_STATS.size
+
+
+class StreamCounters(object):
+    """
+    UDP streams received by a server. Streams are drained without
+    replies, but for a report of the counters of a stream every interval
+    seconds. The end datagram of a stream is answered with its counters.
+    Counters of streams idle for more than expiry seconds are dropped.
+    """
+
+    def __init__(self, expiry=60, interval=STREAM_INTERVAL):
+        self._expiry = expiry
+        self._interval = interval
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        for key, flow in list(self._streams.items()):
+            if now - flow.last > self._expiry:
+                del self._streams[key]
+
+    def handle(self, peer, data, buffer, received=None):
+        """
+        Handle a datagram if it belongs to a stream
+        :param peer: address of the client
+        :param data: datagram
+        :type data: memoryview
+        :param buffer: buffer the datagram was received into, the reply
+                       is written into it
+        :type buffer: bytearray
+        :param received: kernel RX timestamp of the datagram in
+                         nanoseconds, if there is one
+        :type received: int
+        :return: size of the reply, 0 if there is none or None if the
+                 datagram isn't part of a stream
+        :rtype: int
+        """
+        if len(data) < STREAM_HEADER.size:
+            return None
+        magic, stream, count = STREAM_HEADER.unpack_from(data)
+        if magic == STREAM_DATA_MAGIC:
+            now = time.time()
+            if received is None:
+                received = int(now * 1e9)
+            sent = STREAM_TIMESTAMP.unpack_from(data, STREAM_HEADER.size)[0] \
+                if len(data) >= STREAM_HEADER.size + STREAM_TIMESTAMP.size \
+                else None
+            with self._lock:
+                flow = self._streams.get((peer, stream))
+                if flow is None:
+                    flow = self._streams[(peer, stream)] = StreamFlow(now)
+                flow.add(count, len(data), sent, received)
+                flow.last = now
+                if now - flow.reported < self._interval:
+                    return 0
+                flow.reported = now
+                STREAM_HEADER.pack_into(
+                    buffer, 0, STREAM_REPORT_MAGIC, stream, count)
+                return STREAM_HEADER.size + flow.pack_into(
+                    buffer, STREAM_HEADER.size)
+        if magic != STREAM_END_MAGIC:
+            return None
+        with self._lock:
+            # the counters are kept for the retries of a lost end
+            flow = self._streams.get((peer, stream))
+            if flow is None:
+                flow = StreamFlow(None)
+            STREAM_HEADER.pack_into(
+                buffer, 0, STREAM_END_MAGIC, stream, count)
+            size = STREAM_HEADER.size + flow.pack_into(
+                buffer, STREAM_HEADER.size)
+            self._expire(time.time())
+        return size
+
+
+class MulticastFlow(StreamFlow):
+    """
+    Counters of the datagrams of a sender received by a multicast
+    receiver, with their one way latency since the previous report
+    """
+
+    def __init__(self, now, window=65536):
+        super(MulticastFlow, self).__init__(now, window)
+        self._latencies = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def add(self, sequence, size, sent, received):
+        super(MulticastFlow, self).add(sequence, size, sent, received)
+        latency = (received - sent) / 1e6
+        self._latencies += 1
+        self._latency_total += latency
+        self._latency_max = latency if self._latencies == 1 else \
+            max(self._latency_max, latency)
+
+    def pack_into(self, buffer, offset):
+        """
+        Write the STREAM_SUMMARY, STREAM_STATS and MULTICAST_LATENCY of
+        the sender, the latency starts over
+        :return: size written
+        :rtype: int
+        """
+        size = super(MulticastFlow, self).pack_into(buffer, offset)
+        MULTICAST_LATENCY.pack_into(
+            buffer, offset + size,
+            self._latency_total / self._latencies if self._latencies
+            else 0.0, self._latency_max)
+        self._latencies = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        return size + MULTICAST_LATENCY.size
+
+
+class MulticastCounters(StreamCounters):
+    """
+    Senders of the datagrams received by a multicast receiver. A report
+    of a sender is sent back to it every interval seconds, counters of
+    senders idle for more than expiry seconds are dropped.
+    """
+
+    def handle(self, peer, data, buffer, received=None):
+        """
+        Count a datagram if it was sent by a rule in multicast mode
+        :return: size of the report written into buffer, 0 if there is
+                 none or None if the datagram isn't a multicast datagram
+        :rtype: int
+        """
+        if len(data) < STREAM_HEADER.size + STREAM_TIMESTAMP.size:
+            return None
+        magic, stream, sequence = STREAM_HEADER.unpack_from(data)
+        if magic != MULTICAST_MAGIC:
+            return None
+        now = time.time()
+        if received is None:
+            received = int(now * 1e9)
+        sent = STREAM_TIMESTAMP.unpack_from(data, STREAM_HEADER.size)[0]
+        with self._lock:
+            flow = self._streams.get((peer, stream))
+            if flow is None:
+                self._expire(now)
+                flow = self._streams[(peer, stream)] = MulticastFlow(now)
+            flow.add(sequence, len(data), sent, received)
+            flow.last = now
+            if now - flow.reported < self._interval:
+                return 0
+            flow.reported = now
+            STREAM_HEADER.pack_into(
+                buffer, 0, MULTICAST_REPORT_MAGIC, stream, sequence)
+            return STREAM_HEADER.size + flow.pack_into(
+                buffer, STREAM_HEADER.size)
+
+
+class HeldConnections(object):
+    """
+    Event loop of the held connections of the TCP servers of a process.
+    The thread of a connection hands it over once it turns out to be
+    held, a single thread then echoes the heartbeats of all of them, so
+    idle connections don't keep a thread each.
+    """
+
+    READ_SIZE = 4096
+
+    def __init__(self):
+        self._selector = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._selector.get_map()) if self._selector else 0
+
+    def adopt(self, sock, data=b''):
+        """
+        Take over a connection, the socket object of the caller is
+        detached from it
+        :param data: heartbeats received along with the HOLD_MAGIC
+        :type data: bytes
+        """
+        with self._lock:
+            if self._thread is None:
+                raise_open_files_limit()
+                self._selector = selectors.DefaultSelector()
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        sock = socket.socket(sock.family, sock.type, sock.proto,
+                             sock.detach())
+        sock.setblocking(False)
+        # the connection is held before its first heartbeat is echoed
+        self._selector.register(sock, selectors.EVENT_READ)
+        if data:
+            sock.send(data)
+
+    def _close(self, sock):
+        self._selector.unregister(sock)
+        sock.close()
+
+    def _run(self):
+        while True:
+            # connections registered meanwhile are picked up by the next
+            # select
+            for key, _ in self._selector.select(timeout=1):
+                sock = key.fileobj
+                try:
+                    data = sock.recv(self.READ_SIZE)
+                    if data:
+                        # heartbeats are small enough to never block
+                        sock.send(data)
+                        continue
+                except (IOError, OSError) as e:
+                    if getattr(e, 'errno', None) in (errno.EAGAIN,
+                                                     errno.EWOULDBLOCK):
+                        continue
+                self._close(sock)
+
+
+held_connections = HeldConnections()
 
 
 class HTTPRequestHandler(BaseHTTPRequestHandler):
     """
     Handle to handle HTTP Request
+    Connections are kept alive as per HTTP/1.1 until the client closes
+    them or they are idle for HTTP_KEEP_ALIVE_TIMEOUT seconds.
     """
+    protocol_version = 'HTTP/1.1'
+    timeout = HTTP_KEEP_ALIVE_TIMEOUT
+
     def do_GET(self):
+        message = "Hello From AXON HTTP Server \n".encode('utf-8')
         self.send_response(200)
+        self.send_header('Content-Length', str(len(message)))
         self.end_headers()
-        message = "Hello From AXON HTTP Server \n"
-        self.wfile.write(message.encode('utf-8'))
+        self.wfile.write(message)
         return
 
     def log_message(self, format, *args):
@@ -39,11 +381,104 @@ class TCPRequestHandler(socketserver.BaseRequestHandler):
     If we are using ThreadedTCPServer with the help of
     SocketServer.ThreadingMixIn feature, every TCP request will
     be handled in single thread.
+    Requests are echoed back until the client closes the connection, so
+    a persistent client can exchange many requests over one connection.
+    Connections which start with STREAM_MAGIC are streams, they are
+    drained and the bytes received are sent back once the client shuts
+    down its side. Connections which start with PIPELINE_MAGIC carry
+    length prefixed requests, which are answered in order as they arrive.
+    """
+
+    def setup(self):
+        self.buffer = echo_buffers.acquire()
+
+    def handle(self):
+        view = memoryview(self.buffer)
+        size = self.request.recv_into(view)
+        magic = view[:len(STREAM_MAGIC)].tobytes()
+        if size >= len(STREAM_MAGIC) and magic == STREAM_MAGIC:
+            return self._drain(view, size - len(STREAM_MAGIC))
+        if size >= len(PIPELINE_MAGIC) and magic == PIPELINE_MAGIC:
+            return self._answer(view, len(PIPELINE_MAGIC), size)
+        if size == len(CPS_MAGIC) and magic == CPS_MAGIC:
+            # the server closes the flow first
+            return
+        if size >= len(HOLD_MAGIC) and magic == HOLD_MAGIC and \
+                selectors is not None:
+            return held_connections.adopt(
+                self.request, view[len(HOLD_MAGIC):size].tobytes())
+        while size:
+            self.request.sendall(view[:size])
+            size = self.request.recv_into(view)
+
+    def _drain(self, view, received):
+        while True:
+            size = self.request.recv_into(view)
+            if not size:
+                break
+            received += size
+        self.request.sendall(STREAM_SUMMARY.pack(received, 0))
+
+    def _answer(self, view, start, end):
+        """
+        Answer pipelined requests until the client closes the connection.
+        Payloads of requests are skipped without being buffered, the
+        responses to the requests completed by a read are sent at once.
+        """
+        # bytes of the payload of the current request still to be read
+        skip = 0
+        current = None
+        responses = []
+        while True:
+            while start < end:
+                if skip:
+                    count = min(skip, end - start)
+                    skip -= count
+                    start += count
+                    if not skip:
+                        responses.append(current)
+                    continue
+                if end - start < PIPELINE_HEADER.size:
+                    break
+                sequence, skip, size = PIPELINE_HEADER.unpack_from(
+                    view, start)
+                start += PIPELINE_HEADER.size
+                current = (sequence, size)
+                if not skip:
+                    responses.append(current)
+            if responses:
+                reply = bytearray()
+                for sequence, size in responses:
+                    reply += PIPELINE_HEADER.pack(sequence, 0, size)
+                    reply += pipeline_payload[:size]
+                self.request.sendall(reply)
+                responses = []
+            # a partial header is kept for the next read
+            partial = end - start
+            view[:partial] = view[start:end].tobytes()
+            count = self.request.recv_into(view[partial:])
+            if not count:
+                return
+            start, end = 0, partial + count
+
+    def finish(self):
+        echo_buffers.release(self.buffer)
+
+
+class TLSRequestHandler(TCPRequestHandler):
+    """
+    Handler for TLS connections, the handshake is completed in the thread
+    of the connection before the data of the connection is handled like
+    by TCPRequestHandler.
     """
 
     def handle(self):
-        data = self.request.recv(PACKET_SIZE)
-        self.request.send(data)
+        try:
+            self.request.do_handshake()
+        except (ssl.SSLError, socket.error):
+            # failed handshakes are for the client to report
+            return
+        super(TLSRequestHandler, self).handle()
 
 
 class UDPRequestHandler(socketserver.BaseRequestHandler):
@@ -52,14 +487,37 @@ class UDPRequestHandler(socketserver.BaseRequestHandler):
     If we are using ThreadedUDPServer with the help of
     SocketServer.ThreadingMixIn feature, every UDP request will
     be handled in single thread.
+    Datagrams are echoed back unmodified, so binary probes keep their
+    sequence number and timestamp. If the server has kernel timestamps,
+    the time a probe spent in the server is added to its reply so
+    clients can leave it out of the latency.
     """
 
     def handle(self):
-        data = self.request[0].strip()
+        data = self.request[0]
         socket = self.request[1]
+        received = self.request[2] if len(self.request) > 2 else None
+        if received is not None and len(data) >= PROBE_HEADER.size and \
+                data[:len(PROBE_MAGIC)] == PROBE_MAGIC:
+            # the dwell is written behind the probe in the receive buffer
+            size = len(data)
+            buffer = self.request[3]
+            PROBE_DWELL.pack_into(
+                buffer, size, max(time_ns() - received, 0))
+            data = memoryview(buffer)[:size + PROBE_DWELL.size]
         socket.sendto(data, self.client_address)
 
 
+class MulticastRequestHandler(socketserver.BaseRequestHandler):
+    """
+    Handler for the datagrams of a multicast receiver which aren't sent
+    by a rule in multicast mode, they are dropped.
+    """
+
+    def handle(self):
+        pass
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Server(object):
     """
@@ -98,6 +556,9 @@ class ThreadedTCPServer(socketserver.ThreadingMixIn,
     in separate thread.
     """
     allow_reuse_address = ALLOW_REUSE_ADDRESS
+    # connections are echoed until the client closes them, don't wait for
+    # the threads of connections still open on stop
+    daemon_threads = True
     request_queue_size = REQUEST_QUEUE_SIZE
 
     def run(self):
@@ -111,10 +572,34 @@ class ThreadedTCPServer(socketserver.ThreadingMixIn,
         pass
 
 
+class ThreadedTLSServer(ThreadedTCPServer):
+    """
+    TCP Server which wraps its connections in TLS with the self signed
+    certificate of the servers. Session tickets let clients resume their
+    sessions, the tickets of all connections are issued from one context.
+    """
+
+    def server_activate(self):
+        self.context = server_context()
+        ThreadedTCPServer.server_activate(self)
+
+    def get_request(self):
+        sock, client_address = ThreadedTCPServer.get_request(self)
+        # data is echoed a TLS record at a time, which Nagle's algorithm
+        # would hold back until the previous record is acknowledged
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # the handshake isn't made by the thread accepting connections
+        return self.context.wrap_socket(
+            sock, server_side=True, do_handshake_on_connect=False), \
+            client_address
+
+
 class ThreadedHTTPServer(socketserver.ThreadingMixIn, HTTPServer, Server):
     """Handle requests in a separate thread."""
 
     allow_reuse_address = ALLOW_REUSE_ADDRESS
+    # don't wait for the threads of idle keep alive connections on stop
+    daemon_threads = True
     request_queue_size = REQUEST_QUEUE_SIZE
 
     def run(self):
@@ -133,9 +618,106 @@ class ThreadedUDPServer(socketserver.ThreadingMixIn,
     """
     This is a UDP Server which will handle every single client request
     in separate thread.
+    Datagrams are received into echo buffers, a request is a memoryview
+    of the datagram, the socket, the kernel RX timestamp of the datagram
+    and the buffer. The timestamp is only set with UDP_TIMESTAMPING_ENABLED
+    when the kernel supports it.
+    On linux, datagrams for the plain echo of UDPRequestHandler are echoed
+    by the server thread in batches of up to batch_size datagrams per
+    recvmmsg and sendmmsg, without a thread per datagram.
+    Datagrams of streams are counted by the server thread in streams and
+    aren't echoed.
     """
     allow_reuse_address = ALLOW_REUSE_ADDRESS
     request_queue_size = REQUEST_QUEUE_SIZE
+    max_packet_size = ECHO_BUFFER_SIZE
+    timestamping_enabled = UDP_TIMESTAMPING_ENABLED
+    timestamping = False
+    batch_size = UDP_BATCH_SIZE
+    _batch = None
+
+    def server_bind(self):
+        socketserver.UDPServer.server_bind(self)
+        self.streams = StreamCounters()
+        if self.timestamping_enabled:
+            self.timestamping = enable_timestamping(self.socket)
+
+    @property
+    def batching(self):
+        # probe replies of a timestamping server carry the dwell, which
+        # is added by the handler
+        return MMSG_SUPPORTED and self.batch_size > 1 and \
+            not self.timestamping and \
+            self.RequestHandlerClass is UDPRequestHandler
+
+    def _handle_request_noblock(self):
+        if not self.batching:
+            return socketserver.UDPServer._handle_request_noblock(self)
+        if self._batch is None:
+            self._batch = MessageBatch(self.batch_size, ECHO_BUFFER_SIZE)
+        try:
+            count = self._batch.recv(self.socket)
+            if count:
+                self._batch.echo(self.socket, count,
+                                 self._stream_replies(count))
+        except OSError:
+            # as for a single datagram, a failed exchange is dropped
+            return
+
+    def _stream_replies(self, count):
+        """
+        Count the stream datagrams of a received batch
+        :return: size of the reply of every datagram or None if the batch
+                 has no stream datagrams
+        :rtype: list
+        """
+        sizes = None
+        for index in range(count):
+            data = self._batch.message(index)
+            reply = self.streams.handle(
+                self._batch.name(index), data, self._batch.buffer(index))
+            if reply is None:
+                reply = len(data)
+            elif sizes is None:
+                sizes = [len(self._batch.message(previous))
+                         for previous in range(index)]
+            if sizes is not None:
+                sizes.append(reply)
+        return sizes
+
+    def process_request(self, request, client_address):
+        # stream datagrams are counted without a thread per datagram
+        reply = self.streams.handle(
+            client_address, request[0], request[3], request[2])
+        if reply is None:
+            return socketserver.ThreadingMixIn.process_request(
+                self, request, client_address)
+        try:
+            if reply:
+                self.socket.sendto(
+                    memoryview(request[3])[:reply], client_address)
+        except socket.error:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def get_request(self):
+        buffer = echo_buffers.acquire()
+        try:
+            if self.timestamping:
+                size, client_addr, received = recv_into_with_timestamp(
+                    self.socket, buffer)
+            else:
+                size, client_addr = self.socket.recvfrom_into(buffer)
+                received = None
+        except Exception:
+            echo_buffers.release(buffer)
+            raise
+        return (memoryview(buffer)[:size], self.socket, received,
+                buffer), client_addr
+
+    def shutdown_request(self, request):
+        echo_buffers.release(request[3])
 
     def run(self):
         self.serve_forever()
@@ -148,6 +730,42 @@ class ThreadedUDPServer(socketserver.ThreadingMixIn,
         pass
 
 
+class ThreadedMulticastServer(ThreadedUDPServer):
+    """
+    UDP server which receives the datagrams sent to a multicast group on
+    its port. The group is joined on the interface of the address the
+    server is created for, the socket is bound to the group so it only
+    gets the datagrams of the group. Senders are counted by the server
+    thread and get a report back instead of replies.
+    """
+
+    def __init__(self, server_address, RequestHandlerClass, group=None,
+                 bind_and_activate=True):
+        self.interface = server_address[0]
+        if group is None:
+            group = MULTICAST_GROUP_V6 \
+                if self.address_family == socket.AF_INET6 \
+                else MULTICAST_GROUP
+        self.group = group
+        ThreadedUDPServer.__init__(
+            self, (group, server_address[1]), RequestHandlerClass,
+            bind_and_activate)
+
+    def server_bind(self):
+        ThreadedUDPServer.server_bind(self)
+        self.streams = MulticastCounters()
+        group = socket.inet_pton(self.address_family, self.group)
+        if self.address_family == socket.AF_INET6:
+            # the group is joined on the interface of the route to it
+            self.socket.setsockopt(
+                socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP,
+                group + struct.pack('@I', 0))
+        else:
+            self.socket.setsockopt(
+                socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                group + socket.inet_aton(self.interface))
+
+
 class ThreadedHTTPServerV6(ThreadedHTTPServer):
     address_family = socket.AF_INET6
 
@@ -156,10 +774,18 @@ class ThreadedTCPServerV6(ThreadedTCPServer):
     address_family = socket.AF_INET6
 
 
+class ThreadedTLSServerV6(ThreadedTLSServer):
+    address_family = socket.AF_INET6
+
+
 class ThreadedUDPServerV6(ThreadedUDPServer):
     address_family = socket.AF_INET6
 
 
+class ThreadedMulticastServerV6(ThreadedMulticastServer):
+    address_family = socket.AF_INET6
+
+
 class IperfServer(Server):
     """
     Class to manage Iperf Server
@@ -188,7 +814,8 @@ class IperfServer(Server):
         return self._p_child.poll() is None
 
 
-def create_server_class(protocol, port, source, server_type='socket'):
+def create_server_class(protocol, port, source, server_type='socket',
+                        options=None):
     """
     Create server object
     :param protocol: protocol on which server works
@@ -197,6 +824,9 @@ def create_server_class(protocol, port, source, server_type='socket'):
     :type port: int
     :param server_type: socket server or iperf server
     :type server_type: int
+    :param options: options of the server, the 'group' of a MULTICAST
+                    server
+    :type options: dict
     :return: Server object
     :rtype: Server
     """
@@ -206,12 +836,24 @@ def create_server_class(protocol, port, source, server_type='socket'):
             else ThreadedTCPServer
         args = ((source, int(port)), TCPRequestHandler)
         kwargs = {}
+    elif protocol == "TLS" and server_type == "socket":
+        server_class = ThreadedTLSServerV6 \
+            if ipaddress.ip_address(source).version == 6 \
+            else ThreadedTLSServer
+        args = ((source, int(port)), TLSRequestHandler)
+        kwargs = {}
     elif protocol == "UDP" and server_type == "socket":
         server_class = ThreadedUDPServerV6 \
             if ipaddress.ip_address(source).version == 6 \
             else ThreadedUDPServer
         args = ((source, int(port)), UDPRequestHandler)
         kwargs = {}
+    elif protocol == "MULTICAST" and server_type == "socket":
+        server_class = ThreadedMulticastServerV6 \
+            if ipaddress.ip_address(source).version == 6 \
+            else ThreadedMulticastServer
+        args = ((source, int(port)), MulticastRequestHandler)
+        kwargs = {'group': (options or {}).get('group')}
     elif server_type == "iperf":
         server_class = IperfServer
         args = (source, protocol, port)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+Kernel software timestamps of UDP datagrams with linux SO_TIMESTAMPING.
+Timestamps are CLOCK_REALTIME nanoseconds taken by the kernel when a
+datagram is handed to the device (TX) or received from it (RX), so they
+don't include the delays of the python process.
+"""
+
+import errno
+import socket
+import struct
+
+from axon.common.config import LINUX_OS
+
+# values of linux/net_tstamp.h and asm/socket.h, missing in the socket
+# module of most python versions
+SO_TIMESTAMPING = getattr(socket, 'SO_TIMESTAMPING', 37)
+SCM_TIMESTAMPING = SO_TIMESTAMPING
+IP_RECVERR = getattr(socket, 'IP_RECVERR', 11)
+IPV6_RECVERR = getattr(socket, 'IPV6_RECVERR', 25)
+MSG_ERRQUEUE = getattr(socket, 'MSG_ERRQUEUE', 0x2000)
+
+SOF_TIMESTAMPING_TX_SOFTWARE = 1 << 1
+SOF_TIMESTAMPING_RX_SOFTWARE = 1 << 3
+SOF_TIMESTAMPING_SOFTWARE = 1 << 4
+SOF_TIMESTAMPING_OPT_ID = 1 << 7
+SOF_TIMESTAMPING_OPT_TSONLY = 1 << 11
+
+# struct scm_timestamping, three struct timespec of which the first one
+# is the software timestamp
+_TIMESTAMPS = struct.Struct('@6l')
+# struct sock_extended_err, ee_data holds the OPT_ID of the datagram
+_EXTENDED_ERR = struct.Struct('@IBBBBII')
+ANCILLARY_SIZE = 512
+
+
+def enable_timestamping(sock, tx=False):
+    """
+    Enable kernel software RX and optionally TX timestamps on a socket
+    :param sock: UDP socket
+    :type sock: socket.socket
+    :param tx: whether to also timestamp sent datagrams, their timestamps
+               are read from the error queue with read_tx_timestamps
+    :type tx: bool
+    :return: True if timestamps are enabled, False if not supported
+    :rtype: bool
+    """
+    if not LINUX_OS or not hasattr(sock, 'recvmsg'):
+        return False
+    flags = SOF_TIMESTAMPING_RX_SOFTWARE | SOF_TIMESTAMPING_SOFTWARE
+    if tx:
+        flags |= SOF_TIMESTAMPING_TX_SOFTWARE | SOF_TIMESTAMPING_OPT_ID | \
+            SOF_TIMESTAMPING_OPT_TSONLY
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPING, flags)
+    except (OSError, socket.error):
+        return False
+    return True
+
+
+def _timestamp(ancdata):
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == SCM_TIMESTAMPING and \
+                len(data) >= _TIMESTAMPS.size:
+            seconds, nanoseconds = _TIMESTAMPS.unpack(
+                data[:_TIMESTAMPS.size])[:2]
+            if seconds or nanoseconds:
+                return seconds * 10 ** 9 + nanoseconds
+    return None
+
+
+def _datagram_id(ancdata):
+    for level, kind, data in ancdata:
+        if (level, kind) in ((socket.IPPROTO_IP, IP_RECVERR),
+                             (socket.IPPROTO_IPV6, IPV6_RECVERR)) and \
+                len(data) >= _EXTENDED_ERR.size:
+            return _EXTENDED_ERR.unpack(data[:_EXTENDED_ERR.size])[-1]
+    return None
+
+
+def recv_into_with_timestamp(sock, buffer, flags=0):
+    """
+    Receive a datagram into buffer with its kernel RX timestamp
+    :return: number of bytes received, address and timestamp in
+             nanoseconds or None if the kernel didn't timestamp the datagram
+    :rtype: tuple
+    """
+    size, ancdata, _, address = sock.recvmsg_into(
+        [buffer], ANCILLARY_SIZE, flags)
+    return size, address, _timestamp(ancdata)
+
+
+def read_tx_timestamps(sock):
+    """
+    Read the TX timestamps queued on the error queue of a socket without
+    blocking
+    :return: (OPT_ID, timestamp in nanoseconds) of every sent datagram,
+             the OPT_ID counts the datagrams sent on the socket from 0
+    :rtype: list
+    """
+    timestamps = []
+    # a socket with a timeout would wait for it to be readable first
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        while True:
+            try:
+                _, ancdata, _, _ = sock.recvmsg(
+                    0, ANCILLARY_SIZE, MSG_ERRQUEUE)
+            except (OSError, socket.error) as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+                return timestamps
+            timestamp = _timestamp(ancdata)
+            if timestamp is not None:
+                timestamps.append((_datagram_id(ancdata), timestamp))
+    finally:
+        sock.settimeout(timeout)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# Copyright (c) 2020 VMware, Inc. All Rights Reserved.
+# SPDX-License-Identifier: BSD-2 License
+# The full license information can be found in LICENSE.txt
+# in the root directory of this project.
+
+"""
+TLS contexts of the TLS servers and clients. Servers present a locally
+generated self signed certificate which clients don't verify, the traffic
+is meant to measure what TLS costs on a path, not to authenticate peers.
+"""
+
+import os
+import ssl
+import subprocess
+import threading
+
+from axon.common import config as conf
+
+CERT_FILE = 'axon.crt'
+KEY_FILE = 'axon.key'
+
+_lock = threading.Lock()
+_contexts = {}
+
+
+def ensure_certificate(cert_dir=None):
+    """
+    Get the self signed certificate of the servers, it is generated with
+    openssl if it doesn't exist yet
+    :param cert_dir: directory of the certificate, TLS_CERT_DIR by default
+    :type cert_dir: str
+    :return: paths of the certificate and its key
+    :rtype: tuple
+    """
+    cert_dir = cert_dir or conf.TLS_CERT_DIR
+    cert_file = os.path.join(cert_dir, CERT_FILE)
+    key_file = os.path.join(cert_dir, KEY_FILE)
+    with _lock:
+        if os.path.exists(cert_file) and os.path.exists(key_file):
+            return cert_file, key_file
+        if not os.path.isdir(cert_dir):
+            os.makedirs(cert_dir)
+        # servers of other processes may generate the certificate at the
+        # same time, so it is moved into place once complete
+        suffix = '.%s' % os.getpid()
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(
+                ['openssl', 'req', '-x509', '-nodes', '-newkey', 'ec',
+                 '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+                 '-days', '3650', '-subj', '/CN=axon',
+                 '-keyout', key_file + suffix, '-out', cert_file + suffix],
+                stdout=devnull, stderr=devnull)
+        os.rename(key_file + suffix, key_file)
+        os.rename(cert_file + suffix, cert_file)
+    return cert_file, key_file
+
+
+def server_context(cert_dir=None):
+    """
+    Get the context of the TLS servers, session tickets are issued so
+    clients can resume their sessions
+    :rtype: ssl.SSLContext
+    """
+    key = ('server', cert_dir)
+    with _lock:
+        context = _contexts.get(key)
+    if context is None:
+        cert_file, key_file = ensure_certificate(cert_dir)
+        context = ssl.SSLContext(
+            getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+        context.load_cert_chain(cert_file, key_file)
+        with _lock:
+            context = _contexts.setdefault(key, context)
+    return context
+
+
+def client_context():
+    """
+    Get the context of the TLS clients, shared by all of them since a
+    session can only be resumed with the context it was established with
+    :rtype: ssl.SSLContext
+    """
+    with _lock:
+        context = _contexts.get('client')
+        if context is None:
+            context = ssl.SSLContext(
+                getattr(ssl, 'PROTOCOL_TLS_CLIENT', ssl.PROTOCOL_SSLv23))
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            _contexts['client'] = context
+        return context
+
+
+class TLSSessionCache(object):
+    """
+    Latest TLS session of every destination of a traffic client, which
+    the next handshake with the destination resumes
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, destination, port):
+        with self._lock:
+            return self._sessions.get((destination, port))
+
+    def put(self, destination, port, session):
+        if session is None:
+            return
+        with self._lock:
+            self._sessions[(destination, port)] = session
+
+    def discard(self, destination, port):
+        with self._lock:
+            self._sessions.pop((destination, port), None)
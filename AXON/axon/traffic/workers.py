@@ -110,3 +110,28 @@ class WorkerProcess(mp.Process, Worker):
 
     def is_running(self):
         return self.is_alive()
+
+
+class WorkerGroup(Worker):
+    """
+    Group of workers started, stopped and checked as one, e.g. the
+    processes a workload is sharded across
+    """
+
+    def __init__(self, workers):
+        self.workers = list(workers)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def run(self):
+        self.start()
+
+    def stop(self):
+        for worker in self.workers:
+            if worker.is_running():
+                worker.stop()
+
+    def is_running(self):
+        return any(worker.is_running() for worker in self.workers)